@@ -1,7 +1,11 @@
 class Game {
-  constructor(id, gameData) {
+  constructor(id, gameData, handTables = null) {
     this.id = id;
     this.gameData = gameData;
+    this.handTables = handTables;
+    // A reload between hands: swapped in by startGame, never mid-hand
+    this.pendingGameData = null;
+    this.pendingHandTables = null;
     this.state = "ready up";
     this.players = [];
     this.spectators = [];
@@ -194,6 +198,12 @@ class Game {
   startGame() {
     if (this.state !== "ready up") return;
 
+    if (this.pendingGameData) {
+      this.gameData = this.pendingGameData;
+      this.handTables = this.pendingHandTables;
+      this.pendingGameData = this.pendingHandTables = null;
+    }
+
     this.state = "zeroth card";
     this.pickOrder = shuffle(["TOP", "MIDDLE", "JUNGLE", "BOTTOM", "UTILITY"]);
     this.deck = this.pickOrder.map(
@@ -607,7 +617,52 @@ class Game {
     return true;
   }
 
+  // Pre-flop percentile from the build's tables (game_data/handtables.py):
+  // a binary search per third-lane champion instead of scoring every
+  // opponent hand. null when the tables don't cover this deal.
+  evaluatePreflop(hand) {
+    const table = this.handTables?.tables[this.pickOrder.slice(0, 3).join("+")];
+    if (!table) return null;
+
+    const names = [hand[0].name, hand[1].name];
+    const leftPool = this.gameData[this.pickOrder[0]];
+    const rightPool = this.gameData[this.pickOrder[1]];
+    // Opponent hands sharing a name with ours are in the tables but not counted
+    const skipped = [];
+    leftPool.forEach((left) => {
+      if (names.includes(left.name)) rightPool.forEach((right) => skipped.push([left, right]));
+      else rightPool.forEach((right) => names.includes(right.name) && skipped.push([left, right]));
+    });
+
+    let betterThan = 0;
+    let count = 0;
+    const champPool = this.gameData[this.pickOrder[2]];
+    for (let i = 0; i < champPool.length; i++) {
+      const champ = champPool[i];
+      if (!this.isLegalDraw(champ)) continue;
+      const entry = table[champ.name];
+      if (!entry) return null;
+
+      this.board.push(champ);
+      const currentScore = this.scoreHand(hand);
+      betterThan += atMost(entry, currentScore);
+      count += entry.total;
+      for (let j = 0; j < skipped.length; j++) {
+        if (currentScore >= this.scoreHand(skipped[j])) betterThan--;
+        count--;
+      }
+      this.board.pop();
+    }
+
+    return Math.floor((betterThan / count) * 100);
+  }
+
   evalutateHand(hand) {
+    if (this.board.length === 0) {
+      const percentile = this.evaluatePreflop(hand);
+      if (percentile !== null) return percentile;
+    }
+
     let betterThan = 0;
     let count = 0;
 
@@ -769,4 +824,78 @@ function shuffle(array) {
   return array;
 }
 
-module.exports = { Game };
+// Hands in a hand-table entry scoring at most `score`, by binary search
+function atMost(entry, score) {
+  let lo = 0;
+  let hi = entry.scores.length;
+  while (lo < hi) {
+    const mid = (lo + hi) >> 1;
+    if (entry.scores[mid] <= score) lo = mid + 1;
+    else hi = mid;
+  }
+  return lo ? entry.atMost[lo - 1] : 0;
+}
+
+// Compact game_data.json (version 2, see game_data/gamedata.py) -> the
+// per-champion structure Game works on; older files pass through unchanged.
+function inflateGameData(data) {
+  if (data.version !== 2) return data;
+  const { lanes, names } = data;
+  const gameData = { _meta: data._meta };
+  lanes.forEach((lane) => {
+    const columns = data.champions[lane];
+    gameData[lane] = columns.name.map((n, i) => ({
+      name: names[n],
+      lane,
+      points: columns.points[i],
+      power: columns.power[i],
+      winrate: columns.winrate[i],
+      synergy: Object.fromEntries(lanes.map((l) => [l, {}])),
+      delta: Object.fromEntries(lanes.map((l) => [l, {}])),
+    }));
+  });
+
+  lanes.forEach((laneA, a) => {
+    lanes.slice(a + 1).forEach((laneB) => {
+      const synergy = data.synergy[`${laneA}+${laneB}`];
+      const delta = data.delta[`${laneA}+${laneB}`];
+      gameData[laneA].forEach((left, i) => {
+        gameData[laneB].forEach((right, j) => {
+          const points = synergy[i][j];
+          if (points === null) return;
+          left.synergy[laneB][right.name] = right.synergy[laneA][left.name] = points;
+          left.delta[laneB][right.name] = right.delta[laneA][left.name] = delta[i][j];
+        });
+      });
+    });
+  });
+  return gameData;
+}
+
+// game_data_hands.json (version 3, see game_data/handtables.py): one score
+// histogram per board champion -> the {scores, atMost, total} entries
+// evaluatePreflop searches; older files pass through unchanged.
+function inflateHandTables(data) {
+  if (data.version !== 3) return data;
+  const tables = {};
+  Object.entries(data.tables).forEach(([triple, table]) => {
+    const board = data.lanes[triple.split("+")[2]];
+    const entries = {};
+    board.forEach((n, k) => {
+      const scores = [];
+      const atMost = [];
+      let hands = 0;
+      table.counts[k].forEach((count, j) => {
+        if (!count) return;
+        hands += count;
+        scores.push(table.min[k] + j);
+        atMost.push(hands);
+      });
+      entries[data.names[n]] = { scores, atMost, total: table.total };
+    });
+    tables[triple] = entries;
+  });
+  return { version: data.version, tables };
+}
+
+module.exports = { Game, inflateGameData, inflateHandTables };
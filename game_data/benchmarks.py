@@ -0,0 +1,421 @@
+import io
+import os
+import sys
+import copy
+import json
+import time
+import random
+import platform
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+from pathlib import Path
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, str(Path(__file__).parent))
+import databuild
+import daystore
+from daystore import champion_ids, from_dict, write_day
+
+'''
+    Benchmarks for the databuild stages.
+
+        python game_data/benchmarks.py synergy_powers [--per-lane 45 90]
+        python game_data/benchmarks.py hitting_set [--per-lane 45 90]
+        python game_data/benchmarks.py classification [--per-lane 45 90]
+        python game_data/benchmarks.py load [--days 28] [--regions 3] [--processes N]
+        python game_data/benchmarks.py build [--days 28] [--matches-per-day 5000] [--memory]
+        python game_data/benchmarks.py generate --out DIR [--days 28] [--matches-per-day 5000]
+        python game_data/benchmarks.py counters [--matches 20000] [--save-every 20]
+
+    Each stage benchmark checks that the optimised stage gives the same
+    output as the reference implementation before reporting timings.
+
+    build runs build_game_data on synthetic day-files (see synthetic_days)
+    with a StageProfiler, then appends the stage timings to --history
+    (game_data/bench_history.jsonl) and compares them with the last run
+    of the same parameters. generate only writes the day-files, for
+    running databuild.py on them by hand.
+
+    counters feeds synthetic matches to datagen's MatchCounters and to the
+    dict counters it replaced, flushing a delta-log delta every
+    --save-every matches, and checks both give the same deltas and day.
+'''
+
+LANES = ['TOP', 'MIDDLE', 'JUNGLE', 'BOTTOM', 'UTILITY']
+POINTS = [0, 1, 2, 4, 8]
+
+
+def synthetic_formated_lane(per_lane: int, seed: int = 0, flex: float = 0.3):
+    """
+    formated_lane as build_game_data produces it, with `per_lane` champions in
+    every lane and full synergy coverage. A `flex` share of the names is
+    reused across lanes, like champions played in several roles.
+    """
+    rng = random.Random(seed)
+    pool = [f"Champ{i}" for i in range(int(per_lane * len(LANES) * (1 - flex / 2)))]
+    formated_lane = {}
+    for lane in LANES:
+        names = rng.sample(pool, per_lane)
+        formated_lane[lane] = [{
+            'name': name,
+            'lane': lane,
+            'points': rng.choice(POINTS),
+            'synergy': {l: {} for l in LANES},
+        } for name in names]
+    for lane1 in LANES:
+        for lane2 in LANES:
+            if lane1 >= lane2: continue
+            for c1 in formated_lane[lane1]:
+                for c2 in formated_lane[lane2]:
+                    if c1['name'] == c2['name']: continue
+                    points = rng.choice(POINTS)
+                    c1['synergy'][lane2][c2['name']] = points
+                    c2['synergy'][lane1][c1['name']] = points
+    return formated_lane
+
+
+def synthetic_lanes(per_lane: int, seed: int = 0, flex: float = 0.3, missing: float = 0.005):
+    """
+    `lanes` as build_game_data has them before the hitting set: every
+    inter-role pair has synergy data except a `missing` share, which is
+    concentrated on low-games champions like in the real data.
+    """
+    rng = random.Random(seed)
+    pool = [f"Champ{i}" for i in range(int(per_lane * len(LANES) * (1 - flex / 2)))]
+    lanes = {}
+    for lane in LANES:
+        lanes[lane] = {}
+        for name in rng.sample(pool, per_lane):
+            lanes[lane][name] = {'n': name, 'g': rng.randint(100, 50000), 'w': 0.5, 'e': 0.01,
+                                 's': {l: {} for l in LANES}}
+    for lane1 in LANES:
+        for lane2 in LANES:
+            if lane1 >= lane2: continue
+            for c1, v1 in lanes[lane1].items():
+                for c2, v2 in lanes[lane2].items():
+                    if c1 == c2: continue
+                    rarity = 2e4 / (v1['g'] + v2['g'])
+                    if rng.random() < missing * rarity: continue
+                    v1['s'][lane2][c2] = {'g': 100, 'w': 0.0, 'e': 0.01}
+                    v2['s'][lane1][c1] = {'g': 100, 'w': 0.0, 'e': 0.01}
+    return lanes
+
+
+def scored_lanes(per_lane: int, seed: int = 0):
+    """ synthetic_lanes with spread-out winrates, deltas and errors, as scoring sees them """
+    rng = random.Random(seed)
+    lanes = synthetic_lanes(per_lane, seed)
+    for champions in lanes.values():
+        for champion in champions.values():
+            champion['w'], champion['e'] = rng.gauss(0.5, 0.03), rng.uniform(0.002, 0.05)
+            for schampions in champion['s'].values():
+                for schampion in schampions.values():
+                    schampion['w'], schampion['e'] = rng.gauss(0, 0.04), rng.uniform(0.01, 0.08)
+    return lanes
+
+
+def synthetic_days(folder, days=28, regions=("na1", "euw1", "kr"), matches_per_day=5000,
+                   champions=None, lanes_per_champion=1.6, seed=0, file_format="json"):
+    """
+    Write {region}_winrate_{date} and {region}_synergy_{date} day-files for
+    the last `days` days (today included), counted the way datagen counts
+    simulated solo-queue matches. Champions are the real names, so the
+    files load through champion_ids.json unchanged; each has a main lane,
+    sometimes others (`lanes_per_champion` on average), a Zipf-like pick
+    rate and a hidden strength that decides wins.
+    """
+    rng = np.random.default_rng(seed)
+    names = [name for name in champion_ids().names if name is not None]
+    names = [names[i] for i in rng.permutation(len(names))[:champions or len(names)]]
+
+    # (champion, lane) entries with their pick weight and strength
+    entries, weights = [], []
+    for rank, name in enumerate(names):
+        popularity = 1 / (rank + 10)
+        main = rng.integers(len(LANES))
+        extra = rng.permutation([l for l in range(len(LANES)) if l != main])
+        count = min(rng.geometric(1 / lanes_per_champion) - 1, len(extra))
+        for lane, weight in [(main, 1.0)] + [(l, 0.15) for l in extra[:count]]:
+            entries.append((name, LANES[lane]))
+            weights.append(popularity * weight)
+    weights = np.array(weights)
+    strength = rng.normal(0, 0.15, len(entries))
+    entry_lane = np.array([LANES.index(lane) for _, lane in entries])
+    entry_champ = np.array([names.index(name) for name, _ in entries])
+    by_lane = [np.flatnonzero(entry_lane == l) for l in range(len(LANES))]
+    # datagen's normalize_key puts the smaller (lane, champion) first
+    order = np.empty(len(entries), dtype=np.int64)
+    order[sorted(range(len(entries)), key=lambda e: (entries[e][1], entries[e][0]))] = np.arange(len(entries))
+
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    today = datetime.now(timezone.utc)
+    n = len(entries)
+    for day in range(days):
+        date_str = (today - timedelta(days=days - 1 - day)).strftime("%Y-%m-%d")
+        for region in regions:
+            # picks[match, team * 5 + lane] = entry
+            picks = np.stack([rng.choice(by_lane[l], size=(matches_per_day, 2),
+                                         p=weights[by_lane[l]] / weights[by_lane[l]].sum())
+                              for l in range(len(LANES))], axis=2).reshape(matches_per_day, 10)
+            champs = np.sort(entry_champ[picks], axis=1)
+            picks = picks[(np.diff(champs, axis=1) != 0).all(axis=1)]  # one champion per match
+            team_strength = strength[picks].reshape(-1, 2, 5).sum(axis=2)
+            blue_wins = rng.random(len(picks)) < 1 / (1 + np.exp(team_strength[:, 1] - team_strength[:, 0]))
+            wins = np.repeat(np.stack([blue_wins, ~blue_wins], axis=1), 5, axis=1)
+
+            winrate_wins = np.bincount(picks[wins], minlength=n)
+            winrate_games = np.bincount(picks.ravel(), minlength=n)
+            synergy_wins = np.zeros(n * n, dtype=np.int64)
+            synergy_games = np.zeros(n * n, dtype=np.int64)
+            for team in (0, 1):
+                for i in range(5):
+                    for j in range(i + 1, 5):
+                        a, b = picks[:, team * 5 + i], picks[:, team * 5 + j]
+                        swap = order[a] > order[b]
+                        key = np.where(swap, b, a) * n + np.where(swap, a, b)
+                        synergy_games += np.bincount(key, minlength=n * n)
+                        synergy_wins += np.bincount(key[wins[:, team * 5]], minlength=n * n)
+
+            winrates = {f"{entries[e][0]}+{entries[e][1]}":
+                        {"wins": int(winrate_wins[e]), "losses": int(winrate_games[e] - winrate_wins[e])}
+                        for e in np.flatnonzero(winrate_games)}
+            synergy = {}
+            for key in np.flatnonzero(synergy_games):
+                (champ1, lane1), (champ2, lane2) = entries[key // n], entries[key % n]
+                synergy[f"{champ1}+{champ2}+{lane1}+{lane2}"] = {
+                    "wins": int(synergy_wins[key]), "losses": int(synergy_games[key] - synergy_wins[key])}
+
+            for prefix, counts in (("winrate", winrates), ("synergy", synergy)):
+                path = folder / f"{region}_{prefix}_{date_str}.{file_format}"
+                if file_format == "npy": write_day(from_dict(counts, prefix), path)
+                else:
+                    with open(path, "w", encoding="utf-8") as f:
+                        json.dump(counts, f, separators=(",", ":"))
+    return len(entries)
+
+
+def timed(fn, *args, repeat=1):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def bench_synergy_powers(args):
+    for per_lane in args.per_lane:
+        formated_lane = synthetic_formated_lane(per_lane)
+        reference, t_ref = timed(databuild.synergy_powers_reference, formated_lane)
+        fast, t_fast = timed(databuild.compute_synergy_powers, formated_lane, repeat=3)
+        assert fast == reference, "compute_synergy_powers differs from the reference"
+        print(f"synergy_powers  {per_lane:4d}/lane  {len(fast):7d} pairs  "
+              f"loop {t_ref:8.3f}s  numpy {t_fast:7.3f}s  x{t_ref / t_fast:6.1f}")
+
+
+def bench_hitting_set(args):
+    for per_lane in args.per_lane:
+        lanes = synthetic_lanes(per_lane)
+        reference_lanes, fast_lanes = copy.deepcopy(lanes), copy.deepcopy(lanes)
+        reference, t_ref = timed(databuild.prune_reference, reference_lanes)
+        fast, t_fast = timed(databuild.prune_to_full_coverage, fast_lanes)
+        assert set(fast) == reference and fast_lanes == reference_lanes, \
+            "prune_to_full_coverage removes different champions than the reference"
+        _, t_verify = timed(databuild.verify_synergy_coverage, fast_lanes)
+        print(f"hitting_set     {per_lane:4d}/lane  {len(fast):7d} removed  "
+              f"sets {t_ref:8.3f}s  numpy {t_fast:7.3f}s  x{t_ref / t_fast:6.1f}  "
+              f"verify {t_verify:.3f}s")
+
+
+def bench_classification(args):
+    for per_lane in args.per_lane:
+        lanes = scored_lanes(per_lane)
+        reference_lanes, fast_lanes = copy.deepcopy(lanes), copy.deepcopy(lanes)
+        reference, t_ref = timed(databuild.score_lanes_reference, reference_lanes)
+        fast, t_fast = timed(databuild.score_lanes, fast_lanes, repeat=3)
+        assert fast == reference and fast_lanes == reference_lanes, \
+            "score_lanes differs from the reference"
+        pairs = sum(fast[3].values())
+        print(f"classification  {per_lane:4d}/lane  {pairs:7d} synergy entries  "
+              f"loop {t_ref:8.3f}s  numpy {t_fast:7.3f}s  x{t_ref / t_fast:6.1f}")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=Path(__file__).parent).stdout.strip() or None
+    except OSError: return None
+
+
+def generation_params(args):
+    return {"days": args.days, "regions": args.regions, "matches_per_day": args.matches_per_day,
+            "champions": args.champions, "lanes_per_champion": args.lanes_per_champion,
+            "seed": args.seed, "format": args.file_format}
+
+
+def generate(args, folder):
+    return synthetic_days(folder, args.days, [f"r{i}" for i in range(args.regions)],
+                          args.matches_per_day, args.champions, args.lanes_per_champion,
+                          args.seed, args.file_format)
+
+
+def bench_build(args):
+    params = generation_params(args)
+    with tempfile.TemporaryDirectory() as folder:
+        entries, t_generate = timed(generate, args, folder)
+        print(f"generated {args.days} days x {args.regions} regions, {entries} champion/lane entries "
+              f"in {t_generate:.1f}s")
+        profiler = databuild.StageProfiler(memory=args.memory)
+        with redirect_stdout(io.StringIO()):  # the build prints every champion
+            databuild.build_game_data(folder=folder, output=str(Path(folder) / "game_data.json"),
+                                      profiler=profiler)
+    profiler.report()
+
+    history = Path(args.history)
+    previous = None
+    if history.exists():
+        with open(history, "r", encoding="utf-8") as f:
+            runs = [json.loads(line) for line in f if line.strip()]
+        previous = next((run for run in reversed(runs)
+                         if run["params"] == params and run["memory"] == args.memory), None)
+    if previous:
+        print(f"vs {previous['commit']} ({previous['time']}):")
+        for name, stage in profiler.stages.items():
+            before = previous["stages"].get(name)
+            if before and before["seconds"]:
+                print(f"{name:15} {stage['seconds'] / before['seconds'] - 1:+8.1%}")
+
+    history.parent.mkdir(parents=True, exist_ok=True)
+    with open(history, "a", encoding="utf-8") as f:
+        f.write(json.dumps({
+            "time": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "commit": git_commit(), "python": platform.python_version(), "machine": platform.node(),
+            "params": params, "memory": args.memory,
+            "stages": profiler.stages, "total": round(profiler.total(), 4),
+        }) + "\n")
+
+
+def bench_load(args):
+    with tempfile.TemporaryDirectory() as folder:
+        generate(args, folder)
+        print(f"{args.days} days x {args.regions} regions of {args.file_format} day-files")
+
+        def load(processes):
+            return databuild.load_window(["winrate", "synergy"], args.days, args.days, folder,
+                                         purge_old=False, processes=processes)
+
+        fast_json = daystore.orjson
+        daystore.orjson = None
+        reference, t_json = timed(load, 1)
+        daystore.orjson = fast_json
+        runs = [("sequential, json", t_json)]
+        if fast_json is not None:
+            result, t_orjson = timed(load, 1)
+            assert all(list(a.items()) == list(b.items()) for a, b in zip(result, reference))
+            runs.append(("sequential, orjson", t_orjson))
+        result, t_pool = timed(load, args.processes)
+        assert all(list(a.items()) == list(b.items()) for a, b in zip(result, reference)), \
+            "the parallel loader differs from the sequential one"
+        runs.append((f"pool of {args.processes or os.cpu_count()}", t_pool))
+    for name, seconds in runs:
+        print(f"load  {name:20} {seconds:7.3f}s  x{t_json / seconds:5.2f}")
+
+
+def synthetic_matches(count, seed=0, off_lane=0.1):
+    """ match-v5 participant lists: 10 distinct real champions, mostly in their usual lane order """
+    rng = random.Random(seed)
+    names = [name for name in champion_ids().names if name is not None]
+    matches = []
+    for _ in range(count):
+        winner = rng.choice((100, 200))
+        participants = []
+        for i, name in enumerate(rng.sample(names, 10)):
+            lane = LANES[i % 5] if rng.random() > off_lane else rng.choice(daystore.LANES)
+            team = 100 if i < 5 else 200
+            participants.append({"championName": name, "teamPosition": lane,
+                                 "teamId": team, "win": team == winner})
+        matches.append(participants)
+    return matches
+
+
+def bench_counters(args):
+    from counters import MatchCounters, count_reference
+    matches = synthetic_matches(args.matches, args.seed)
+    (*reference, reference_deltas), t_dict = timed(count_reference, matches, args.save_every)
+
+    def count():
+        counters, deltas = MatchCounters(), []
+        for n, participants in enumerate(matches, 1):
+            counters.add_match(participants)
+            if n % args.save_every == 0 or n == len(matches): deltas.append(counters.flush())
+        return counters, deltas
+    (counters, deltas), t_numpy = timed(count)
+    result, t_export = timed(counters.to_dicts)
+    assert all(list(a.items()) == list(b.items()) for a, b in zip(result, reference)), \
+        "MatchCounters differs from the dict counters"
+    assert json.dumps(deltas) == json.dumps(reference_deltas), "the log deltas differ"
+    reloaded, t_load = timed(lambda: MatchCounters().load(*reference))
+    roundtrip = MatchCounters()
+    roundtrip.load(*reference)
+    assert roundtrip.to_dicts() == result, "to_dicts/load is not lossless"
+
+    print(f"{args.matches} matches, a save every {args.save_every}: "
+          f"{len(reference[0])} winrate and {len(reference[1])} synergy keys")
+    print(f"counters  dicts {t_dict:7.3f}s  numpy {t_numpy:7.3f}s  x{t_dict / t_numpy:5.2f}  "
+          f"({t_numpy / args.matches * 1e6:.1f}us/match)")
+    print(f"counters  to_dicts {t_export:7.3f}s  load {t_load:7.3f}s")
+
+    # Memory held by the day's counts, the deltas left out
+    import tracemalloc
+    tracemalloc.start()
+    for name, make in (("dicts", lambda: count_reference(matches, len(matches))[:2]),
+                       ("numpy", lambda: count()[0])):
+        before = tracemalloc.get_traced_memory()[0]
+        state = make()
+        if name == "numpy": state.apply()
+        held = tracemalloc.get_traced_memory()[0] - before
+        print(f"counters  {name} hold {held / 2**20:6.1f} MiB")
+        del state
+    tracemalloc.stop()
+
+
+BENCHMARKS = {
+    "synergy_powers": bench_synergy_powers,
+    "hitting_set": bench_hitting_set,
+    "classification": bench_classification,
+    "load": bench_load,
+    "build": bench_build,
+    "counters": bench_counters,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("benchmark", choices=list(BENCHMARKS) + ["generate"])
+    parser.add_argument("--per-lane", type=int, nargs="+", default=[45, 90],
+                        help="Champions per lane; 45 is about the current pool (default: 45 90)")
+    parser.add_argument("--days", type=int, default=28, help="Day-files per region (default: 28)")
+    parser.add_argument("--regions", type=int, default=3)
+    parser.add_argument("--matches-per-day", type=int, default=5000, help="Per region (default: 5000)")
+    parser.add_argument("--champions", type=int, help="Use only this many champions (default: all)")
+    parser.add_argument("--lanes-per-champion", type=float, default=1.6)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--file-format", choices=["json", "npy"], default="json")
+    parser.add_argument("--processes", type=int, help="load: pool size (default: one per CPU)")
+    parser.add_argument("--memory", action="store_true",
+                        help="build: also trace the memory peak per stage (slows the load down)")
+    parser.add_argument("--history", default=str(Path(__file__).parent / "bench_history.jsonl"),
+                        help="build: file the runs are appended to")
+    parser.add_argument("--out", help="generate: folder to write the day-files to")
+    parser.add_argument("--matches", type=int, default=20000, help="counters: matches to count")
+    parser.add_argument("--save-every", type=int, default=20,
+                        help="counters: matches between two flushes to the delta log")
+    args = parser.parse_args()
+    if args.benchmark == "generate":
+        if not args.out: parser.error("generate needs --out")
+        print(f"{generate(args, args.out)} champion/lane entries written to {args.out}")
+    else: BENCHMARKS[args.benchmark](args)
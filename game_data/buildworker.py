@@ -0,0 +1,136 @@
+import os
+import sys
+import json
+import time
+import signal
+import threading
+import subprocess
+from pathlib import Path
+
+'''
+    Background builds of game_data.json, off the crawl path.
+
+    Collectors call request() when day-files are complete (a day rolled
+    over, or at startup); it only rewrites build_request.json with the
+    time and the region asking. The worker (`databuild.py worker`) polls
+    that file and builds once per newer request. Requests that arrive
+    within `settle` seconds of each other, or while a build runs, are
+    coalesced into one build.
+
+    The worker keeps build_status.json up to date:
+        {"state": "idle" | "building" | "failed", "pid", "heartbeat",
+         "requested", "requested_by", "started", "finished", "seconds",
+         "error", "builds", "failures"}
+    heartbeat is rewritten every poll, during builds too, so a status
+    older than STALE_AFTER seconds means no worker is running.
+    ensure_worker() starts one in that case, and only one worker holds
+    build_worker.pid at a time.
+'''
+
+REQUEST_PATH = Path("game_data/build_request.json")
+STATUS_PATH = Path("game_data/build_status.json")
+PID_PATH = Path("game_data/build_worker.pid")
+STALE_AFTER = 60
+
+
+def read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f: return json.load(f)
+    except (OSError, ValueError): return None
+
+
+def write_json(obj, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f: json.dump(obj, f)
+    os.replace(tmp_path, path)
+
+
+def request(by):
+    write_json({"requested": time.time(), "requested_by": by}, REQUEST_PATH)
+
+
+def status():
+    return read_json(STATUS_PATH)
+
+
+def alive(worker_status=None):
+    worker_status = worker_status or status()
+    return worker_status is not None and time.time() - worker_status.get("heartbeat", 0) < STALE_AFTER
+
+
+def ensure_worker():
+    """ Start `databuild.py worker` if none is running; returns the Popen or None """
+    if alive(): return None
+    return subprocess.Popen([sys.executable, "-u", str(Path(__file__).with_name("databuild.py")), "worker"])
+
+
+def claim():
+    """ Take build_worker.pid, unless a live worker holds it """
+    try:
+        fd = os.open(PID_PATH, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        if alive(): return False
+        fd = os.open(PID_PATH, os.O_CREAT | os.O_TRUNC | os.O_WRONLY)  # left by a dead worker
+    with os.fdopen(fd, "w") as f: f.write(str(os.getpid()))
+    return True
+
+
+def work(build, poll=5, settle=10):
+    """ Run build() for every new request until interrupted """
+    PID_PATH.parent.mkdir(parents=True, exist_ok=True)
+    if not claim():
+        print("A build worker is already running")
+        return
+    state = status() or {}
+    state.update({"state": state.get("state", "idle"), "pid": os.getpid(),
+                  "builds": state.get("builds", 0), "failures": state.get("failures", 0)})
+    if state["state"] == "building": state["state"] = "failed"  # the last worker died mid-build
+    handled = state.get("requested") or 0
+    lock = threading.Lock()
+    stopped = threading.Event()
+
+    def update(**changes):
+        with lock:
+            state.update(changes, heartbeat=time.time())
+            write_json(state, STATUS_PATH)
+
+    def heartbeat():
+        # From a thread, so a long build does not look like a dead worker
+        while not stopped.wait(poll): update()
+
+    update()
+    threading.Thread(target=heartbeat, daemon=True).start()
+    print(f"Build worker {os.getpid()} waiting for requests")
+    try:
+        while True:
+            pending = read_json(REQUEST_PATH)
+            if pending is None or pending["requested"] <= handled:
+                time.sleep(poll)
+                continue
+
+            # Let the other collectors' requests for the same rollover catch up
+            while time.time() - pending["requested"] < settle:
+                time.sleep(min(poll, settle))
+                pending = read_json(REQUEST_PATH) or pending
+            handled = pending["requested"]
+            start = time.time()
+            update(**pending, state="building", started=start)
+            print(f"Building game_data.json, requested by {pending['requested_by']}")
+            try:
+                build()
+                result = {"state": "idle", "error": None, "builds": state["builds"] + 1}
+            except Exception as e:
+                result = {"state": "failed", "error": f"{type(e).__name__}: {e}",
+                          "failures": state["failures"] + 1}
+                print(f"Build failed: {result['error']}")
+            update(**result, finished=time.time(), seconds=round(time.time() - start, 3))
+            print(f"Build {state['state']} after {state['seconds']:.1f}s")
+    except KeyboardInterrupt: pass
+    finally:
+        signal.signal(signal.SIGINT, signal.SIG_IGN)  # a second Ctrl-C must not cut the cleanup short
+        stopped.set()
+        with lock:
+            state["heartbeat"] = 0  # so the next ensure_worker() need not wait STALE_AFTER
+            write_json(state, STATUS_PATH)
+        PID_PATH.unlink(missing_ok=True)
@@ -0,0 +1,223 @@
+import numpy as np
+from collections import Counter
+from daystore import champion_ids, LANES, LANE_IDS
+
+'''
+    The crawler's daily winrate/synergy counts as dense NumPy arrays.
+
+    A winrate cell is (champion, lane) and a synergy cell is
+    (champion1, champion2, lane1, lane2), with champions interned through
+    champion_ids.json and lanes through daystore.LANES; each cell holds
+    [wins, losses]. A synergy pair is stored the way datagen always keyed
+    it: the smaller (lane, champion) first.
+
+    add_match() only computes a match's 30 cell indices (cell * 2, plus 1
+    for a loss) and queues them. flush() turns the queue into the delta
+    log's {"w": {key: [w, l]}, "s": ...} delta and hands it on to the
+    arrays, which take it in batches of APPLY_BATCH with one scatter-add.
+    Cells are also kept in the order they were first counted, so
+    to_dicts() gives the same JSON day-file dicts as the dict counters it
+    replaces, key order included; load() reads them back. Key strings are
+    only made for a delta or a snapshot.
+'''
+
+KINDS = ("w", "s")
+APPLY_BATCH = 1 << 16
+
+
+class MatchCounters:
+    def __init__(self, headroom=16):
+        self.ids = champion_ids()
+        self.headroom = headroom
+        self.capacity = len(self.ids.names) + headroom  # champion axis of the arrays
+        self.counts = {kind: self.empty(kind) for kind in KINDS}
+        self.present = {kind: np.zeros(len(self.counts[kind]), dtype=bool) for kind in KINDS}
+        self.order = {kind: [] for kind in KINDS}      # cells in first-count order
+        self.queued = {kind: [] for kind in KINDS}     # since the last flush
+        self.unapplied = {kind: [] for kind in KINDS}  # flushed, not in the arrays yet
+
+    def empty(self, kind):
+        cells = self.capacity * len(LANES) * (1 if kind == "w" else self.capacity * len(LANES))
+        return np.zeros((cells, 2), dtype=np.uint32)
+
+    def __len__(self):
+        return len(self.order["w"]) + len(self.order["s"])
+
+    def champion(self, name):
+        i = self.ids.ids.get(name)
+        if i is None: i = self.ids.intern(name)
+        if i >= self.capacity: self.grow(i + 1 + self.headroom)
+        return i
+
+    def keys(self, kind, cells):
+        """ Day-file keys of an array of cells """
+        names, lanes = self.ids.names, len(LANES)
+        if kind == "w":
+            champs, lane_ids = np.divmod(cells, lanes)
+            return [f"{names[c]}+{LANES[l]}" for c, l in zip(champs.tolist(), lane_ids.tolist())]
+        pairs, lane_pairs = np.divmod(cells, lanes * lanes)
+        columns = [c.tolist() for c in (*np.divmod(pairs, self.capacity), *np.divmod(lane_pairs, lanes))]
+        return [f"{names[c1]}+{names[c2]}+{LANES[l1]}+{LANES[l2]}" for c1, c2, l1, l2 in zip(*columns)]
+
+    def cell(self, kind, key):
+        """ The cell of a day-file key; its champions must be interned already """
+        ids, lanes = self.ids.ids, len(LANES)
+        if kind == "w":
+            champ, lane = key.split("+")
+            return ids[champ] * lanes + LANE_IDS[lane]
+        champ1, champ2, lane1, lane2 = key.split("+")
+        return ((ids[champ1] * self.capacity + ids[champ2]) * lanes + LANE_IDS[lane1]) * lanes + LANE_IDS[lane2]
+
+    def see(self, kind, cells):
+        """ Append the cells not counted before to the order, first appearance first """
+        cells = cells[~self.present[kind][cells]]
+        if not len(cells): return
+        _, first = np.unique(cells, return_index=True)
+        cells = cells[np.sort(first)]
+        self.present[kind][cells] = True
+        self.order[kind] += cells.tolist()
+
+    def grow(self, capacity):
+        """ A champion id beyond the champion axis: re-lay the arrays on a longer one """
+        self.apply()
+        old, lanes = self.capacity, len(LANES)
+
+        def relay(cells):
+            pairs, lane_pairs = np.divmod(cells, lanes * lanes)
+            champ1, champ2 = np.divmod(pairs, old)
+            return (champ1 * capacity + champ2) * lanes * lanes + lane_pairs
+
+        cells = np.asarray(self.order["s"], dtype=np.int64)
+        queued = np.asarray(self.queued["s"], dtype=np.int64)
+        winrates, synergy = self.counts["w"], self.counts["s"][cells]
+        self.capacity = capacity
+        self.counts = {kind: self.empty(kind) for kind in KINDS}
+        self.present = {kind: np.zeros(len(self.counts[kind]), dtype=bool) for kind in KINDS}
+        self.counts["w"][:len(winrates)] = winrates  # (champion, lane) cells keep their index
+        self.present["w"][self.order["w"]] = True
+        cells = relay(cells)
+        self.counts["s"][cells] = synergy
+        self.present["s"][cells] = True
+        self.order["s"] = cells.tolist()
+        self.queued["s"] = (relay(queued >> 1) * 2 + (queued & 1)).tolist()
+        print(f"Counters grown from {old} to {capacity} champions")
+
+    def add_match(self, participants):
+        """ Queue the counts of one match's participants (match-v5 info.participants) """
+        lanes = len(LANES)
+        teams = {100: [], 200: []}
+        winrate = self.queued["w"]
+        for p in participants:
+            champ, lane = self.champion(p['championName']), LANE_IDS[p['teamPosition']]
+            loss = 0 if p['win'] else 1
+            winrate.append((champ * lanes + lane) * 2 + loss)
+            teams[p['teamId']].append(((p['teamPosition'], p['championName']), champ, lane, loss))
+
+        capacity = self.capacity  # after interning, which may have grown it
+        synergy = self.queued["s"]
+        for team in teams.values():
+            for i, (key1, champ1, lane1, loss) in enumerate(team):
+                for key2, champ2, lane2, _ in team[i + 1:]:
+                    if key1 <= key2: cell = ((champ1 * capacity + champ2) * lanes + lane1) * lanes + lane2
+                    else: cell = ((champ2 * capacity + champ1) * lanes + lane2) * lanes + lane1
+                    synergy.append(cell * 2 + loss)
+
+    def flush(self):
+        """ Hand the queued counts to the arrays; returns them as a delta-log delta """
+        delta = {}
+        for kind in KINDS:
+            queued, self.queued[kind] = self.queued[kind], []
+            if not queued:
+                delta[kind] = {}
+                continue
+            # Counter keeps first-appearance order, the order the dicts had
+            tally = Counter(queued)
+            entries = np.fromiter(tally, dtype=np.int64, count=len(tally))
+            cells, first = np.unique(entries >> 1, return_index=True)
+            cells = cells[np.argsort(first)]
+            self.see(kind, cells)
+            counts = dict.fromkeys(cells.tolist())
+            for cell in counts: counts[cell] = [0, 0]
+            for entry, n in tally.items(): counts[entry >> 1][entry & 1] += n
+            delta[kind] = dict(zip(self.keys(kind, cells), counts.values()))
+            self.unapplied[kind] += queued
+            if len(self.unapplied[kind]) >= APPLY_BATCH: self.apply(kind)
+        return delta
+
+    def apply(self, *kinds):
+        for kind in kinds or KINDS:
+            if not self.unapplied[kind]: continue
+            entries = np.asarray(self.unapplied[kind], dtype=np.int64)
+            self.unapplied[kind] = []
+            np.add.at(self.counts[kind].reshape(-1), entries, 1)
+
+    def to_dicts(self):
+        """ (winrates, synergy) in the JSON day-file schema; queued counts are flushed first """
+        self.flush()
+        self.apply()
+        result = []
+        for kind in KINDS:
+            cells = np.asarray(self.order[kind], dtype=np.int64)
+            counts = self.counts[kind][cells].tolist()
+            result.append({key: {"wins": w, "losses": l} for key, (w, l) in zip(self.keys(kind, cells), counts)})
+        return tuple(result)
+
+    def load(self, winrates, synergy):
+        """ Add day-file style dicts (e.g. DeltaLog.load()) to the counts """
+        for key in winrates: self.champion(key.split("+")[0])
+        for key in synergy:
+            for name in key.split("+")[:2]: self.champion(name)
+        for kind, day in zip(KINDS, (winrates, synergy)):
+            if not day: continue
+            cells = np.array([self.cell(kind, key) for key in day], dtype=np.int64)
+            self.see(kind, cells)
+            values = np.array([[v["wins"], v["losses"]] for v in day.values()], dtype=np.uint32)
+            np.add.at(self.counts[kind], cells, values)
+
+    def clear(self):
+        for kind in KINDS:
+            self.counts[kind][self.order[kind]] = 0
+            self.present[kind][self.order[kind]] = False
+            self.order[kind] = []
+            self.queued[kind] = []
+            self.unapplied[kind] = []
+
+def count_reference(matches, save_every=50):
+    """
+    What datagen's dict counters gave for `matches`: (winrates, synergy,
+    deltas), one delta per `save_every` matches. Kept for the benchmark.
+    """
+    from collections import defaultdict
+    from deltalog import champ_dict, pair
+
+    def normalize_key(champ1, champ2, lane1, lane2):
+        direction = (lane1, champ1) <= (lane2, champ2)
+        if direction: return f"{champ1}+{champ2}+{lane1}+{lane2}"
+        else: return f"{champ2}+{champ1}+{lane2}+{lane1}"
+
+    winrates, synergy = defaultdict(champ_dict), defaultdict(champ_dict)
+    deltas, pending = [], {"w": defaultdict(pair), "s": defaultdict(pair)}
+
+    def count(kind, key, win):
+        counts = winrates if kind == "w" else synergy
+        counts[key]["wins" if win else "losses"] += 1
+        pending[kind][key][0 if win else 1] += 1
+
+    for n, participants in enumerate(matches, 1):
+        teams = {100: [], 200: []}
+        for p in participants:
+            champ = p['championName']
+            lane = p['teamPosition']
+            count("w", f"{champ}+{lane}", p['win'])
+            teams[p['teamId']].append((champ, lane, p['win']))
+
+        for team_champs in teams.values():
+            for i in range(len(team_champs)):
+                for j in range(i + 1, len(team_champs)):
+                    champ1, lane1, win = team_champs[i]
+                    champ2, lane2, _ = team_champs[j]
+                    count("s", normalize_key(champ1, champ2, lane1, lane2), win)
+        if n % save_every == 0 or n == len(matches):
+            deltas.append(pending)
+            pending = {"w": defaultdict(pair), "s": defaultdict(pair)}
+    return winrates, synergy, deltas
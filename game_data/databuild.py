@@ -1,13 +1,25 @@
 import io
+import os
 import sys
 import math
 import json
+import time
+import heapq
+import argparse
 import itertools
+import tracemalloc
 import numpy as np
 from pathlib import Path
 from scipy.stats import norm
 from collections import defaultdict
+from contextlib import contextmanager, nullcontext
 from datetime import datetime, timedelta, timezone
+from daystore import day_files, read_day, write_day, merge, to_dict, read_parallel, merge_parallel
+from gamedata import top_synergy_powers, compact_files, publish
+from handtables import build_hand_tables
+
+TOP_K = 500  # synergy_powers entries kept in the compact output's sidecar
+PARALLEL_FILES = 4  # fewer day-files than this are read without a process pool
 
 # Force stdout/stderr to UTF-8 (regardless of Node/concurrently/env settings)
 try:
@@ -18,60 +30,243 @@ except AttributeError:
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
-def champ_dict(): return {"wins": 0, "losses": 0}
 
-def load_last_n_days(prefix: str, days: int, dayspurge: int, folder: str = ".", *,
-                     purge_old: bool = True):
+class StageProfiler:
+    '''
+        Wall time and tracemalloc peak of each build stage:
+            profiler = StageProfiler()
+            build_game_data(profiler=profiler)
+            profiler.report()
+        Tracing allocations slows Python-heavy stages down; pass
+        memory=False for timings comparable to an unprofiled build.
+    '''
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.stages = {}  # name -> {"seconds", "peak_mb"}
+
+    @contextmanager
+    def stage(self, name):
+        started_tracing = self.memory and not tracemalloc.is_tracing()
+        if started_tracing: tracemalloc.start()
+        if self.memory: tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try: yield
+        finally:
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] / 2**20 if self.memory else None
+            if started_tracing: tracemalloc.stop()
+            self.stages[name] = {"seconds": round(seconds, 4), "peak_mb": peak and round(peak, 2)}
+
+    def total(self):
+        return sum(stage["seconds"] for stage in self.stages.values())
+
+    def report(self):
+        for name, stage in self.stages.items():
+            peak = f"{stage['peak_mb']:9.1f} MB" if stage["peak_mb"] is not None else ""
+            print(f"{name:15} {stage['seconds']:9.3f}s {peak}".rstrip())
+        print(f"{'total':15} {self.total():9.3f}s")
+
+def window_files(prefix: str, days: int, dayspurge: int, folder: str = "."):
+    """
+    Split the day-files of `prefix` into those inside the last `days` days
+    and those older than `dayspurge` days, each as {stem: (file, date)}.
+    """
     now = datetime.now(timezone.utc)
     start_date = now - timedelta(days=days)
     purge_date = now - timedelta(days=dayspurge)
-    merged = defaultdict(champ_dict)
-    folder_path = Path(folder)
+    in_window, outdated = {}, {}
 
-    for file in folder_path.glob(f"*{prefix}_*.json"):
-        date_part = file.stem.split("_")[-1]
+    for stem, file in day_files(prefix, folder).items():
+        date_part = stem.split("_")[-1]
         try:
             file_date = datetime.strptime(date_part, "%Y-%m-%d").replace(tzinfo=timezone.utc)
         except ValueError:
             print(f"Skipping {file.name}: date not parseable")
             continue
 
-        if file_date < start_date:
-            if purge_old and file_date < purge_date:
-                try:
-                    file.unlink()
-                    print(f"Deleted outdated file {file.name}")
-                except Exception as e:
-                    print(f"Could not delete {file.name}: {e}")
-            continue
-
+        if file_date >= start_date: in_window[stem] = (file, file_date)
+        elif file_date < purge_date: outdated[stem] = (file, file_date)
+
+    return in_window, outdated
+
+def purge_files(outdated: dict):
+    for file, _ in outdated.values():
+        for copy in (file.with_suffix(".json"), file.with_suffix(".npy")):
+            if not copy.exists(): continue
+            try:
+                copy.unlink()
+                print(f"Deleted outdated file {copy.name}")
+            except Exception as e:
+                print(f"Could not delete {copy.name}: {e}")
+
+def parallel(files, processes):
+    return (processes or os.cpu_count() or 1) > 1 and len(files) >= PARALLEL_FILES
+
+def read_days(files, prefix: str, processes=None):
+    files = list(files)
+    if parallel(files, processes):
+        return [a for a in read_parallel(files, prefix, processes) if a is not None]
+    arrays = []
+    for file in files:
         try:
-            with file.open("r", encoding="utf-8") as f:  # 👈 force utf-8
-                data = json.load(f)
-            for key, value in data.items():
-                merged[key]["wins"]   += value.get("wins",   0)
-                merged[key]["losses"] += value.get("losses", 0)
+            arrays.append(read_day(file, prefix))
         except Exception as e:
             print(f"Skipping {file.name}: {e}")
+    return arrays
 
-    return merged
+def load_last_n_days(prefix: str, days: int, dayspurge: int, folder: str = ".", *,
+                     purge_old: bool = True, processes=None):
+    return load_window([prefix], days, dayspurge, folder, purge_old=purge_old,
+                       processes=processes)[0]
+
+def load_window(prefixes, days: int, dayspurge: int, folder: str = ".", *,
+                purge_old: bool = True, processes=None):
+    """
+    load_last_n_days() of several prefixes; their files are parsed and
+    merged together on one process pool (see daystore.merge_parallel)
+    """
+    jobs = []
+    for prefix in prefixes:
+        in_window, outdated = window_files(prefix, days, dayspurge, folder)
+        if purge_old: purge_files(outdated)
+        jobs.append(([file for file, _ in in_window.values()], prefix))
+    if parallel([file for files, _ in jobs for file in files], processes):
+        merged = merge_parallel(jobs, processes)
+    else: merged = [merge(read_days(files, prefix, 1), prefix) for files, prefix in jobs]
+    return [to_dict(array, prefix) for array, (_, prefix) in zip(merged, jobs)]
+
+'''
+    Rolling aggregate: the summed counts of every complete day in the window
+    are kept in {folder}/rolling/{prefix}.npy, with a manifest of the
+    day-files they contain. A build adds the days that entered the window,
+    subtracts the ones that left it and only reads today's partial files in
+    full, so preparing the input costs O(one day) instead of O(window).
+'''
+
+def day_signature(array):
+    return [int(len(array)), int(array["wins"].sum()), int(array["losses"].sum())]
+
+def file_stat(file: Path):
+    stat = file.stat()
+    return [file.name, stat.st_size, stat.st_mtime_ns]
+
+def load_rolling(prefix: str, days: int, dayspurge: int, folder: str = ".", *,
+                 purge_old: bool = True, processes=None):
+    rolling_dir = Path(folder) / "rolling"
+    aggregate_path = rolling_dir / f"{prefix}.npy"
+    manifest_path = rolling_dir / f"{prefix}_manifest.json"
+
+    in_window, outdated = window_files(prefix, days, dayspurge, folder)
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    complete = {stem: file for stem, (file, date) in in_window.items()
+                if date.strftime("%Y-%m-%d") < today}
+    partial = [file for stem, (file, _) in in_window.items() if stem not in complete]
+
+    manifest = {}
+    aggregate = None
+    if aggregate_path.exists() and manifest_path.exists():
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        aggregate = np.load(aggregate_path)
+        manifest = saved["days"]
+        # Crash between writing the two files: start over
+        if day_signature(aggregate) != saved["aggregate"]: aggregate = None
+
+    arrays, signs = [], []
+    changed = rebuild = aggregate is None
+    for stem, entry in manifest.items():
+        if rebuild: break
+        file = complete.get(stem)
+        if file is not None and file_stat(file) == entry["file"]: continue
+        changed = True
+        try:
+            if file is not None:
+                # Same day rewritten, e.g. converted to .npy: fine if the counts agree
+                if day_signature(read_day(file, prefix)) != entry["signature"]:
+                    rebuild = True
+                entry["file"] = file_stat(file)
+                continue
+            # Left the window: subtract it while the file is still on disk
+            old = Path(folder) / entry["file"][0]
+            if not old.exists() or file_stat(old) != entry["file"]: rebuild = True
+            else:
+                arrays.append(read_day(old, prefix))
+                signs.append(-1)
+        except Exception as e:
+            print(f"Could not read {stem}: {e}")
+            rebuild = True
+
+    if rebuild:
+        print(f"Rebuilding rolling {prefix} aggregate")
+        manifest, arrays, signs = {}, [], []
+        aggregate = None
+
+    # Days read in full: those new to the aggregate (all of them after a
+    # rebuild) and today's, on a process pool when there are enough
+    to_read = [file for stem, file in complete.items() if stem not in manifest] + partial
+    prefetched = None
+    if parallel(to_read, processes):
+        prefetched = dict(zip(to_read, read_parallel(to_read, prefix, processes)))
+
+    for stem, file in complete.items():
+        if stem in manifest: continue
+        if prefetched is not None:
+            array = prefetched[file]
+            if array is None: continue
+        else:
+            try: array = read_day(file, prefix)
+            except Exception as e:
+                print(f"Skipping {file.name}: {e}")
+                continue
+        arrays.append(array)
+        signs.append(1)
+        manifest[stem] = {"file": file_stat(file), "signature": day_signature(array)}
+        changed = True
+    manifest = {stem: entry for stem, entry in manifest.items() if stem in complete}
+
+    if changed:
+        if arrays:
+            if aggregate is not None:
+                arrays.insert(0, aggregate)
+                signs.insert(0, 1)
+            aggregate = merge(arrays, prefix, signs)
+        elif aggregate is None: aggregate = merge([], prefix)
+        write_day(aggregate, aggregate_path)
+        tmp_path = f"{manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"aggregate": day_signature(aggregate), "days": manifest}, f, indent=2)
+        os.replace(tmp_path, manifest_path)
+
+    if purge_old: purge_files(outdated)
+    if prefetched is not None: today_arrays = [prefetched[f] for f in partial if prefetched[f] is not None]
+    else: today_arrays = read_days(partial, prefix, 1)
+    return to_dict(merge([aggregate, *today_arrays], prefix), prefix)
+
+def coverage_matrix(lanes):
+    """
+    The champion-role pool of `lanes` in iteration order, and two boolean
+    matrices over it: `required` marks the pairs that need synergy data
+    (different champion, different role), `covered` the pairs listed in
+    both champions' synergy maps.
+    """
+    pool = [(champ, role) for role, champions in lanes.items() for champ in champions]
+    index = {cr: i for i, cr in enumerate(pool)}
+    name_ids, role_ids = {}, {}
+    names = np.array([name_ids.setdefault(champ, len(name_ids)) for champ, _ in pool])
+    roles = np.array([role_ids.setdefault(role, len(role_ids)) for _, role in pool])
+    required = (names[:, None] != names[None, :]) & (roles[:, None] != roles[None, :])
+
+    listed = np.zeros_like(required)
+    for i, (champ, role) in enumerate(pool):
+        for srole, schampions in lanes[role][champ]['s'].items():
+            columns = [index[(s, srole)] for s in schampions if (s, srole) in index]
+            listed[i, columns] = True
+    return pool, required, listed & listed.T
 
 def verify_synergy_coverage(lanes):
-    remaining = [(c, l) for l in lanes for c in lanes[l]]
-    missing = []
-
-    for i in range(len(remaining)):
-        champ1, lane1 = remaining[i]
-        for j in range(i + 1, len(remaining)):
-            champ2, lane2 = remaining[j]
-            if champ1 == champ2: continue
-            if lane1 == lane2: continue
-            # Check both directions
-            valid = (
-                champ2 in lanes[lane1][champ1]['s'][lane2] and
-                champ1 in lanes[lane2][champ2]['s'][lane1]
-            )
-            if not valid: missing.append((champ1, lane1, champ2, lane2))
+    pool, required, covered = coverage_matrix(lanes)
+    rows, cols = np.nonzero(np.triu(required & ~covered, 1))
+    missing = [(*pool[i], *pool[j]) for i, j in zip(rows.tolist(), cols.tolist())]
 
     if not missing:
         print("✅ Full synergy coverage verified.")
@@ -82,24 +277,208 @@ def verify_synergy_coverage(lanes):
         if len(missing) > 10: print("  ...more not shown.")
         return False, missing
 
+def hitting_set(required, unsatisfied, games):
+    """
+    Indices of the pool to remove so that no `unsatisfied` pair remains:
+    the one with the most unsatisfied pairs first, fewer games on a tie.
+    """
+    # A removal lowers the count of every remaining partner, satisfied pair
+    # or not, never below 0. Champions enter the running only once they had
+    # an unsatisfied pair or lost a partner.
+    count = unsatisfied.sum(axis=1)
+    candidate = count > 0
+    alive = np.ones(len(games), dtype=bool)
+    unsatisfied_left = int(count.sum()) // 2
+
+    # Max-heap on (count, -games, -pool index) with lazy deletion: counts only
+    # go down, so a stale entry is re-pushed with its current count
+    heap = [(-c, g, i) for i, (c, g) in enumerate(zip(count.tolist(), games))]
+    heapq.heapify(heap)
+    removed = []
+    while unsatisfied_left:
+        parked = []
+        while True:
+            c, g, i = heapq.heappop(heap)
+            if not alive[i]: continue
+            if -c != count[i]: heapq.heappush(heap, (-int(count[i]), g, i))
+            elif not candidate[i]: parked.append((c, g, i))
+            else: break
+        for entry in parked: heapq.heappush(heap, entry)
+
+        alive[i] = False
+        removed.append(i)
+        unsatisfied_left -= int((unsatisfied[i] & alive).sum())
+        partners = required[i] & alive
+        count[partners] = np.maximum(count[partners] - 1, 0)
+        candidate |= partners
+    return removed
+
+def prune_to_full_coverage(lanes):
+    '''
+        All champions need to have data with all other champions in other roles.
+        We remove champions until our data is correct.
+        This is a Heuristic Hitting Set Algorithm, see hitting_set().
+        Returns the removed (champion, role) in order.
+    '''
+    pool, required, covered = coverage_matrix(lanes)
+    games = [lanes[role][champ]['g'] for champ, role in pool]
+    removed = [pool[i] for i in hitting_set(required, required & ~covered, games)]
+    for champ, role in removed: del lanes[role][champ]
+
+    # Clean up synergies
+    for lane, champions in lanes.items():
+        for champion in champions.values():
+            for slane, schampions in champion['s'].items():
+                for schampion in list(schampions.keys()):
+                    if schampion not in lanes[slane]:
+                        del champion['s'][slane][schampion]
+    return removed
+
+class ThresholdSweep:
+    '''
+        Champions left after the hitting set for many synergy `min_games`
+        cutoffs. The data is parsed once into the pool and a matrix of the
+        games played by every pair; the pair edges are sorted by games, so
+        walking the cutoffs upwards only flips the edges that fell below the
+        new cutoff to unsatisfied before running the hitting set.
+    '''
+    def __init__(self, winrate_data, synergy_data):
+        lanes, _ = parse_lanes(winrate_data, {})
+        self.pool, self.required, _ = coverage_matrix(lanes)
+        self.games = [lanes[role][champ]['g'] for champ, role in self.pool]
+        index = {cr: i for i, cr in enumerate(self.pool)}
+
+        rows, cols, pair_games = [], [], []
+        for champion1, champion2, lane1, lane2, v in synergy_rows(synergy_data, lanes):
+            rows.append(index[(champion1, lane1)])
+            cols.append(index[(champion2, lane2)])
+            pair_games.append(v['wins'] + v['losses'])
+        # A pair stored under both key orders is covered by its larger count
+        edge_games = np.full(self.required.shape, -1, dtype=np.int64)  # -1: no data
+        np.maximum.at(edge_games, (rows, cols), pair_games)
+        edge_games = np.maximum(edge_games, edge_games.T)
+
+        i, j = np.nonzero(np.triu(self.required, 1))
+        order = np.argsort(edge_games[i, j], kind="stable")
+        self.edges = i[order], j[order]
+        self.edge_games = edge_games[i, j][order]
+
+    def remaining(self, thresholds):
+        """ {min_games: champions remaining} for every cutoff in `thresholds` """
+        unsatisfied = np.zeros_like(self.required)
+        flipped = 0
+        result = {}
+        for threshold in sorted(set(thresholds)):
+            end = int(np.searchsorted(self.edge_games, threshold, side="left"))
+            i, j = self.edges[0][flipped:end], self.edges[1][flipped:end]
+            unsatisfied[i, j] = unsatisfied[j, i] = True
+            flipped = end
+            removed = hitting_set(self.required, unsatisfied, self.games)
+            result[threshold] = len(self.pool) - len(removed)
+        return result
+
+    def sweep(self, thresholds, processes=None):
+        """ remaining() for `thresholds`, split over a process pool if `processes` > 1 """
+        thresholds = sorted(set(thresholds))
+        if not processes or processes <= 1: return self.remaining(thresholds)
+        from concurrent.futures import ProcessPoolExecutor
+        # Interleaved chunks keep the slow low and fast high cutoffs balanced
+        chunks = [thresholds[k::processes] for k in range(processes)]
+        result = {}
+        with ProcessPoolExecutor(processes) as pool:
+            for part in pool.map(self.remaining, [c for c in chunks if c]):
+                result.update(part)
+        return dict(sorted(result.items()))
+
+def prune_reference(lanes):
+    """ The set-based hitting set prune_to_full_coverage replaced, kept for benchmarks """
+    # We use role variable to not clash with lane variable names
+
+    # Preprocess
+    champion_role_pool = [(champ, role) 
+                          for role, champions in lanes.items() 
+                          for champ in champions]
+    games_played = { (champ, role): lanes[role][champ]['g'] 
+                    for champ, role in champion_role_pool }
+
+    # Build all inter-role synergy pairs and reverse index
+    required_synergy_pairs = set()
+    pairs_by_champion = defaultdict(set)
+    for (c1, r1), (c2, r2) in itertools.combinations(champion_role_pool, 2):
+        if c1 == c2 or r1 == r2: continue
+        pair = ((c1, r1), (c2, r2))
+        required_synergy_pairs.add(pair)
+        pairs_by_champion[(c1, r1)].add(pair)
+        pairs_by_champion[(c2, r2)].add(pair)
+
+    # Function to check if a synergy is satisfied
+    def is_synergy_ok(pair1, pair2):
+        (c1, r1) = pair1
+        (c2, r2) = pair2
+        return (
+            c2 in lanes[r1][c1]['s'][r2] and
+            c1 in lanes[r2][c2]['s'][r1]
+        )
+
+
+    # Initial unsatisfied pair tracking
+    unsatisfied_synergy_pairs = { pair 
+                                 for pair in required_synergy_pairs 
+                                 if not is_synergy_ok(*pair) }
+
+    unsatisfied_count = defaultdict(int)
+    for (c1, r1), (c2, r2) in unsatisfied_synergy_pairs:
+        unsatisfied_count[(c1, r1)] += 1
+        unsatisfied_count[(c2, r2)] += 1
+
+    removed_champions = set()
+
+    def cost(item): return (item[1], -games_played.get(item[0], 1e9))
+
+    while unsatisfied_synergy_pairs:
+        # Find worst offender
+        worst_offender = max(
+            unsatisfied_count.items(),
+            key=cost
+        )[0]
+
+        removed_champions.add(worst_offender)
+        champ_to_remove, role_to_remove = worst_offender
+        del lanes[role_to_remove][champ_to_remove]
+
+        # Update affected pairs only
+        affected_pairs = pairs_by_champion.pop(worst_offender, set())
+        for pair in affected_pairs:
+            if pair not in required_synergy_pairs: continue
+            required_synergy_pairs.remove(pair)
+            unsatisfied_synergy_pairs.discard(pair)
+
+            for cr in pair:
+                if cr != worst_offender:
+                    pairs_by_champion[cr].discard(pair)
+                    unsatisfied_count[cr] = max(0, unsatisfied_count[cr] - 1)
+
+        del unsatisfied_count[worst_offender]
+
+    # Clean up synergies
+    for lane, champions in lanes.items():
+        for champion in champions.values():
+            for slane, schampions in champion['s'].items():
+                for schampion in list(schampions.keys()):
+                    if schampion not in lanes[slane]:
+                        del champion['s'][slane][schampion]
+    return removed_champions
+
 def compute_error(w, l):
     n = w + l
     if n <= 0:return 0.0
     p = w / n
     return math.sqrt(p * (1 - p) / n)
 
-def make_zscore_bucket_classifier(values, errors):
+def zscore_parameters(values, errors):
     """
-    Build a classifier that buckets z-scores into [0,1,2,4] based on
-    the 40th, 70th, and 90th percentiles of a Normal(0,1).
-
-    values : list or array of observed win-rates p_i
-    errors : list or array of their measurement errors e_i
-
-    The between-champion variance σ² is estimated by subtracting the
-    mean(e_i²) from Var(p_i).  In classify(), each z is computed as
-        z = (p - μ) / sqrt(σ² + e²)
-    so that low-sample points get “softened.”
+    (mu, sigma_between) of make_zscore_bucket_classifier: the mean of the
+    p_i and the between-champion spread, Var(p_i) minus mean(e_i²).
     """
     values = np.array(values, dtype=float)
     errors = np.array(errors, dtype=float)
@@ -112,7 +491,10 @@ def make_zscore_bucket_classifier(values, errors):
     mean_error_sq = np.mean(errors**2)
     corrected_var = var_p - mean_error_sq
     sigma_between = math.sqrt(corrected_var) if corrected_var > 0 else 0.0
+    return mu, sigma_between
 
+def zscore_cutpoints():
+    """ z1..z4, bucket edges that put 5/3 as much mass in each bucket as in the next """
     scale = 5/3
     sum = 0
 
@@ -124,6 +506,26 @@ def make_zscore_bucket_classifier(values, errors):
     z2 = norm.ppf((scale ** 4 + scale ** 3) / sum)
     z3 = norm.ppf((scale ** 4 + scale ** 3 + scale ** 2) / sum)
     z4 = norm.ppf((scale ** 4 + scale ** 3 + scale ** 2 + scale ** 1) / sum)
+    return z1, z2, z3, z4
+
+BUCKET_POINTS = np.array([0, 1, 2, 4, 8])
+
+def make_zscore_bucket_classifier(values, errors):
+    """
+    Build a classifier that buckets z-scores into [0,1,2,4] based on
+    the 40th, 70th, and 90th percentiles of a Normal(0,1).
+
+    values : list or array of observed win-rates p_i
+    errors : list or array of their measurement errors e_i
+
+    The between-champion variance σ² is estimated by subtracting the
+    mean(e_i²) from Var(p_i).  In classify(), each z is computed as
+        z = (p - μ) / sqrt(σ² + e²)
+    so that low-sample points get “softened.”
+    zscore_buckets() classifies a whole array at once.
+    """
+    mu, sigma_between = zscore_parameters(values, errors)
+    z1, z2, z3, z4 = zscore_cutpoints()
 
     def classify(p, e):
         """
@@ -142,6 +544,22 @@ def make_zscore_bucket_classifier(values, errors):
 
     return classify
 
+def zscore_buckets(values, errors):
+    """
+    Points of every (values[i], errors[i]), the same as
+    make_zscore_bucket_classifier(values, errors) gives one by one
+    """
+    values = np.asarray(values, dtype=float)
+    errors = np.asarray(errors, dtype=float)
+    if not len(values): return np.zeros(0, dtype=np.int64)
+    mu, sigma_between = zscore_parameters(values, errors)
+    if sigma_between == 0: return np.zeros(len(values), dtype=np.int64)
+    denom = np.sqrt(sigma_between**2 + errors**2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.where(denom == 0, 0.0, (values - mu) / denom)
+    # side="right": z equal to a cut-point goes up, as `z < z1` fails; NaN sorts last
+    return BUCKET_POINTS[np.searchsorted(zscore_cutpoints(), z, side="right")]
+
 import math
 
 def normalized_winrate(a, b):
@@ -167,15 +585,22 @@ def normalized_winrate(a, b):
 
 
 
-def build_game_data():
+def synergy_rows(synergy_data, lanes):
+    """ Synergy entries between two champions of `lanes` in different roles """
+    for k, v in synergy_data.items():
+        champion1, champion2, lane1, lane2 = k.split("+")
+        if not lane1 or not lane2: continue
+        if lane1 == lane2: continue
+        if champion1 == champion2: continue
+        if champion1 not in lanes[lane1]: continue
+        if champion2 not in lanes[lane2]: continue
+        yield champion1, champion2, lane1, lane2, v
+
+def parse_lanes(winrate_data, synergy_data, min_games=75):
     '''
-        Get the data from the last 30 days and compile into two dicts
+        Champions per lane from winrate_data, with the synergy of every pair
+        that has at least `min_games` games. Returns (lanes, match_count).
     '''
-    # Load data from last 5 days
-    winrate_data = load_last_n_days("winrate", 28, 28, 'game_data/')
-    synergy_data = load_last_n_days("synergy", 28, 28, 'game_data/')
-    print("Data load success")
-    
     match_count = 0
     lanes = {
         'TOP':{}, 
@@ -203,15 +628,9 @@ def build_game_data():
         }
     match_count /= 10
     # Fill synergy maps from synergy_data
-    for k, v in synergy_data.items():
-        champion1, champion2, lane1, lane2 = k.split("+")
-        if not lane1 or not lane2: continue
-        if lane1 == lane2: continue
-        if champion1 == champion2: continue
-        if champion1 not in lanes[lane1]: continue
-        if champion2 not in lanes[lane2]: continue
+    for champion1, champion2, lane1, lane2, v in synergy_rows(synergy_data, lanes):
         games_played = v['wins'] + v['losses']
-        if games_played < 75: continue
+        if games_played < min_games: continue
         
         average_winrate = normalized_winrate(lanes[lane1][champion1]['w'], lanes[lane2][champion2]['w'])        
         pair_winrate = v['wins'] / games_played
@@ -229,103 +648,201 @@ def build_game_data():
             'w': delta_winrate,
             'e': pair_error,
         }
-        
-    
-    print("data parse success")
-
-    '''
-        All champions need to have data with all other champions in other roles.
-        We remove champions until our data is correct.
-        This is a Heuristic Hitting Set Algorithm
-    ''' 
-
-    # We use role variable to not clash with lane variable names
-    
-    # Preprocess
-    champion_role_pool = [(champ, role) 
-                          for role, champions in lanes.items() 
-                          for champ in champions]
-    games_played = { (champ, role): lanes[role][champ]['g'] 
-                    for champ, role in champion_role_pool }
-
-    # Build all inter-role synergy pairs and reverse index
-    required_synergy_pairs = set()
-    pairs_by_champion = defaultdict(set)
-    for (c1, r1), (c2, r2) in itertools.combinations(champion_role_pool, 2):
-        if c1 == c2 or r1 == r2: continue
-        pair = ((c1, r1), (c2, r2))
-        required_synergy_pairs.add(pair)
-        pairs_by_champion[(c1, r1)].add(pair)
-        pairs_by_champion[(c2, r2)].add(pair)
-
-    # Function to check if a synergy is satisfied
-    def is_synergy_ok(pair1, pair2):
-        (c1, r1) = pair1
-        (c2, r2) = pair2
-        return (
-            c2 in lanes[r1][c1]['s'][r2] and
-            c1 in lanes[r2][c2]['s'][r1]
-        )
+    return lanes, match_count
 
+def synergy_matrices(formated_lane):
+    """
+    Dense synergy points per ordered lane pair: matrices[lane_a, lane_b][i, j]
+    is formated_lane[lane_a][i]['synergy'][lane_b][name of formated_lane[lane_b][j]],
+    0 where there is no entry (same champion in both lanes).
+    """
+    index = {lane: {c['name']: j for j, c in enumerate(champions)}
+             for lane, champions in formated_lane.items()}
+    matrices = {}
+    for lane_a, champions_a in formated_lane.items():
+        for lane_b, champions_b in formated_lane.items():
+            if lane_a == lane_b: continue
+            matrix = np.zeros((len(champions_a), len(champions_b)), dtype=np.int64)
+            lookup = index[lane_b]
+            for i, champion in enumerate(champions_a):
+                for name, points in champion['synergy'][lane_b].items():
+                    matrix[i, lookup[name]] = points
+            matrices[lane_a, lane_b] = matrix
+    return matrices
+
+def synergy_strengths(formated_lane):
+    """
+    Strength of every cross-lane pair: both champions' points, their mutual
+    synergy, plus for each other lane the mean synergy the champions of that
+    lane have with the pair, with the third-lane averages done as matrix
+    reductions. Returns ([(champ1, champ2) labels], [strengths]) in the pair
+    order of synergy_powers_reference.
+    """
+    matrices = synergy_matrices(formated_lane)
+    names = {lane: [c['name'] for c in champions] for lane, champions in formated_lane.items()}
+    points = {lane: np.array([c['points'] for c in champions], dtype=np.int64)
+              for lane, champions in formated_lane.items()}
+
+    def same_name(lane_a, lane_b):
+        # For each champion of lane_b, its index in lane_a or -1
+        lookup = {name: i for i, name in enumerate(names[lane_a])}
+        return np.array([lookup.get(name, -1) for name in names[lane_b]], dtype=np.int64)
+
+    labels = []
+    strengths = []
+    for lane1 in formated_lane:
+        for lane2 in formated_lane:
+            if lane1 <= lane2: continue
+            power = points[lane1][:, None] + points[lane2][None, :] + matrices[lane1, lane2]
+            power = power.astype(float)
+
+            for lane3 in formated_lane:
+                if lane1 == lane3 or lane2 == lane3: continue
+                to1 = matrices[lane3, lane1]  # (n3, n1)
+                to2 = matrices[lane3, lane2]  # (n3, n2)
+                n1, n2 = to1.shape[1], to2.shape[1]
+                syn_sum = to1.sum(axis=0)[:, None] + to2.sum(axis=0)[None, :]
+                syn_cnt = np.full((n1, n2), len(names[lane3]), dtype=np.int64)
+
+                # Drop the lane3 champion that is champion1 / champion2 itself
+                x1 = same_name(lane3, lane1)
+                has1 = x1 >= 0
+                rows = x1[has1]
+                syn_sum[has1] -= to1[rows, np.nonzero(has1)[0]][:, None] + to2[rows]
+                syn_cnt[has1] -= 1
+
+                x2 = same_name(lane3, lane2)
+                has2 = x2 >= 0
+                cols = x2[has2]
+                syn_sum[:, has2] -= to1[cols].T + to2[cols, np.nonzero(has2)[0]][None, :]
+                syn_cnt[:, has2] -= 1
+
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    power += syn_sum.astype(float) / syn_cnt
+
+            different = np.array(names[lane1])[:, None] != np.array(names[lane2])[None, :]
+            for i, j in zip(*np.nonzero(different)):
+                labels.append((f'{names[lane1][i]} {lane1}', f'{names[lane2][j]} {lane2}'))
+            strengths.extend(power[different].tolist())
+    return labels, strengths
+
+def compute_synergy_powers(formated_lane):
+    """ Every cross-lane pair with its strength, weakest first; same as synergy_powers_reference """
+    labels, strengths = synergy_strengths(formated_lane)
+    synergy_powers = [{'champ1': champ1, 'champ2': champ2, 'strength': strength}
+                      for (champ1, champ2), strength in zip(labels, strengths)]
+    synergy_powers.sort(key=lambda x: x['strength'])
+    return synergy_powers
+
+def synergy_powers_reference(formated_lane):
+    """ Plain-loop version of compute_synergy_powers, kept to check and benchmark it against """
+    synergy_powers = []
+    for lane1, champions1 in formated_lane.items():
+        for lane2, champions2 in formated_lane.items():
+            if lane1 <= lane2: continue
+            for champion1 in champions1:
+                for champion2 in champions2:
+                    name1 = champion1['name']
+                    name2 = champion2['name']
+                    if name1 == name2: continue
 
-    # Initial unsatisfied pair tracking
-    unsatisfied_synergy_pairs = { pair 
-                                 for pair in required_synergy_pairs 
-                                 if not is_synergy_ok(*pair) }
-
-    unsatisfied_count = defaultdict(int)
-    for (c1, r1), (c2, r2) in unsatisfied_synergy_pairs:
-        unsatisfied_count[(c1, r1)] += 1
-        unsatisfied_count[(c2, r2)] += 1
-
-    removed_champions = set()
-    
-    def cost(item): return (item[1], -games_played.get(item[0], 1e9))
-
-    while unsatisfied_synergy_pairs:
-        # Find worst offender
-        worst_offender = max(
-            unsatisfied_count.items(),
-            key=cost
-        )[0]
-
-        removed_champions.add(worst_offender)
-        champ_to_remove, role_to_remove = worst_offender
-        del lanes[role_to_remove][champ_to_remove]
-
-        # Update affected pairs only
-        affected_pairs = pairs_by_champion.pop(worst_offender, set())
-        for pair in affected_pairs:
-            if pair not in required_synergy_pairs: continue
-            required_synergy_pairs.remove(pair)
-            unsatisfied_synergy_pairs.discard(pair)
-
-            for cr in pair:
-                if cr != worst_offender:
-                    pairs_by_champion[cr].discard(pair)
-                    unsatisfied_count[cr] = max(0, unsatisfied_count[cr] - 1)
+                    synergy_power = champion1['points'] + champion2['points']
+                    synergy_power += champion1['synergy'][lane2][name2]
 
-        del unsatisfied_count[worst_offender]
+                    for lane3, champions3 in formated_lane.items():
+                        if lane1 == lane3 or lane2 == lane3: continue
+                        syn_sum = 0
+                        syn_cnt = 0
+                        for champion3 in champions3:
+                            if name1 == champion3['name']: continue
+                            if name2 == champion3['name']: continue
+                            syn_sum += champion3['synergy'][lane1][name1]
+                            syn_sum += champion3['synergy'][lane2][name2]
+                            syn_cnt += 1
+                        synergy_power += 1.0 * syn_sum / syn_cnt
+                    synergy_powers.append({
+                        'champ1': f'{name1} {lane1}',
+                        'champ2': f'{name2} {lane2}',
+                        'strength': synergy_power
+                    })
 
-    # Clean up synergies
-    for lane, champions in lanes.items():
-        for champion in champions.values():
-            for slane, schampions in champion['s'].items():
-                for schampion in list(schampions.keys()):
-                    if schampion not in lanes[slane]:
-                        del champion['s'][slane][schampion]
 
-    champ_count = sum(len(champs) for champs in lanes.values())
-    print(f"Remaining champions: {champ_count}")
+    synergy_powers.sort(key=lambda x: x['strength'])
+    return synergy_powers
 
-    # Verify hitting set
-    success, missing_synergies = verify_synergy_coverage(lanes)
-    assert success, "Some synergy pairs are missing!"
 
-    '''
-        Assign points to champions and synergies according to z-score bucketing
-    '''
-    
+def score_lanes(lanes):
+    """
+    Points of every champion and synergy pair, and formated_lane, the
+    output layout. Returns (formated_lane, champion_powers,
+    score_distribution, synergy_distribution).
+
+    Each population is bucketed in one zscore_buckets() call on flat
+    arrays. A champion's power is its points plus, per synergy lane, the
+    mean points of its pairs there; the means are grouped sums over the
+    flat synergy points. Same output as score_lanes_reference.
+    """
+    champions = [(lane, champion) for lane, lane_champions in lanes.items()
+                 for champion in lane_champions.values()]
+    champ_points = zscore_buckets([c['w'] for _, c in champions], [c['e'] for _, c in champions])
+
+    # Synergy entries flat, in (champion, synergy lane) groups
+    entries, sizes, slots = [], [], []
+    for _, champion in champions:
+        slots.append(len(champion['s']))
+        for schampions in champion['s'].values():
+            entries.extend(schampions.values())
+            sizes.append(len(schampions))
+    synergy_points = zscore_buckets([v['w'] for v in entries], [v['e'] for v in entries])
+
+    sizes, slots = np.array(sizes, dtype=np.int64), np.array(slots, dtype=np.int64)
+    group_sums = np.bincount(np.repeat(np.arange(len(sizes)), sizes), weights=synergy_points,
+                             minlength=len(sizes))
+    # means[champion, synergy lane], 0 where the lane has no pairs
+    means = np.zeros((len(champions), slots.max(initial=0)))
+    group_champ = np.repeat(np.arange(len(champions)), slots)
+    group_slot = np.arange(len(sizes)) - np.repeat(np.cumsum(slots) - slots, slots)
+    filled = sizes > 0
+    means[group_champ[filled], group_slot[filled]] = group_sums[filled] / sizes[filled]
+    powers = champ_points.astype(float)
+    for slot in range(means.shape[1]): powers += means[:, slot]  # lane by lane, like the loop
+    powers = np.floor(powers * 100) / 100
+
+    champ_points, powers, points = champ_points.tolist(), powers.tolist(), synergy_points.tolist()
+    formated_lane = {lane: [] for lane in lanes}
+    champion_powers = []
+    i = 0
+    for (lane, champion), champion_points, champion_power in zip(champions, champ_points, powers):
+        champion['p'] = champion_points
+        synergy = {}
+        delta = {}
+        for slane, schampions in champion['s'].items():
+            synergy[slane] = slane_synergy = {}
+            delta[slane] = slane_delta = {}
+            for (k, v), p in zip(schampions.items(), points[i:i + len(schampions)]):
+                v['p'] = p
+                slane_synergy[k] = p
+                slane_delta[k] = v['w']
+            i += len(schampions)
+        formated_lane[lane].append({
+            'name': champion['n'],
+            'lane': lane,
+            'points': champion_points,
+            'power': champion_power,
+            'winrate': champion['w'],
+            'synergy': synergy,
+            'delta': delta
+        })
+        champion_powers.append([champion['n']+ " " + lane, champion_power])
+
+    def distribution(points):
+        counts = np.bincount(np.searchsorted(BUCKET_POINTS, points), minlength=len(BUCKET_POINTS))
+        return dict(zip(BUCKET_POINTS.tolist(), counts.tolist()))
+
+    return formated_lane, champion_powers, distribution(champ_points), distribution(points)
+
+def score_lanes_reference(lanes):
+    """ score_lanes as per-entry classifier calls in nested loops, for the benchmark """
     champ_values = [champion['w'] for champions in lanes.values() for champion in champions.values()]
     champ_errors = [champion['e'] for champions in lanes.values() for champion in champions.values()]
     strength_score = make_zscore_bucket_classifier(champ_values, champ_errors)
@@ -341,7 +858,7 @@ def build_game_data():
         for schampions in champion['s'].values()
         for schampion in schampions.values()
     ]
-    
+
     synergy_errors = [
         schampion['e']
         for champions in lanes.values()
@@ -356,7 +873,7 @@ def build_game_data():
             for schampions in champion['s'].values():
                 for schampion in schampions.values():
                     schampion['p'] = synergy_score(schampion['w'], schampion['e'])
-        
+
     formated_lane = {}
     champion_powers = []
     score_distribution = {0: 0, 1: 0, 2: 0, 4: 0, 8: 0}
@@ -368,24 +885,24 @@ def build_game_data():
             champion_power = champion['p']
             synergy = {}
             delta = {}
-            
+
             for slane, schampions in champion['s'].items():
                 power_sum = 0
                 count = 0
                 synergy[slane] = {}
                 delta[slane] = {}
-                
+
                 for k, v in schampions.items():
                     synergy[slane][k] = v['p']
                     delta[slane][k] = v['w']
                     power_sum += v['p']
                     count += 1
                     synergy_distribution[v['p']] += 1
-                    
+
                 if count == 0: continue
                 power_sum /= count
                 champion_power += power_sum
-            
+
             champion_power = math.floor(champion_power * 100) / 100
             formated_lane[lane].append({
                 'name': champion['n'],
@@ -396,227 +913,127 @@ def build_game_data():
                 'synergy': synergy,
                 'delta': delta
             })
-            
+
             score_distribution[champion['p']] += 1
 
-            
+
             champion_powers.append([champion['n']+ " " + lane, champion_power])
-            
-    champion_powers.sort(key=lambda x: x[1])
-    for champ in champion_powers:
-        print(champ[1],champ[0])
-    print("Number of Champions: ", len(champion_powers))
-    print(score_distribution)
-    print(synergy_distribution)
+    return formated_lane, champion_powers, score_distribution, synergy_distribution
+
+def build_game_data(output_format="compact", top_k=TOP_K, folder='game_data/',
+                    output='game_data.json', profiler=None, processes=None):
+    '''
+        Get the data from the last 30 days and compile into two dicts.
+        output_format is "compact" or "legacy", see gamedata.py
+        profiler: a StageProfiler to time the load, parse, hitting_set,
+        classification, synergy_powers and dump stages
+        processes: day-files are parsed on a pool of this many (default:
+        one per CPU, 1 reads them in this process)
+    '''
+    stage = profiler.stage if profiler else lambda name: nullcontext()
+
+    # Load data from last 28 days
+    with stage("load"):
+        winrate_data = load_rolling("winrate", 28, 28, folder, processes=processes)
+        synergy_data = load_rolling("synergy", 28, 28, folder, processes=processes)
+    print("Data load success")
     
-    synergy_powers = []
-    for lane1, champions1 in formated_lane.items():
-        for lane2, champions2 in formated_lane.items():
-            if lane1 <= lane2: continue
-            for champion1 in champions1:
-                for champion2 in champions2:
-                    name1 = champion1['name']
-                    name2 = champion2['name']
-                    if name1 == name2: continue
-                    
-                    synergy_power = champion1['points'] + champion2['points']
-                    synergy_power += champion1['synergy'][lane2][name2]
-                    
-                    for lane3, champions3 in formated_lane.items():
-                        if lane1 == lane3 or lane2 == lane3: continue
-                        syn_sum = 0
-                        syn_cnt = 0
-                        for champion3 in champions3:
-                            if name1 == champion3['name']: continue
-                            if name2 == champion3['name']: continue
-                            syn_sum += champion3['synergy'][lane1][name1]
-                            syn_sum += champion3['synergy'][lane2][name2]
-                            syn_cnt += 1
-                        synergy_power += 1.0 * syn_sum / syn_cnt
-                    synergy_powers.append({
-                        'champ1': f'{name1} {lane1}',
-                        'champ2': f'{name2} {lane2}', 
-                        'strength': synergy_power
-                    })
-                    
-                    
-    synergy_powers.sort(key=lambda x: x['strength'])       
-                
-    formated_lane['_meta'] = {
+    with stage("parse"):
+        lanes, match_count = parse_lanes(winrate_data, synergy_data)
+    print("data parse success")
+
+    with stage("hitting_set"):
+        prune_to_full_coverage(lanes)
+
+        champ_count = sum(len(champs) for champs in lanes.values())
+        print(f"Remaining champions: {champ_count}")
+
+        # Verify hitting set
+        success, missing_synergies = verify_synergy_coverage(lanes)
+        assert success, "Some synergy pairs are missing!"
+
+    '''
+        Assign points to champions and synergies according to z-score bucketing
+    '''
+    with stage("classification"):
+        formated_lane, champion_powers, score_distribution, synergy_distribution = score_lanes(lanes)
+        champion_powers.sort(key=lambda x: x[1])
+        for champ in champion_powers:
+            print(champ[1],champ[0])
+        print("Number of Champions: ", len(champion_powers))
+        print(score_distribution)
+        print(synergy_distribution)
+
+    meta = {
         "champ_count": len(champion_powers),
         "score_distribution": score_distribution,
         "synergy_distribution": synergy_distribution,
         "match_count": match_count,
         "champion_powers": champion_powers,
-        "synergy_powers": synergy_powers
     }
-    with open('game_data.json', 'w') as f:
-        json.dump(formated_lane, f, indent=2)
-    
-    print("game_data.json success")
+    with stage("synergy_powers"):
+        if output_format == "legacy":
+            synergy_powers = compute_synergy_powers(formated_lane)
+        else:
+            labels, strengths = synergy_strengths(formated_lane)
+            top = top_synergy_powers(labels, strengths, top_k)
+
+    with stage("dump"):
+        hands = (Path(output).with_name(Path(output).stem + '_hands.json'), build_hand_tables(formated_lane),
+                 {'separators': (',', ':')})
+        if output_format == "legacy":
+            formated_lane['_meta'] = {**meta, "synergy_powers": synergy_powers}
+            files = [hands, (Path(output), formated_lane, {'indent': 2})]
+        else:
+            files = [hands, *compact_files(formated_lane, meta, top, output, pair_count=len(strengths))]
+        published = publish(files)
     
-import matplotlib.pyplot as plt
+    if published: print(f"game_data.json success, build {published['build_version']}")
     
-def plot_champs():
-    winrate_data = load_last_n_days("winrate", 28, 28, 'game_data/')
-    synergy_data = load_last_n_days("synergy", 28, 28, 'game_data/') 
-    
-    def internal(input):
-        match_count = 0
-        lanes = {
-            'TOP':{}, 
-            'MIDDLE': {}, 
-            'JUNGLE':{}, 
-            'BOTTOM':{}, 
-            'UTILITY': {}
-        }
-        # Fill lanes from winrate_data
-        for k, v in winrate_data.items():
-            champion, lane = k.split('+')
-            match_count += v['wins'] + v['losses']
-            lanes.get(lane, {})[champion] = {
-                'n': champion,
-                'g': v['wins'] + v['losses'],
-                'w': v['wins'] / (v['wins'] + v['losses']),
-                'e': compute_error(v['wins'], v['losses']),
-                's': {
-                    'TOP':{}, 
-                    'MIDDLE': {}, 
-                    'JUNGLE':{}, 
-                    'BOTTOM':{}, 
-                    'UTILITY': {}
-                }
-            }
-        match_count /= 10
-        # Fill synergy maps from synergy_data
-        for k, v in synergy_data.items():
-            champion1, champion2, lane1, lane2 = k.split("+")
-            if not lane1 or not lane2: continue
-            if lane1 == lane2: continue
-            if champion1 == champion2: continue
-            if champion1 not in lanes[lane1]: continue
-            if champion2 not in lanes[lane2]: continue
-            games_played = v['wins'] + v['losses']
-            if games_played < input: continue
-            
-            average_winrate = normalized_winrate(lanes[lane1][champion1]['w'], lanes[lane2][champion2]['w'])        
-            pair_winrate = v['wins'] / games_played
-            
-            pair_error = compute_error(v['wins'], v['losses'])
-            
-            delta_winrate = pair_winrate  - average_winrate
-            lanes[lane1][champion1]['s'][lane2][champion2] = {
-                'g': games_played,
-                'w': delta_winrate,
-                'e': pair_error,
-            }
-            lanes[lane2][champion2]['s'][lane1][champion1] = {
-                'g': v['wins'] + v['losses'],
-                'w': delta_winrate,
-                'e': pair_error,
-            }
-            
-        
-        print("data parse success")
+def plot_champs(thresholds=range(1, 500, 25), processes=None):
+    import matplotlib.pyplot as plt
 
-        '''
-            All champions need to have data with all other champions in other roles.
-            We remove champions until our data is correct.
-            This is a Heuristic Hitting Set Algorithm
-        ''' 
+    winrate_data, synergy_data = load_window(["winrate", "synergy"], 28, 28, 'game_data/',
+                                             processes=processes)
+    
+    remaining = ThresholdSweep(winrate_data, synergy_data).sweep(thresholds, processes)
+    for threshold, count in remaining.items(): print(threshold, count)
 
-        # We use role variable to not clash with lane variable names
-        
-        # Preprocess
-        champion_role_pool = [(champ, role) 
-                            for role, champions in lanes.items() 
-                            for champ in champions]
-        games_played = { (champ, role): lanes[role][champ]['g'] 
-                        for champ, role in champion_role_pool }
-
-        # Build all inter-role synergy pairs and reverse index
-        required_synergy_pairs = set()
-        pairs_by_champion = defaultdict(set)
-        for (c1, r1), (c2, r2) in itertools.combinations(champion_role_pool, 2):
-            if c1 == c2 or r1 == r2: continue
-            pair = ((c1, r1), (c2, r2))
-            required_synergy_pairs.add(pair)
-            pairs_by_champion[(c1, r1)].add(pair)
-            pairs_by_champion[(c2, r2)].add(pair)
-
-        # Function to check if a synergy is satisfied
-        def is_synergy_ok(pair1, pair2):
-            (c1, r1) = pair1
-            (c2, r2) = pair2
-            return (
-                c2 in lanes[r1][c1]['s'][r2] and
-                c1 in lanes[r2][c2]['s'][r1]
-            )
-
-
-        # Initial unsatisfied pair tracking
-        unsatisfied_synergy_pairs = { pair 
-                                    for pair in required_synergy_pairs 
-                                    if not is_synergy_ok(*pair) }
-
-        unsatisfied_count = defaultdict(int)
-        for (c1, r1), (c2, r2) in unsatisfied_synergy_pairs:
-            unsatisfied_count[(c1, r1)] += 1
-            unsatisfied_count[(c2, r2)] += 1
-
-        removed_champions = set()
-        
-        def cost(item): return (item[1], -games_played.get(item[0], 1e9))
-
-        while unsatisfied_synergy_pairs:
-            # Find worst offender
-            worst_offender = max(
-                unsatisfied_count.items(),
-                key=cost
-            )[0]
-
-            removed_champions.add(worst_offender)
-            champ_to_remove, role_to_remove = worst_offender
-            del lanes[role_to_remove][champ_to_remove]
-
-            # Update affected pairs only
-            affected_pairs = pairs_by_champion.pop(worst_offender, set())
-            for pair in affected_pairs:
-                if pair not in required_synergy_pairs: continue
-                required_synergy_pairs.remove(pair)
-                unsatisfied_synergy_pairs.discard(pair)
-
-                for cr in pair:
-                    if cr != worst_offender:
-                        pairs_by_champion[cr].discard(pair)
-                        unsatisfied_count[cr] = max(0, unsatisfied_count[cr] - 1)
-
-            del unsatisfied_count[worst_offender]
-
-        # Clean up synergies
-        for lane, champions in lanes.items():
-            for champion in champions.values():
-                for slane, schampions in champion['s'].items():
-                    for schampion in list(schampions.keys()):
-                        if schampion not in lanes[slane]:
-                            del champion['s'][slane][schampion]
-
-        return sum(len(champs) for champs in lanes.values())
-    x = range(1, 500, 25)
-    y = [ internal(ix) for ix in x]
-    plt.plot(x, y, marker='o', linestyle='-', color='blue', label='y = x^2')
-
-    # Add title and labels
-    plt.title('Line Graph Example')
-    plt.xlabel('X-axis')
-    plt.ylabel('Y-axis')
-
-    # Show legend
-    plt.legend()
-
-    # Display the plot
+    plt.plot(list(remaining), list(remaining.values()), marker='o', linestyle='-', color='blue')
+    plt.title('Champions remaining by synergy games cutoff')
+    plt.xlabel('Minimum games per synergy pair')
+    plt.ylabel('Champions remaining')
     plt.show() 
 # Test
 if __name__ == "__main__":
-    #plot_champs()
-    build_game_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", nargs="?", choices=["build", "sweep", "worker"], default="build",
+                        help="worker: build in the background whenever a collector asks, "
+                             "see buildworker.py")
+    parser.add_argument("--thresholds", default="1:500:25",
+                        help="start:stop:step of the synergy games cutoffs to sweep (default: 1:500:25)")
+    parser.add_argument("--processes", type=int,
+                        help="Parse the day-files in this many processes (default: one per CPU) "
+                             "and sweep in as many (default: 1)")
+    parser.add_argument("--format", choices=["compact", "legacy"], default="compact",
+                        help="game_data.json layout, see gamedata.py (default: compact)")
+    parser.add_argument("--top-k", type=int, default=TOP_K,
+                        help=f"Strongest pairs kept in the compact synergy_powers sidecar (default: {TOP_K})")
+    parser.add_argument("--profile", nargs="?", const="memory", choices=["memory", "time"],
+                        help="Report wall time and tracemalloc peak per build stage "
+                             "('--profile time' skips tracemalloc, which slows the load down)")
+    parser.add_argument("--poll", type=float, default=5,
+                        help="worker: seconds between checks for a build request (default: 5)")
+    parser.add_argument("--settle", type=float, default=10,
+                        help="worker: seconds to wait for more requests before building (default: 10)")
+    args = parser.parse_args()
+    if args.command == "sweep":
+        plot_champs(range(*map(int, args.thresholds.split(":"))), args.processes)
+    elif args.command == "worker":
+        from buildworker import work
+        work(lambda: build_game_data(args.format, args.top_k, processes=args.processes),
+             args.poll, args.settle)
+    else:
+        profiler = StageProfiler(memory=args.profile == "memory") if args.profile else None
+        build_game_data(args.format, args.top_k, profiler=profiler, processes=args.processes)
+        if profiler: profiler.report()
\ No newline at end of file
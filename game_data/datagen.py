@@ -3,251 +3,530 @@ import gc
 import json
 import time
 import random
+import signal
+import asyncio
+import subprocess
 import argparse
-import requests
-from pathlib import Path
+from collections import deque
 from dotenv import load_dotenv
 from datetime import datetime, UTC
-from collections import deque, defaultdict
-from databuild import build_game_data
+from ratelimit import RateLimiter, DEFAULT_APP_LIMITS
+from deltalog import DeltaLog
+from counters import MatchCounters
+from daystore import use_champion_ids
+from seenindex import SeenMatches
+from frontier import Frontier
+from tierindex import TierIndex
+from metrics import registry as metrics
+from riotclient import RiotClient
+import buildworker
 
 load_dotenv()
 API_KEY = os.getenv("RIOT_API_KEY")
 if not API_KEY: raise ValueError("Add RIOT_API_KEY into .env")
 
+REGIONS = {
+    "americas": "na1",
+    "europe":   "euw1",
+    "asia":     "kr"
+}
+
 parser = argparse.ArgumentParser()
 parser.add_argument(
-    "--match-region", 
-    choices=["americas", "europe", "asia"], 
-    default="americas", 
-    help="Regional routing (default: americas)"
+    "--match-region",
+    choices=[*REGIONS, "all"],
+    default="americas",
+    help="Regional routing, or all to crawl every region in one process (default: americas)"
+)
+parser.add_argument(
+    "--concurrency",
+    type=int,
+    default=8,
+    help="Match-detail requests kept in flight per region (default: 8)"
+)
+parser.add_argument(
+    "--app-limit",
+    default=DEFAULT_APP_LIMITS,
+    help="App rate limit assumed until Riot's headers arrive (default: dev key)"
+)
+parser.add_argument(
+    "--record-headers",
+    help="Append every response's rate-limit headers to this JSON lines file"
+)
+parser.add_argument(
+    "--compact-every",
+    type=float,
+    default=600,
+    help="Seconds between rewrites of the daily snapshot from the delta log (default: 600)"
+)
+parser.add_argument(
+    "--frontier-size",
+    type=int,
+    default=5000,
+    help="Players kept in each region's crawl frontier (default: 5000)"
+)
+parser.add_argument(
+    "--rank-ttl",
+    type=float,
+    default=6,
+    help="Hours a player's rank is reused before asking league-v4 again (default: 6)"
+)
+parser.add_argument(
+    "--tier-refresh",
+    type=float,
+    default=24,
+    help="Hours between walks of the Emerald+ league pages for the tier index (default: 24)"
+)
+parser.add_argument(
+    "--tier-pages",
+    type=int,
+    default=10,
+    help="Cap on pages walked per Emerald/Diamond division, 0 for all (default: 10)"
+)
+parser.add_argument(
+    "--tier-share",
+    type=float,
+    default=0.1,
+    help="Share of the app rate limit the tier-index walk may use (default: 0.1)"
+)
+parser.add_argument(
+    "--seen-retention",
+    type=int,
+    default=90,
+    help="Days a counted match id is remembered so it is never fetched again (default: 90)"
+)
+parser.add_argument(
+    "--retries",
+    type=int,
+    default=3,
+    help="Resends of a request after a 5xx or connection error (default: 3)"
+)
+parser.add_argument(
+    "--base-url",
+    default="https://{routing}.api.riotgames.com",
+    help="API root, {routing} is replaced by na1, americas, ... (fakeriot.py serves one locally)"
+)
+parser.add_argument(
+    "--seed",
+    type=int,
+    default=None,
+    help="Seed the crawl's random choices, for reproducible benchmarks"
+)
+parser.add_argument(
+    "--champion-ids",
+    help="Champion id table to intern into (default: game_data/champion_ids.json next to this script)"
+)
+parser.add_argument(
+    "--no-build",
+    action="store_true",
+    help="Never ask the build worker for a game_data.json build, nor start one"
+)
+parser.add_argument(
+    "--metrics-port",
+    type=int,
+    default=None,
+    help="Serve Prometheus-style metrics on http://127.0.0.1:PORT/metrics"
+)
+parser.add_argument(
+    "--metrics-file",
+    default=None,
+    help="Rewrite this file with the same metrics every --metrics-every seconds"
+)
+parser.add_argument(
+    "--metrics-every",
+    type=float,
+    default=15,
+    help="Seconds between --metrics-file rewrites (default: 15)"
+)
+parser.add_argument(
+    "--startup-delay",
+    type=float,
+    default=10,
+    help="Seconds to wait so the server can start first (default: 10)"
 )
 args = parser.parse_args()
-MATCH_REGION = args.match_region
-REGION = {
-    "americas": "na1",
-    "europe":   "euw1",
-    "asia":     "kr"
-}[MATCH_REGION]
+if args.seed is not None: random.seed(args.seed)
+if args.champion_ids: use_champion_ids(args.champion_ids)
 QUEUE = 420
-MAX_MATCHES = 2000
-MAX_PUUIDS = 100
-
-BASE_URL = f"https://{REGION}.api.riotgames.com/lol"
-BASE_URL_MATCH =f"https://{MATCH_REGION}.api.riotgames.com/lol/match/v5/matches"
+# A revisit asks for matches started since the last crawl, minus the longest
+# game, so a game still running during that crawl is not skipped
+WATERMARK_SLACK = 3600
+IDS_PAGE = 100      # largest count match-v5 accepts
+SAVE_EVERY = 30     # seconds between saves when the fetchers never let the aggregator catch up
+MAX_IDS_PAGES = 3
+
+def record_headers(routing, method, response, clock):
+    record = {
+        "t": round(clock(), 3),
+        "routing": routing,
+        "method": method,
+        "status": response.status_code,
+        "headers": {k: v for k, v in response.headers.items()
+                    if k.startswith("X-") or k == "Retry-After"}
+    }
+    with open(args.record_headers, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+# Keep-alive sessions per routing host and one thread per request in flight,
+# shared by every region: its fetchers, its crawler and its tier walk
+client = RiotClient(
+    API_KEY,
+    pool_size=(args.concurrency + 2) * (len(REGIONS) if args.match_region == "all" else 1),
+    retries=args.retries,
+    recorder=record_headers if args.record_headers else None)
+build_worker = None  # the `databuild.py worker` this process started, if any
+
+
+def today():
+    return datetime.now(UTC).strftime("%Y-%m-%d")
+
+
+def is_emerald_plus(rank):
+    return rank in ["EMERALD", "DIAMOND", "MASTER", "GRANDMASTER", "CHALLENGER"]
 
-class RateLimiter:
-    def __init__(self):
-        self.short = deque()
-        self.long = deque()
-        self.next = 0
 
-    def wait(self):
-        while True:
-            now = time.time()
-            if now < self.next:
-                time.sleep(self.next - now)
+def ensure_build_worker():
+    global build_worker
+    if build_worker is not None and build_worker.poll() is None: return
+    build_worker = buildworker.ensure_worker() or build_worker
+
+
+def request_build(region):
+    """ Ask the background build worker for a build; the crawl goes on meanwhile """
+    buildworker.request(region)
+    ensure_build_worker()
+
+
+def stop_build_worker():
+    if build_worker is None or build_worker.poll() is not None: return
+    build_worker.send_signal(signal.SIGINT if os.name == "posix" else signal.SIGTERM)
+    try: build_worker.wait(timeout=10)
+    except subprocess.TimeoutExpired: build_worker.kill()
+
+
+def update_build_gauges():
+    status = buildworker.status()
+    metrics.set("build_worker_up", int(buildworker.alive(status)))
+    if not status or not status.get("finished"): return
+    metrics.set("build_last_duration_seconds", status["seconds"])
+    metrics.set("build_last_finished_timestamp_seconds", status["finished"])
+    metrics.set("build_last_failed", int(status["state"] == "failed"))
+    metrics.set("build_failures", status["failures"])
+
+
+class RegionCollector:
+    '''
+        Crawl pipeline for one region: the crawler walks players and queues
+        unseen match ids, `args.concurrency` fetchers keep match-detail
+        requests in flight under the region's rate limiter, and a single
+        aggregator folds the fetched matches into winrates/synergy and
+        persists them.
+    '''
+    def __init__(self, match_region, seen):
+        self.match_region = match_region
+        self.region = REGIONS[match_region]
+        self.base_url = args.base_url.format(routing=self.region) + "/lol"
+        self.base_url_match = args.base_url.format(routing=match_region) + "/lol/match/v5/matches"
+        self.rate_limiter = RateLimiter(app_limits=args.app_limit)
+
+        self.frontier = Frontier(f"game_data/{self.region}_frontier.json",
+                                 max_players=args.frontier_size, rank_ttl=args.rank_ttl * 3600)
+        self.frontier.load()
+        self.tiers = TierIndex(f"game_data/{self.region}_tiers.json",
+                               max_age=2 * args.tier_refresh * 3600)
+        self.tiers.load()
+
+        # Matches already counted, in any region, and the ones queued or being fetched
+        self.seen = seen
+        self.in_flight = set()
+        self.aggregated_times = deque()  # of the last minute's matches, for matches_per_minute
+
+        date_str = today()
+        for log in DeltaLog.stale(self.region, date_str):
+            self.recover(log)
+            log.compact(*log.load(), final=True)
+            self.seen.forget(log)
+        self.log = DeltaLog(self.region, date_str)
+        self.recover(self.log)
+        self.counts = MatchCounters()
+        self.counts.load(*self.log.load())
+        self.seen.commit(self.region, self.log)  # from here on, the log only grows with commits
+        self.last_compact_time = time.time()
+
+    async def get(self, routing, method, url):
+        return await client.get(self.rate_limiter, routing, method, url)
+
+    async def get_diamond_plus_seed(self):
+        extension = "/league/v4/entries/RANKED_SOLO_5x5/DIAMOND/I"
+        entries = await self.get(
+            self.region, "league-v4.getLeagueEntries", self.base_url + extension)
+        return [{
+            "summonerId": entry['summonerId'],
+            "puuid": await self.get_puuid(entry['summonerId'])
+        } for entry in entries[:1]]
+
+    async def get_puuid(self, summoner_id):
+        extension = f"/summoner/v4/summoners/{summoner_id}"
+        return (await self.get(
+            self.region, "summoner-v4.getBySummonerId", self.base_url + extension))["puuid"]
+
+    async def get_match_ids(self, puuid, count=5, start=0, start_time=None):
+        extension = f"/by-puuid/{puuid}/ids?count={count}&queue={QUEUE}"
+        if start: extension += f"&start={start}"
+        if start_time is not None: extension += f"&startTime={int(start_time)}"
+        return await self.get(
+            self.match_region, "match-v5.getMatchIdsByPUUID", self.base_url_match + extension)
+
+    async def get_new_match_ids(self, player):
+        """
+        Match ids of a player since their watermark, paging as needed, or
+        their latest 20 on a first visit. Returns (ids, requests made).
+        """
+        if player.get("crawledAt") is None:
+            return await self.get_match_ids(player["puuid"], count=20), 1
+        start_time = player["crawledAt"] - WATERMARK_SLACK
+        match_ids = []
+        for page in range(MAX_IDS_PAGES):
+            ids = await self.get_match_ids(player["puuid"], IDS_PAGE, page * IDS_PAGE, start_time)
+            match_ids += ids
+            if len(ids) < IDS_PAGE: break
+        return match_ids, page + 1
+
+    def report(self):
+        for mode in ("full", "incremental"):
+            requests = metrics.get("match_ids_requests", region=self.region, mode=mode)
+            if not requests: continue
+            ids = metrics.get("match_ids_returned", region=self.region, mode=mode)
+            new = metrics.get("match_ids_new", region=self.region, mode=mode)
+            print(f"{self.region} match-ids {mode}: {requests:.0f} requests, "
+                  f"{new / requests:.2f} new per request, {new / max(ids, 1):.0%} of ids new")
+        with metrics.lock: histograms = sorted(metrics.histograms.items())
+        for (name, labels), histogram in histograms:
+            labels = dict(labels)
+            if name != "http_latency_seconds" or labels["routing"] not in (self.region, self.match_region):
                 continue
-            while self.short and now - self.short[0] > 1.2: self.short.popleft()
-            while self.long and now - self.long[0] > 120: self.long.popleft()
-            if len(self.short) < 1 and len(self.long) < 100: break
-            time.sleep(0.05)
+            print(f"{labels['routing']} latency {labels['endpoint']}: {histogram.count} requests, "
+                  f"mean {histogram.sum / histogram.count:.3f}s, "
+                  f"p50 <= {histogram.quantile(0.5)}s, p95 <= {histogram.quantile(0.95)}s")
+
+    async def get_match_data(self, match_id):
+        extension = f"/{match_id}"
+        return await self.get(
+            self.match_region, "match-v5.getMatch", self.base_url_match + extension)
+
+    async def get_rank(self, summoner_id):
+        extension = f"/league/v4/entries/by-summoner/{summoner_id}"
+        entries = await self.get(
+            self.region, "league-v4.getLeagueEntriesForSummoner", self.base_url + extension)
+        for e in entries:
+            if e["queueType"] == "RANKED_SOLO_5x5": return e["tier"]
+        return ""
+
+    def recover(self, log):
+        cut = self.seen.recover(log)
+        if cut: print(f"{self.region} dropped {cut} bytes of {log.log_path.name} never marked seen")
+
+    def save(self):
+        start = time.perf_counter()
+        self.log.add(self.counts.flush())
+        self.log.append()
+        self.seen.commit(self.region, self.log)
+        metrics.observe("save_duration_seconds", time.perf_counter() - start, region=self.region)
+        if time.time() - self.last_compact_time > args.compact_every: self.compact()
+        self.update_gauges()
+
+    def compact(self, final=False):
+        start = time.perf_counter()
+        self.log.add(self.counts.flush())
+        self.log.append()
+        self.seen.commit(self.region, self.log)  # before the snapshot, so it never holds uncommitted counts
+        self.log.compact(*self.counts.to_dicts(), final)
+        if final: self.seen.forget(self.log)
+        self.frontier.save()
+        metrics.observe("compact_duration_seconds", time.perf_counter() - start, region=self.region)
+        if not args.no_build:
+            ensure_build_worker()  # one that died would leave requests waiting
+            update_build_gauges()
+        self.last_compact_time = time.time()
+        self.report()
+
+    def update_gauges(self):
         now = time.time()
-        self.short.append(now)
-        self.long.append(now)
-
-    def backoff(self, duration):
-        self.next = max(self.next, time.time() + duration)
-
-rate_limiter = RateLimiter()
-
-def limited_get(url):
-    while True:
-        rate_limiter.wait()
-        response = requests.get(url, headers={"X-Riot-Token": API_KEY})
-        if response.status_code == 429:
-            retry_after = int(response.headers.get("Retry-After", 1))
-            print(f"Rate limited! Backing off for {retry_after} seconds.")
-            rate_limiter.backoff(retry_after)
-            time.sleep(retry_after)
-            continue
-        response.raise_for_status()
-        return response.json()
-
-
-def get_diamond_plus_seed():
-    extension = "/league/v4/entries/RANKED_SOLO_5x5/DIAMOND/I"
-    return [{
-        "summonerId": entry['summonerId'], 
-        "puuid": get_puuid(entry['summonerId'])
-    } for entry in limited_get(BASE_URL + extension)[:1]]
-
-
-def get_puuid(summoner_id): 
-    extension = f"/summoner/v4/summoners/{summoner_id}"
-    return limited_get(BASE_URL + extension)["puuid"]
-
-
-def get_match_ids(puuid, count=5): 
-    extension = f"/by-puuid/{puuid}/ids?count={count}&queue={QUEUE}"
-    return limited_get(BASE_URL_MATCH + extension)
-
-
-def get_match_data(match_id): 
-    extension = f"/{match_id}"
-    return limited_get( BASE_URL_MATCH + extension )
-
-def normalize_key(champ1, champ2, lane1, lane2):
-    direction = (lane1, champ1) <= (lane2, champ2)
-    if direction: return f"{champ1}+{champ2}+{lane1}+{lane2}"
-    else: return f"{champ2}+{champ1}+{lane2}+{lane1}"
-
-def stream_dump(obj, file_path: str, *, ensure_ascii: bool = False) -> None:
-    enc = json.JSONEncoder(ensure_ascii=ensure_ascii,separators=(",", ":"))
-    Path(file_path).parent.mkdir(parents=True, exist_ok=True)
-    with open(file_path, "w", encoding="utf-8") as f:
-        for chunk in enc.iterencode(obj): f.write(chunk)
-
-def save_data(winrates: dict, synergy: dict) -> None:
-    date_str = datetime.now(UTC).strftime("%Y-%m-%d")
-    stream_dump(winrates, f"game_data/{REGION}_winrate_{date_str}.json")
-    stream_dump(synergy,  f"game_data/{REGION}_synergy_{date_str}.json")
-    #print(f"Saved data for {date_str}")
-
-def champ_dict(): return {"wins": 0, "losses": 0}
-
-def load_existing_data():
-    date_str = datetime.now(UTC).strftime("%Y-%m-%d")
-    winrate_path = Path(f"game_data/{REGION}_winrate_{date_str}.json")
-    synergy_path = Path(f"game_data/{REGION}_synergy_{date_str}.json")
-
-    if winrate_path.exists(): 
-        with open(winrate_path, "r") as f:
-            winrates = json.load(f)
-    else: winrates = {}
-
-    if synergy_path.exists():
-        with open(synergy_path, "r") as f:
-            synergy = json.load(f)
-    else: synergy = {}
-
-    return defaultdict(champ_dict, winrates), \
-           defaultdict(champ_dict, synergy)
-
-
-def get_rank(summoner_id):
-    extension = f"/league/v4/entries/by-summoner/{summoner_id}"
-    for e in limited_get(BASE_URL + extension): 
-        if e["queueType"] == "RANKED_SOLO_5x5": return e["tier"]
-    return ""
-
-def is_emerald_plus(rank): 
-    return rank in ["EMERALD", "DIAMOND", "MASTER", "GRANDMASTER", "CHALLENGER"]
-
-
-time.sleep(10)  # sleep for 10 seconds so server can start first
-
-# Initialize
-seed_dict = {p["puuid"]: p for p in get_diamond_plus_seed()}
-known_puuids = set(seed_dict)
-known_puuids_queue = deque(known_puuids, maxlen=MAX_PUUIDS)
-
-known_matches = set()
-known_matches_queue = deque(maxlen=MAX_MATCHES)
-
-winrates, synergy = load_existing_data()
-
-last_save_time = time.time()
-last_date_str = None
-print("seed_list generated")
-
-try:
-    while True:
-        player = random.choice(list(seed_dict.values()))
-        summoner_id = player["summonerId"]
-        puuid = player["puuid"]
-
-        rank = get_rank(summoner_id)
-        if not is_emerald_plus(rank):
-            print(f"Skip {puuid[:10]} not Emerald+")
-            continue
-
-        #print(f"Processing {puuid[:10]} {rank}")
-
-        try:
-            match_ids = get_match_ids(puuid, count=20)
-            for match_id in match_ids:
-                if match_id in known_matches: continue
-
-                known_matches_queue.append(match_id)
-                known_matches.add(match_id)
-                if len(known_matches_queue) > MAX_MATCHES:
-                    old = known_matches_queue.popleft()
-                    known_matches.discard(old)
-
-                match = get_match_data(match_id)
-                #print(f"processing: {match_id[:10]}")
-                if match['info']['queueId'] != QUEUE:
-                    del match
+        while self.aggregated_times and self.aggregated_times[0] < now - 60:
+            self.aggregated_times.popleft()
+        metrics.set("matches_per_minute", len(self.aggregated_times), region=self.region)
+        metrics.set("matches_in_flight", len(self.in_flight), region=self.region)
+        for tier, players in self.frontier.tiers.items():
+            metrics.set("frontier_players", len(players), region=self.region, tier=tier)
+            metrics.set("frontier_players_ready", len(self.frontier.ready[tier]), region=self.region, tier=tier)
+
+    def aggregate_match(self, match):
+        participants = match['info']['participants']
+        self.counts.add_match(participants)
+        for p in participants:
+            self.frontier.add({"summonerId": p["summonerId"], "puuid": p['puuid']})
+
+    async def seed(self):
+        seeds = await self.get_diamond_plus_seed()
+        for player in seeds: self.frontier.add(player)
+        print(f"{self.region} seed_list generated")
+
+    async def crawler(self, fetch_queue):
+        while True:
+            player = self.frontier.sample()
+            if player is None:
+                wait = self.frontier.next_due()
+                if wait is None: await self.seed()
+                else: await asyncio.sleep(min(wait, 1))  # everyone rests; fetched matches bring new players
+                continue
+            summoner_id = player["summonerId"]
+            puuid = player["puuid"]
+
+            try:
+                rank = self.tiers.tier(puuid, summoner_id)
+                if rank is None: rank = self.frontier.cached_rank(summoner_id)
+                if rank is None:
+                    rank = await self.get_rank(summoner_id)
+                    self.frontier.set_rank(summoner_id, rank)
+                if not is_emerald_plus(rank):
+                    self.frontier.drop(puuid)
+                    print(f"Skip {puuid[:10]} not Emerald+")
                     continue
 
-                participants = match['info']['participants']
-                teams = {100: [], 200: []}
-                for p in participants:
-                    champ = p['championName']
-                    lane = p['teamPosition']
-                    key = f"{champ}+{lane}"
-                    if p['win']: winrates[key]["wins"] += 1
-                    else: winrates[key]["losses"] += 1
-                    teams[p['teamId']].append((champ, lane))
-
-                    ppuuid = p['puuid']
-                    if ppuuid not in known_puuids:
-                        known_puuids_queue.append(ppuuid)
-                        known_puuids.add(ppuuid)
-                        seed_dict[ppuuid] = {
-                            "summonerId": p["summonerId"],
-                            "puuid": ppuuid
-                        }
-                        if len(known_puuids_queue) > MAX_PUUIDS:
-                            removed = known_puuids_queue.popleft()
-                            known_puuids.discard(removed)
-                            seed_dict.pop(removed, None)
-
-                for team_champs in teams.values():
-                    for i in range(len(team_champs)):
-                        for j in range(i + 1, len(team_champs)):
-                            champ1, lane1 = team_champs[i]
-                            champ2, lane2 = team_champs[j]
-                            key = normalize_key(champ1, champ2, lane1, lane2)
-                            win = participants[i]['win']
-                            if win: synergy[key]["wins"] += 1
-                            else: synergy[key]["losses"] += 1
-
-                del match  # Explicitly release large object
-
-            print(f"Processed {REGION} {summoner_id[:10]}")
-            save_data(winrates, synergy)
-
-            current_date_str = datetime.now(UTC).strftime("%Y-%m-%d")
+                #print(f"Processing {puuid[:10]} {rank}")
+
+                crawl_time = time.time()
+                mode = "full" if player.get("crawledAt") is None else "incremental"
+                match_ids, requests = await self.get_new_match_ids(player)
+                new_matches = [m for m in match_ids if m not in self.in_flight and m not in self.seen]
+                self.frontier.crawled(puuid, len(new_matches), crawl_time)
+                metrics.inc("match_ids_requests", requests, region=self.region, mode=mode)
+                metrics.inc("match_ids_returned", len(match_ids), region=self.region, mode=mode)
+                metrics.inc("match_ids_new", len(new_matches), region=self.region, mode=mode)
+                metrics.inc("matches_skipped_known", len(match_ids) - len(new_matches), region=self.region)
+                for match_id in new_matches:
+                    self.in_flight.add(match_id)
+                    await fetch_queue.put(match_id)
+
+                print(f"Queued {self.region} {summoner_id[:10]}")
+
+            except Exception as e:
+                #traceback.print_exc()
+                print(f"Error summoner {summoner_id[:10]}: {e}")
+
+    async def tier_indexer(self):
+        """ Background walk of the league pages, every args.tier_refresh hours """
+        interval = args.tier_refresh * 3600
+        while True:
+            age = self.tiers.age()
+            if age is not None and age < interval:
+                await asyncio.sleep(interval - age)
+                continue
+            try:
+                # Paced so match fetching keeps most of the key's budget
+                pace = 1 / (self.rate_limiter.rate(self.region) * args.tier_share)
+                players = await self.tiers.refresh(self.get, self.base_url, self.region,
+                                                   args.tier_pages or None, pace)
+                room = args.frontier_size - len(self.frontier)
+                for player in players[:max(room, 0)]: self.frontier.add(player)
+                print(f"{self.region} tier index: {len(players)} Emerald+ players")
+            except Exception as e:
+                print(f"Error tier index {self.region}: {e}")
+                await asyncio.sleep(600)
+
+    async def fetcher(self, fetch_queue, match_queue):
+        while True:
+            match_id = await fetch_queue.get()
+            try:
+                match = await self.get_match_data(match_id)
+                #print(f"processing: {match_id[:10]}")
+                metrics.inc("matches_fetched", region=self.region)
+                await match_queue.put(match)
+            except Exception as e:
+                self.in_flight.discard(match_id)  # let a later crawl retry it
+                metrics.inc("match_fetch_errors", region=self.region)
+                print(f"Error match {match_id[:10]}: {e}")
+            finally:
+                fetch_queue.task_done()
+
+    async def aggregator(self, match_queue):
+        last_save_time = last_gc_time = time.time()
+        last_date_str = None
+        while True:
+            match = await match_queue.get()
+            if match['info']['queueId'] == QUEUE:
+                self.aggregate_match(match)
+                metrics.inc("matches_aggregated", region=self.region)
+                self.aggregated_times.append(time.time())
+            else: metrics.inc("matches_wrong_queue", region=self.region)
+            match_id = match['metadata']['matchId']
+            self.seen.add(match_id, self.region)
+            self.in_flight.discard(match_id)
+            del match  # Explicitly release large object
+            if not match_queue.empty() and time.time() - last_save_time < SAVE_EVERY: continue
+
+            # Caught up with the fetchers, or saving is overdue: persist what we have
+            self.save()
+            last_save_time = time.time()
+            current_date_str = today()
+            if current_date_str != self.log.date_str:
+                # Close the finished day and start a fresh log
+                self.compact(final=True)
+                self.counts.clear()
+                self.log = DeltaLog(self.region, current_date_str)
+                self.seen.commit(self.region, self.log)
             if current_date_str != last_date_str:
-                if last_date_str:
-                    winrates.clear()
-                    synergy.clear()
-                if REGION == 'na1': build_game_data()
+                self.seen.prune(args.seen_retention)
+                if not args.no_build: request_build(self.region)
                 last_date_str = current_date_str
 
-            if time.time() - last_save_time > 30:
+            if time.time() - last_gc_time > 30:
                 gc.collect()
-                last_save_time = time.time()
+                last_gc_time = time.time()
 
-        except Exception as e:
-            #traceback.print_exc()
-            print(f"Error summoner {summoner_id[:10]}: {e}")
+    async def run(self):
+        # A checkpointed frontier resumes warm; only an empty one needs seeds
+        if not len(self.frontier): await self.seed()
+        else: print(f"{self.region} frontier resumed with {len(self.frontier)} players")
 
-except KeyboardInterrupt:
-    print("Interrupted by user. Saving progress...")
-    save_data(winrates, synergy)
-    print("Data saved. Exiting cleanly.")
+        fetch_queue = asyncio.Queue(maxsize=args.concurrency * 4)
+        match_queue = asyncio.Queue(maxsize=args.concurrency * 4)
+        await asyncio.gather(
+            self.crawler(fetch_queue),
+            self.aggregator(match_queue),
+            self.tier_indexer(),
+            *(self.fetcher(fetch_queue, match_queue) for _ in range(args.concurrency))
+        )
 
-print(REGION, "Ended suddenly")
\ No newline at end of file
+
+async def write_metrics():
+    while True:
+        await asyncio.sleep(args.metrics_every)
+        try: metrics.write_file(args.metrics_file)
+        except OSError as e: print(f"Error writing metrics: {e}")
+
+
+async def main(collectors):
+    if args.metrics_port: metrics.serve(args.metrics_port)
+    await asyncio.sleep(args.startup_delay)  # so server can start first
+    tasks = [c.run() for c in collectors]
+    if args.metrics_file: tasks.append(write_metrics())
+    await asyncio.gather(*tasks)
+
+
+if __name__ == "__main__":
+    match_regions = list(REGIONS) if args.match_region == "all" else [args.match_region]
+    seen = SeenMatches()
+    collectors = [RegionCollector(match_region, seen) for match_region in match_regions]
+    try:
+        asyncio.run(main(collectors))
+    except KeyboardInterrupt:
+        print("Interrupted by user. Saving progress...")
+        args.no_build = True  # no new build worker on the way out
+        for c in collectors: c.compact()
+        seen.close()
+        client.close()
+        stop_build_worker()
+        print("Data saved. Exiting cleanly.")
+
+    print(args.match_region, "Ended suddenly")
@@ -0,0 +1,377 @@
+import os
+import json
+import argparse
+import numpy as np
+from pathlib import Path
+from contextlib import contextmanager
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+try: import orjson  # optional, parses the JSON day-files several times faster
+except ImportError: orjson = None
+try: import fcntl
+except ImportError: fcntl = None  # Windows: msvcrt locks champion_ids.json instead
+
+'''
+    Columnar on-disk format for the daily winrate/synergy counts.
+
+    A day-file {region}_{prefix}_{date}.npy is a structured NumPy array, one
+    row per key, with champions interned through champion_ids.json and lanes
+    through LANES:
+        winrate: champ, lane, wins, losses
+        synergy: champ1, champ2, lane1, lane2, wins, losses
+    The files can be memory-mapped, and summing a window of days is one
+    concatenate + bincount instead of a dict update per key per file.
+
+    The JSON files stay readable; day_files() lists both and, when a day
+    exists in both formats, picks whichever was written last.
+
+    read_parallel() and merge_parallel() parse day-files on a process pool;
+    merge_parallel() merges each worker's files there and reduces the
+    partial sums pairwise, giving the same array as merge() over all files.
+
+    Convert the existing JSON day-files with
+        python game_data/daystore.py convert [--delete]
+    and check that collectors in separate processes interning new
+    champions at once agree on their ids with
+        python game_data/daystore.py check
+'''
+
+LANES = ["", "TOP", "JUNGLE", "MIDDLE", "BOTTOM", "UTILITY"]
+LANE_IDS = {lane: i for i, lane in enumerate(LANES)}
+
+DTYPES = {
+    "winrate": np.dtype([("champ", "<u2"), ("lane", "u1"),
+                         ("wins", "<u4"), ("losses", "<u4")]),
+    "synergy": np.dtype([("champ1", "<u2"), ("champ2", "<u2"),
+                         ("lane1", "u1"), ("lane2", "u1"),
+                         ("wins", "<u4"), ("losses", "<u4")]),
+}
+
+CHAMPION_IDS_PATH = Path(__file__).parent / "champion_ids.json"
+
+
+def champ_dict(): return {"wins": 0, "losses": 0}
+
+
+class ChampionIds:
+    """
+    Append-only name <-> id table backed by champion_ids.json. Collectors in
+    several processes intern into the same file, so a new champion is
+    numbered under an exclusive lock on champion_ids.json.lock, after
+    re-reading the table: a name another process added keeps its id.
+    """
+    def __init__(self, path=CHAMPION_IDS_PATH):
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self.ids = {}
+        self.names = []
+        self.merge(self.read())
+        self.loaded = len(self.names)
+        self.persist = True  # pool workers only number new champions locally
+
+    def read(self):
+        with open(self.path, "r", encoding="utf-8") as f: return json.load(f)
+
+    def merge(self, ids):
+        """ Take the names and ids of the table on disk """
+        for name, i in ids.items():
+            if self.ids.get(name, i) != i: raise ValueError(f"{name} is {i} in {self.path.name}")
+            self.ids[name] = i
+            if i >= len(self.names): self.names += [None] * (i + 1 - len(self.names))
+            self.names[i] = name
+
+    @contextmanager
+    def locked(self):
+        with open(self.lock_path, "a+b") as f:
+            if fcntl is not None: fcntl.flock(f, fcntl.LOCK_EX)
+            else:
+                import msvcrt
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try: yield
+            finally:
+                if fcntl is not None: fcntl.flock(f, fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def intern(self, name):
+        i = self.ids.get(name)
+        if i is not None: return i
+        if not self.persist:
+            i = len(self.names)
+            self.ids[name] = i
+            self.names.append(name)
+            return i
+        # New champion: number it after whatever other processes added
+        with self.locked():
+            self.merge(self.read())
+            i = self.ids.get(name)
+            if i is not None: return i
+            i = len(self.names)
+            self.ids[name] = i
+            self.names.append(name)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.ids, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        return i
+
+
+_champion_ids = None
+
+def champion_ids():
+    global _champion_ids
+    if _champion_ids is None: _champion_ids = ChampionIds()
+    return _champion_ids
+
+
+def use_champion_ids(path):
+    """ Make the table at `path` this process's champion_ids(), before anything interns """
+    global _champion_ids
+    _champion_ids = ChampionIds(path)
+    return _champion_ids
+
+
+def key_columns(prefix):
+    return [f for f in DTYPES[prefix].names if f not in ("wins", "losses")]
+
+
+def from_dict(counts: dict, prefix: str) -> np.ndarray:
+    """ {"Ahri+MIDDLE": {"wins", "losses"}, ...} -> structured array, in key order """
+    ids = champion_ids()
+    columns = key_columns(prefix)
+    width = len(columns)
+    # One flat list of strings, sliced per column, instead of a list per key
+    parts = "+".join(counts).split("+") if counts else []
+    if len(parts) != width * len(counts): raise ValueError(f"Malformed {prefix} key")
+    names = width // 2  # champion columns come first, then their lanes
+    array = np.empty(len(counts), dtype=DTYPES[prefix])
+    # Lanes first: a misaligned key fails here, before any name is interned
+    for i in range(names, width):
+        array[columns[i]] = [LANE_IDS[part] for part in parts[i::width]]
+    if set().union(*(parts[i::width] for i in range(names))) - ids.ids.keys():
+        # New champions: intern them in the order they appear
+        for i in range(0, len(parts), width):
+            for name in parts[i:i + names]: ids.intern(name)
+    for i in range(names):
+        array[columns[i]] = [ids.ids[part] for part in parts[i::width]]
+    values = counts.values()
+    array["wins"] = [value.get("wins", 0) for value in values]
+    array["losses"] = [value.get("losses", 0) for value in values]
+    return array
+
+
+def to_dict(array: np.ndarray, prefix: str) -> defaultdict:
+    """ structured array -> defaultdict(champ_dict) in the JSON day-file schema """
+    names = champion_ids().names
+    columns = [array[c].tolist() for c in key_columns(prefix)]
+    wins = array["wins"].tolist()
+    losses = array["losses"].tolist()
+    counts = defaultdict(champ_dict)
+    if prefix == "winrate":
+        for champ, lane, w, l in zip(*columns, wins, losses):
+            counts[f"{names[champ]}+{LANES[lane]}"] = {"wins": w, "losses": l}
+    else:
+        for champ1, champ2, lane1, lane2, w, l in zip(*columns, wins, losses):
+            key = f"{names[champ1]}+{names[champ2]}+{LANES[lane1]}+{LANES[lane2]}"
+            counts[key] = {"wins": w, "losses": l}
+    return counts
+
+
+def flat_keys(array: np.ndarray, prefix: str) -> np.ndarray:
+    key = np.zeros(len(array), dtype=np.int64)
+    for column in key_columns(prefix):
+        width = 256 if array.dtype[column] == np.uint8 else 65536
+        key = key * width + array[column].astype(np.int64)
+    return key
+
+
+def merge(arrays, prefix: str, signs=None) -> np.ndarray:
+    """
+    Sum the counts of several day arrays. Keys keep the order of their first
+    appearance, so merging JSON days gives the same order as the dict loader.
+    `signs` (+1/-1 per array) allows subtracting days.
+    """
+    dtype = DTYPES[prefix]
+    arrays = list(arrays)
+    if signs is None: signs = [1] * len(arrays)
+    if not arrays: return np.zeros(0, dtype=dtype)
+    stacked = np.concatenate([np.asarray(a, dtype=dtype) for a in arrays])
+    sign = np.repeat(np.asarray(signs, dtype=np.int64), [len(a) for a in arrays])
+    keys = flat_keys(stacked, prefix)
+    unique, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    wins = np.zeros(len(unique), dtype=np.int64)
+    losses = np.zeros(len(unique), dtype=np.int64)
+    np.add.at(wins, inverse, stacked["wins"].astype(np.int64) * sign)
+    np.add.at(losses, inverse, stacked["losses"].astype(np.int64) * sign)
+
+    merged = stacked[first]
+    keep = (wins != 0) | (losses != 0)
+    if (wins < 0).any() or (losses < 0).any():
+        raise ValueError("Subtracting more games than the aggregate holds")
+    merged["wins"] = wins
+    merged["losses"] = losses
+    order = np.argsort(first[keep], kind="stable")
+    return merged[keep][order]
+
+
+def tree_merge(arrays, prefix: str) -> np.ndarray:
+    """ merge() of adjacent pairs, level by level; same result as one merge() """
+    arrays = list(arrays)
+    if not arrays: return merge([], prefix)
+    while len(arrays) > 1:
+        arrays = [merge(arrays[i:i + 2], prefix) for i in range(0, len(arrays), 2)]
+    return arrays[0]
+
+
+def write_day(array: np.ndarray, file_path) -> None:
+    file_path = Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = file_path.with_name(file_path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, np.asarray(array, dtype=array.dtype))
+    os.replace(tmp_path, file_path)
+
+
+def load_json(file_path):
+    if orjson is not None:
+        with open(file_path, "rb") as f: return orjson.loads(f.read())
+    with open(file_path, "r", encoding="utf-8") as f: return json.load(f)
+
+
+def read_day(file_path, prefix: str) -> np.ndarray:
+    file_path = Path(file_path)
+    if file_path.suffix == ".npy": return np.load(file_path, mmap_mode="r")
+    return from_dict(load_json(file_path), prefix)
+
+
+def read_chunk(files, prefix: str, merged: bool):
+    """
+    Pool worker: the arrays of `files` (None where unreadable), or their
+    merge() with merged=True, plus the skip messages. Champions missing from
+    champion_ids.json get ids local to this process; their names come back
+    with the arrays so the parent can intern them and renumber.
+    """
+    ids = champion_ids()
+    ids.persist = False
+    arrays, errors = [], []
+    for file in files:
+        try: arrays.append(np.asarray(read_day(file, prefix)).copy())
+        except Exception as e:
+            arrays.append(None)
+            errors.append(f"Skipping {Path(file).name}: {e}")
+    if merged: arrays = [merge([a for a in arrays if a is not None], prefix)]
+    return arrays, errors, ids.names[ids.loaded:], ids.loaded
+
+
+def renumber(array, prefix: str, new_names, base: int) -> np.ndarray:
+    """ Map a worker's local ids for new champions onto this process's table """
+    if array is None or not new_names: return array
+    ids = champion_ids()
+    table = np.arange(base + len(new_names), dtype=np.int64)
+    table[base:] = [ids.intern(name) for name in new_names]
+    array = array.copy()
+    for column in key_columns(prefix):
+        if column.startswith("champ"): array[column] = table[array[column]]
+    return array
+
+
+def run_chunks(jobs, merged: bool, processes=None):
+    """ jobs: [(files, prefix)] -> per job, the chunks' arrays in file order """
+    workers = processes or os.cpu_count() or 1
+    chunks = []  # (job, files)
+    for j, (files, prefix) in enumerate(jobs):
+        files = list(files)
+        size = max(1, -(-len(files) * len(jobs) // workers))
+        chunks += [(j, files[i:i + size]) for i in range(0, len(files), size)]
+    results = [[] for _ in jobs]
+    with ProcessPoolExecutor(min(workers, max(len(chunks), 1))) as pool:
+        futures = [(j, pool.submit(read_chunk, files, jobs[j][1], merged)) for j, files in chunks]
+        for j, future in futures:
+            arrays, errors, new_names, base = future.result()
+            for error in errors: print(error)
+            results[j] += [renumber(a, jobs[j][1], new_names, base) for a in arrays]
+    return results
+
+
+def read_parallel(files, prefix: str, processes=None):
+    """ read_day() of every file on a process pool; None for unreadable files """
+    return run_chunks([(files, prefix)], merged=False, processes=processes)[0]
+
+
+def merge_parallel(jobs, processes=None):
+    """ jobs: [(files, prefix)] -> merge() of each job's readable files """
+    return [tree_merge(partials, prefix)
+            for partials, (_, prefix) in zip(run_chunks(jobs, merged=True, processes=processes), jobs)]
+
+
+def day_files(prefix: str, folder=".") -> dict:
+    """ stem -> newest file among the .json/.npy copies of that day """
+    files = {}
+    for pattern in (f"*{prefix}_*.json", f"*{prefix}_*.npy"):
+        for file in Path(folder).glob(pattern):
+            current = files.get(file.stem)
+            if current is None or file.stat().st_mtime_ns > current.stat().st_mtime_ns:
+                files[file.stem] = file
+    return files
+
+
+def convert(folder="game_data", delete=False):
+    """ One-shot conversion of the JSON day-files in `folder` to .npy """
+    converted = 0
+    for prefix in DTYPES:
+        for stem, file in day_files(prefix, folder).items():
+            if file.suffix != ".json": continue
+            array = read_day(file, prefix)
+            write_day(array, file.with_suffix(".npy"))
+            if delete: file.unlink()
+            converted += 1
+            print(f"Converted {file.name} ({len(array)} keys)")
+    return converted
+
+
+def intern_names(path, names, barrier):
+    """ check_intern() worker: intern `names` into the table at `path` """
+    ids = ChampionIds(path)
+    barrier.wait()
+    return {name: ids.intern(name) for name in names}
+
+
+def check_intern(processes=2, names=50):
+    """ Processes interning different new champions at once into one champion_ids.json """
+    import tempfile
+    import multiprocessing
+    with tempfile.TemporaryDirectory() as folder:
+        path = Path(folder) / CHAMPION_IDS_PATH.name
+        path.write_bytes(CHAMPION_IDS_PATH.read_bytes())
+        known = len(ChampionIds(path).ids)
+        with multiprocessing.Manager() as manager, ProcessPoolExecutor(processes) as pool:
+            barrier = manager.Barrier(processes)
+            futures = [pool.submit(intern_names, path, [f"New{p}_{i}" for i in range(names)], barrier)
+                       for p in range(processes)]
+            interned = [future.result() for future in futures]
+        table = ChampionIds(path).ids
+
+    problems = []
+    if len(table) != known + processes * names: problems.append(f"{len(table)} names in the table")
+    if len(set(table.values())) != len(table): problems.append("ids given to two names")
+    for got in interned:
+        problems += [f"{name} is {i} in its process, {table.get(name)} in the table"
+                     for name, i in got.items() if table.get(name) != i]
+    for problem in problems[:10]: print(f"  {problem}")
+    print("✅ Concurrent interning agrees." if not problems else f"❌ {len(problems)} problems.")
+    return len(problems)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["convert", "check"])
+    parser.add_argument("--folder", default="game_data")
+    parser.add_argument("--delete", action="store_true",
+                        help="Remove each JSON file once its .npy is written")
+    args = parser.parse_args()
+    if args.command == "check": raise SystemExit(1 if check_intern() else 0)
+    count = convert(args.folder, args.delete)
+    print(f"{count} files converted")
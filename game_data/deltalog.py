@@ -0,0 +1,197 @@
+import os
+import json
+from pathlib import Path
+from collections import defaultdict
+from daystore import read_day, write_day
+
+'''
+    Append-only persistence for a collector's daily counts.
+
+    Every save appends one line with the count deltas gathered since the
+    previous save:
+        {"w": {"Ahri+MIDDLE": [1, 0], ...}, "s": {"Ahri+Lee+MIDDLE+JUNGLE": [0, 1], ...}}
+    so save cost follows the new data, not the size of the day.
+
+    compact() writes the usual {region}_winrate_{date}.json and
+    {region}_synergy_{date}.json snapshots that databuild reads, then a
+    checkpoint recording how far into the log the snapshot reaches and
+    which snapshot files it belongs to. load() rebuilds the day from the
+    snapshot plus the log tail. If the snapshot does not match its
+    checkpoint (a crash mid-compaction), the whole log is replayed instead.
+    A snapshot from before the log existed is first appended to the log as
+    one delta, so that replay never misses it.
+    A final compaction at the end of the day stores the snapshot as the
+    columnar .npy day-file and removes the JSON and the log.
+
+    Check recovery from crashes during migration and compaction with
+        python game_data/deltalog.py
+'''
+
+def champ_dict(): return {"wins": 0, "losses": 0}
+
+def pair(): return [0, 0]
+
+def stream_dump(obj, file_path: str, *, ensure_ascii: bool = False) -> None:
+    enc = json.JSONEncoder(ensure_ascii=ensure_ascii,separators=(",", ":"))
+    Path(file_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(file_path, "w", encoding="utf-8") as f:
+        for chunk in enc.iterencode(obj): f.write(chunk)
+
+def atomic_dump(obj, file_path: str) -> None:
+    tmp_path = f"{file_path}.tmp"
+    stream_dump(obj, tmp_path)
+    os.replace(tmp_path, file_path)
+
+
+class DeltaLog:
+    def __init__(self, region: str, date_str: str, folder: str = "game_data"):
+        self.region = region
+        self.date_str = date_str
+        self.folder = Path(folder)
+        self.log_path = self.folder / f"{region}_delta_{date_str}.log"
+        self.ckpt_path = self.folder / f"{region}_delta_{date_str}.ckpt"
+        self.winrate_path = self.folder / f"{region}_winrate_{date_str}.json"
+        self.synergy_path = self.folder / f"{region}_synergy_{date_str}.json"
+        self.pending = {"w": defaultdict(pair), "s": defaultdict(pair)}
+        self.tail_checked = False
+
+    def count(self, kind: str, key: str, win: bool) -> None:
+        self.pending[kind][key][0 if win else 1] += 1
+
+    def add(self, delta: dict) -> None:
+        """ Merge a {"w": {key: [w, l]}, "s": ...} delta into the pending one """
+        for kind, counts in delta.items():
+            pending = self.pending[kind]
+            for key, (w, l) in counts.items():
+                pending[key][0] += w
+                pending[key][1] += l
+
+    def append(self) -> None:
+        """ Persist the pending deltas as one log line """
+        if not self.pending["w"] and not self.pending["s"]: return
+        self.folder.mkdir(parents=True, exist_ok=True)
+        line = json.dumps(self.pending, separators=(",", ":"))
+        with open(self.log_path, "a+b") as f:
+            if not self.tail_checked and f.tell() > 0:
+                # Terminate a line torn by a crash so it can't swallow ours
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n": f.write(b"\n")
+            self.tail_checked = True
+            f.write(line.encode("utf-8") + b"\n")
+        self.pending = {"w": defaultdict(pair), "s": defaultdict(pair)}
+
+    def size(self) -> int:
+        return self.log_path.stat().st_size if self.log_path.exists() else 0
+
+    def truncate(self, size: int) -> None:
+        """ Drop the log past `size` bytes, a line boundary """
+        with open(self.log_path, "r+b") as f: f.truncate(size)
+        self.tail_checked = False
+
+    def snapshot_stats(self):
+        return [[p.stat().st_size, p.stat().st_mtime_ns] if p.exists() else None
+                for p in (self.winrate_path, self.synergy_path)]
+
+    def write_checkpoint(self, offset: int) -> None:
+        atomic_dump({"offset": offset, "snapshots": self.snapshot_stats()}, str(self.ckpt_path))
+
+    def compact(self, winrates: dict, synergy: dict, final: bool = False) -> None:
+        """ Write the daily snapshot of `winrates`/`synergy`, which must include every appended delta """
+        self.append()
+        offset = self.log_path.stat().st_size if self.log_path.exists() else 0
+        atomic_dump(winrates, str(self.winrate_path))
+        atomic_dump(synergy, str(self.synergy_path))
+        if final:
+            # The day is complete: keep it in the columnar format
+            for prefix, path in (("winrate", self.winrate_path), ("synergy", self.synergy_path)):
+                write_day(read_day(path, prefix), path.with_suffix(".npy"))
+                path.unlink()
+            self.log_path.unlink(missing_ok=True)
+            self.ckpt_path.unlink(missing_ok=True)
+        else: self.write_checkpoint(offset)
+
+    def load(self):
+        winrates = defaultdict(champ_dict)
+        synergy = defaultdict(champ_dict)
+        offset = 0
+
+        ckpt = None
+        if self.ckpt_path.exists():
+            with open(self.ckpt_path, "r", encoding="utf-8") as f:
+                ckpt = json.load(f)
+
+        snapshot_ok = ckpt is not None and ckpt["snapshots"] == self.snapshot_stats()
+        # Snapshot written before this log existed: it is the base
+        legacy = ckpt is None and not self.log_path.exists()
+        if snapshot_ok or legacy:
+            for path, counts in ((self.winrate_path, winrates), (self.synergy_path, synergy)):
+                if not path.exists(): continue
+                with open(path, "r", encoding="utf-8") as f:
+                    counts.update(json.load(f))
+            if snapshot_ok: offset = ckpt["offset"]
+            else:
+                # Fold it into the log first, so replaying the whole log
+                # (after a crash mid-compaction) still counts it
+                self.add({kind: {key: [c["wins"], c["losses"]] for key, c in counts.items()}
+                          for kind, counts in (("w", winrates), ("s", synergy))})
+                self.append()
+                offset = self.log_path.stat().st_size if self.log_path.exists() else 0
+                self.write_checkpoint(offset)
+
+        if self.log_path.exists():
+            with open(self.log_path, "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    try: delta = json.loads(line)
+                    except ValueError: continue  # line torn by a crash
+                    for kind, counts in (("w", winrates), ("s", synergy)):
+                        for key, (w, l) in delta[kind].items():
+                            counts[key]["wins"] += w
+                            counts[key]["losses"] += l
+
+        return winrates, synergy
+
+    @classmethod
+    def stale(cls, region: str, date_str: str, folder: str = "game_data"):
+        """ Logs of earlier days left behind by a crash, still to be compacted """
+        for path in sorted(Path(folder).glob(f"{region}_delta_*.log")):
+            log_date = path.stem.split("_")[-1]
+            if log_date != date_str: yield cls(region, log_date, folder)
+
+
+def check():
+    """ Every count survives a crash between a compaction's snapshot and its checkpoint """
+    import tempfile
+    winrates = {"Ahri+MIDDLE": {"wins": 3, "losses": 2}}
+    synergy = {"Ahri+Lee+MIDDLE+JUNGLE": {"wins": 1, "losses": 4}}
+    expected_w = {"Ahri+MIDDLE": {"wins": 4, "losses": 2}, "Lee+JUNGLE": {"wins": 0, "losses": 1}}
+    problems = []
+    for crash in ("migration", "compaction"):
+        with tempfile.TemporaryDirectory() as folder:
+            log = DeltaLog("na1", "2025-01-01", folder)
+            atomic_dump(winrates, str(log.winrate_path))
+            atomic_dump(synergy, str(log.synergy_path))
+            if crash == "migration":
+                # Killed after the snapshot went into the log, before the checkpoint
+                log.write_checkpoint = lambda offset: None
+                log.load()
+                log = DeltaLog("na1", "2025-01-01", folder)
+            counts, pairs = log.load()
+            if (counts, pairs) != (winrates, synergy): problems.append(f"{crash}: legacy snapshot not loaded")
+            log.count("w", "Ahri+MIDDLE", True)
+            log.count("w", "Lee+JUNGLE", False)
+            log.append()
+            if crash == "compaction":
+                # Killed after the new snapshots, before their checkpoint
+                log.write_checkpoint = lambda offset: None
+                log.compact(expected_w, synergy)
+            counts, pairs = DeltaLog("na1", "2025-01-01", folder).load()
+            if counts != expected_w or pairs != synergy:
+                problems.append(f"{crash}: reloaded {dict(counts)} {dict(pairs)}")
+    for problem in problems: print(f"  {problem}")
+    print("✅ Crashes lose no counts." if not problems else f"❌ {len(problems)} problems.")
+    return len(problems)
+
+
+if __name__ == "__main__":
+    raise SystemExit(1 if check() else 0)
@@ -0,0 +1,443 @@
+import os
+import sys
+import json
+import gzip
+import math
+import time
+import random
+import signal
+import sqlite3
+import argparse
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from collections import Counter, deque, defaultdict
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+'''
+    Local stand-in for the Riot API, and an offline throughput benchmark
+    for datagen.py.
+
+    The server answers the calls datagen makes (league pages and apex
+    leagues, summoner, league entries by summoner, match ids by puuid,
+    match) from a seeded synthetic world, or from recorded match-v5 payloads
+    with --matches DIR. The routing value is the first path segment, so
+    datagen is pointed at it with
+        --base-url http://127.0.0.1:8089/{routing}
+
+    Like the real API it sends X-App-Rate-Limit(-Count) and
+    X-Method-Rate-Limit(-Count) headers, enforces those windows with 429s,
+    gzips bodies on request, and can add latency and random 429/5xx.
+    The world's matches are spread from --history-days ago until an hour
+    after the server started; only those already "played" are listed, so
+    revisited players keep producing new ids.
+
+        python game_data/fakeriot.py serve [--port 8089] [--seed 1]
+        python game_data/fakeriot.py bench [--duration 60] [--seed 1] [--concurrency 8]
+
+    bench serves on a free port, runs datagen.py against it in a temporary
+    directory with its own copy of champion_ids.json, stops it with SIGINT,
+    and reports matches counted per second, requests per match and
+    datagen's peak RSS (read from /proc, so Linux only).
+'''
+
+REGIONS = {  # match routing -> platform, as in datagen.py
+    "americas": "na1",
+    "europe": "euw1",
+    "asia": "kr",
+}
+LANES = ["TOP", "JUNGLE", "MIDDLE", "BOTTOM", "UTILITY"]
+TIER_WEIGHTS = {
+    "PLATINUM": 15, "EMERALD": 40, "DIAMOND": 30,
+    "MASTER": 10, "GRANDMASTER": 3, "CHALLENGER": 2,
+}
+APEX_PATHS = {"challengerleagues": "CHALLENGER", "grandmasterleagues": "GRANDMASTER",
+              "masterleagues": "MASTER"}
+DIVISIONS = ["I", "II", "III", "IV"]
+PAGE_SIZE = 205  # entries per league-v4 page
+
+# Development key defaults are too slow to benchmark against
+APP_LIMITS = "500:10,30000:600"
+METHOD_LIMITS = {
+    "league-v4.getLeagueEntries": "50:10",
+    "league-v4.getLeagueEntriesForSummoner": "100:60",
+    "league-v4.getChallengerLeague": "30:10",
+    "league-v4.getGrandmasterLeague": "30:10",
+    "league-v4.getMasterLeague": "30:10",
+    "summoner-v4.getBySummonerId": "1600:60",
+    "match-v5.getMatchIdsByPUUID": "2000:10",
+    "match-v5.getMatch": "2000:10",
+}
+
+CHAMPIONS = list(json.loads((Path(__file__).parent / "champion_ids.json").read_text()))
+
+
+def parse_limits(header):
+    return [tuple(map(int, part.split(":"))) for part in header.split(",") if part]
+
+
+class World:
+    '''
+        Players and matches of one platform. A player has a tier (and a
+        division below Master); a match has 10 participants and a start
+        time. Each player's history is kept newest first.
+    '''
+    def __init__(self, routing, seed, players=3000, matches=30000, history_days=7,
+                 wrong_queue=0.05, recorded=None, now=None):
+        self.routing = routing
+        self.platform = REGIONS[routing]
+        rng = random.Random(f"{seed}:{routing}")
+        now = time.time() if now is None else now
+        self.matches = {}  # matchId -> payload
+        self.history = defaultdict(list)  # puuid -> [(start seconds, matchId)]
+        self.players = {}  # summonerId -> {"puuid", "summonerId", "tier", "rank"}
+
+        if recorded:
+            payloads = recorded
+            for payload in payloads:
+                for p in payload["info"]["participants"]:
+                    self.players.setdefault(p["summonerId"], {"puuid": p["puuid"], "summonerId": p["summonerId"]})
+        else:
+            for i in range(players):
+                summoner_id = f"{self.platform}-s{rng.getrandbits(64):016x}"
+                puuid = f"{self.platform}-p{rng.getrandbits(128):032x}"
+                self.players[summoner_id] = {"puuid": puuid, "summonerId": summoner_id}
+            roster = list(self.players.values())
+            span = history_days * 86400 + 3600
+            payloads = [self.synthetic_match(rng, k, roster, now - history_days * 86400 + rng.random() * span,
+                                             wrong_queue)
+                        for k in range(matches)]
+
+        tiers, weights = list(TIER_WEIGHTS), list(TIER_WEIGHTS.values())
+        for player in self.players.values():
+            player["tier"] = rng.choices(tiers, weights)[0]
+            player["rank"] = "I" if player["tier"] in APEX_PATHS.values() else rng.choice(DIVISIONS)
+        self.by_puuid = {p["puuid"]: p for p in self.players.values()}
+
+        for payload in payloads:
+            match_id = payload["metadata"]["matchId"]
+            self.matches[match_id] = payload
+            start = payload["info"]["gameStartTimestamp"] / 1000
+            for p in payload["info"]["participants"]:
+                self.history[p["puuid"]].append((start, match_id))
+        for games in self.history.values(): games.sort(reverse=True)
+
+    def synthetic_match(self, rng, k, roster, start, wrong_queue):
+        match_id = f"{self.platform.upper()}_{5000000000 + k}"
+        champions = rng.sample(CHAMPIONS, 10)
+        winner = rng.choice((100, 200))
+        duration = rng.randint(900, 2700)
+        participants = []
+        for i, player in enumerate(rng.sample(roster, 10)):
+            team = 100 if i < 5 else 200
+            kills, deaths = rng.randint(0, 15), rng.randint(0, 12)
+            participants.append({
+                "puuid": player["puuid"], "summonerId": player["summonerId"],
+                "championName": champions[i], "championId": CHAMPIONS.index(champions[i]),
+                "teamPosition": LANES[i % 5], "individualPosition": LANES[i % 5],
+                "teamId": team, "win": team == winner,
+                "kills": kills, "deaths": deaths, "assists": rng.randint(0, 20),
+                "champLevel": rng.randint(11, 18), "goldEarned": rng.randint(6000, 20000),
+                "totalMinionsKilled": rng.randint(10, 300), "visionScore": rng.randint(5, 90),
+                "totalDamageDealtToChampions": rng.randint(5000, 60000),
+                "item0": rng.randint(1000, 7000), "item1": rng.randint(1000, 7000),
+                "item2": rng.randint(1000, 7000), "item3": rng.randint(1000, 7000),
+            })
+        return {
+            "metadata": {"dataVersion": "2", "matchId": match_id,
+                         "participants": [p["puuid"] for p in participants]},
+            "info": {
+                "gameCreation": int(start * 1000) - 60000, "gameStartTimestamp": int(start * 1000),
+                "gameDuration": duration, "gameMode": "CLASSIC", "mapId": 11,
+                "platformId": self.platform.upper(),
+                "queueId": 440 if rng.random() < wrong_queue else 420,
+                "participants": participants,
+            },
+        }
+
+    def entry(self, player):
+        return {"summonerId": player["summonerId"], "puuid": player["puuid"],
+                "queueType": "RANKED_SOLO_5x5", "tier": player["tier"], "rank": player["rank"],
+                "leaguePoints": 50, "wins": 60, "losses": 55}
+
+    def league_page(self, tier, division, page):
+        players = [p for p in self.players.values() if p["tier"] == tier and p["rank"] == division]
+        return [self.entry(p) for p in players[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]]
+
+    def apex_league(self, tier):
+        return {"tier": tier, "queue": "RANKED_SOLO_5x5",
+                "entries": [self.entry(p) for p in self.players.values() if p["tier"] == tier]}
+
+    def match_ids(self, puuid, now, start=0, count=20, start_time=None, queue=None):
+        ids = [match_id for started, match_id in self.history.get(puuid, ())
+               if started <= now and (start_time is None or started >= start_time)
+               and (queue is None or self.matches[match_id]["info"]["queueId"] == queue)]
+        return ids[start:start + count]
+
+
+class Limits:
+    ''' Sliding-window counts the way the server keeps them, per routing and per method '''
+    def __init__(self, app_limits=APP_LIMITS, method_limits=METHOD_LIMITS):
+        self.app_limits = app_limits
+        self.method_limits = method_limits
+        self.hits = defaultdict(deque)  # (routing, method or None, seconds) -> [times]
+        self.lock = threading.Lock()
+
+    def windows(self, routing, method):
+        return ([(None, c, s) for c, s in parse_limits(self.app_limits)] +
+                [(method, c, s) for c, s in parse_limits(self.method_limits.get(method, "2000:10"))])
+
+    def take(self, routing, method, now):
+        """ Count a request; returns (headers, retry_after or None) """
+        with self.lock:
+            windows = self.windows(routing, method)
+            retry_after, limit_type = None, None
+            for scope, count, seconds in windows:
+                hits = self.hits[routing, scope, seconds]
+                while hits and hits[0] <= now - seconds: hits.popleft()
+                if len(hits) >= count:
+                    wait = math.ceil(hits[0] + seconds - now)
+                    if retry_after is None or wait > retry_after:
+                        retry_after, limit_type = wait, "method" if scope else "application"
+            if retry_after is None:
+                for scope, _, seconds in windows: self.hits[routing, scope, seconds].append(now)
+
+            def counts(scope, header):
+                return ",".join(f"{len(self.hits[routing, scope, s])}:{s}" for _, s in parse_limits(header))
+            headers = {
+                "X-App-Rate-Limit": self.app_limits,
+                "X-App-Rate-Limit-Count": counts(None, self.app_limits),
+                "X-Method-Rate-Limit": self.method_limits.get(method, "2000:10"),
+                "X-Method-Rate-Limit-Count": counts(method, self.method_limits.get(method, "2000:10")),
+            }
+            if retry_after is not None:
+                headers["Retry-After"] = str(max(retry_after, 1))
+                headers["X-Rate-Limit-Type"] = limit_type
+            return headers, retry_after
+
+
+class FakeRiot(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, seed=1, latency=0.05, fail_429=0.0, fail_5xx=0.0,
+                 app_limits=APP_LIMITS, world_options=None):
+        super().__init__(address, Handler)
+        self.seed = seed
+        self.latency = latency
+        self.fail_429 = fail_429
+        self.fail_5xx = fail_5xx
+        self.limits = Limits(app_limits)
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.started = time.time()
+        self.world_options = world_options or {}
+        self.worlds = {}  # match routing -> World
+        self.worlds_lock = threading.Lock()
+        self.stats = Counter()  # (method, status) -> responses
+
+    def world(self, routing):
+        match_routing = next((r for r, p in REGIONS.items() if routing in (r, p)), None)
+        if match_routing is None: return None
+        with self.worlds_lock:
+            if match_routing not in self.worlds:
+                self.worlds[match_routing] = World(match_routing, self.seed, now=self.started,
+                                                   **self.world_options)
+            return self.worlds[match_routing]
+
+    def roll(self):
+        """ (latency, injected status or None) for one request """
+        with self.rng_lock:
+            latency = self.rng.lognormvariate(math.log(self.latency), 0.5) if self.latency > 0 else 0
+            roll = self.rng.random()
+        if roll < self.fail_429: return latency, 429
+        if roll < self.fail_429 + self.fail_5xx: return latency, 503
+        return latency, None
+
+
+def route(world, parts, query, now):
+    """ (method, payload or None for 404) for /lol/... path segments """
+    if parts[:2] == ["league", "v4"]:
+        if parts[2] == "entries" and parts[3] == "by-summoner":
+            player = world.players.get(parts[4])
+            entries = [world.entry(player)] if player and player["tier"] in TIER_WEIGHTS else []
+            return "league-v4.getLeagueEntriesForSummoner", entries
+        if parts[2] == "entries":
+            tier, division = parts[4], parts[5]
+            page = int(query.get("page", ["1"])[0])
+            return "league-v4.getLeagueEntries", world.league_page(tier, division, page)
+        tier = APEX_PATHS.get(parts[2])
+        if tier:
+            return f"league-v4.get{tier.title()}League", world.apex_league(tier)
+    if parts[:3] == ["summoner", "v4", "summoners"]:
+        player = world.players.get(parts[3])
+        return "summoner-v4.getBySummonerId", player and {
+            "id": player["summonerId"], "puuid": player["puuid"], "summonerLevel": 300}
+    if parts[:3] == ["match", "v5", "matches"]:
+        if parts[3] == "by-puuid":
+            start_time = query.get("startTime")
+            queue = query.get("queue")
+            return "match-v5.getMatchIdsByPUUID", world.match_ids(
+                parts[4], now,
+                start=int(query.get("start", ["0"])[0]),
+                count=min(int(query.get("count", ["20"])[0]), 100),
+                start_time=int(start_time[0]) if start_time else None,
+                queue=int(queue[0]) if queue else None)
+        match = world.matches.get(parts[3])
+        if match and match["info"]["gameStartTimestamp"] / 1000 > now: match = None
+        return "match-v5.getMatch", match
+    return "unknown", None
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def log_message(self, *args): pass
+
+    def reply(self, status, payload=None, headers=()):
+        body = json.dumps(payload if payload is not None else
+                          {"status": {"message": "error", "status_code": status}}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json;charset=utf-8")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=1)
+            self.send_header("Content-Encoding", "gzip")
+        for name, value in dict(headers).items(): self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        url = urlsplit(self.path)
+        routing, *parts = url.path.strip("/").split("/")
+        world = server.world(routing)
+        if world is None or parts[:1] != ["lol"]:
+            server.stats["unknown", 404] += 1
+            return self.reply(404)
+        now = time.time()
+        method, payload = route(world, parts[1:], parse_qs(url.query), now)
+
+        latency, injected = server.roll()
+        time.sleep(latency)
+        headers, retry_after = server.limits.take(routing, method, now)
+        if retry_after is not None: status = 429
+        elif injected == 429:
+            status = 429
+            headers.update({"Retry-After": "1", "X-Rate-Limit-Type": "service"})
+        elif injected: status = injected
+        else: status = 200 if payload is not None else 404
+        server.stats[method, status] += 1
+        self.reply(status, payload if status == 200 else None, headers)
+
+
+def make_server(args, port):
+    recorded = None
+    if args.matches:
+        recorded = [json.loads(p.read_text(encoding="utf-8")) for p in sorted(Path(args.matches).glob("*.json"))]
+    world_options = {"players": args.players, "matches": args.world_matches,
+                     "history_days": args.history_days, "recorded": recorded}
+    return FakeRiot(("127.0.0.1", port), seed=args.seed, latency=args.latency,
+                      fail_429=args.fail_429, fail_5xx=args.fail_5xx,
+                      app_limits=args.app_limit, world_options=world_options)
+
+
+def peak_rss_mb(pid):
+    """ High-water RSS of a running process, from /proc (Linux only) """
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"): return int(line.split()[1]) / 2**10
+    except OSError: pass
+    return None
+
+
+def bench(args):
+    server = make_server(args, 0)
+    port = server.server_address[1]
+    for routing in ([args.match_region] if args.match_region != "all" else REGIONS):
+        server.world(routing)  # build before timing starts
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    datagen = Path(__file__).parent / "datagen.py"
+    with tempfile.TemporaryDirectory() as workdir:
+        # datagen interns new champions into its own copy, never the repo's table
+        champion_ids = Path(workdir) / "game_data" / "champion_ids.json"
+        champion_ids.parent.mkdir()
+        champion_ids.write_bytes((Path(__file__).parent / "champion_ids.json").read_bytes())
+        command = [sys.executable, "-u", str(datagen),
+                   "--champion-ids", str(champion_ids),
+                   f"--match-region={args.match_region}",
+                   "--base-url", f"http://127.0.0.1:{port}/{{routing}}",
+                   "--app-limit", args.app_limit,
+                   "--concurrency", str(args.concurrency),
+                   "--seed", str(args.seed),
+                   "--startup-delay", "0", "--no-build"]
+        env = dict(os.environ, RIOT_API_KEY="fake-riot-key")
+        with open(Path(workdir) / "datagen.log", "w") as log:
+            start = time.perf_counter()
+            process = subprocess.Popen(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+            # The forked child starts with our RSS, so sample its own after exec
+            rss, stopping = None, False
+            while process.poll() is None:
+                rss = max(filter(None, (rss, peak_rss_mb(process.pid))), default=None)
+                if not stopping and time.perf_counter() - start >= args.duration:
+                    process.send_signal(signal.SIGINT if os.name != "nt" else signal.SIGTERM)
+                    stopping = True
+                time.sleep(0.2)
+            elapsed = time.perf_counter() - start
+        server.shutdown()
+
+        seen_path = Path(workdir) / "game_data" / "seen_matches.sqlite3"
+        matches = 0
+        if seen_path.exists():
+            with sqlite3.connect(seen_path) as db:
+                matches = db.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+        if args.keep_log:
+            print((Path(workdir) / "datagen.log").read_text()[-4000:])
+
+    requests = sum(server.stats.values())
+    throttled = sum(n for (_, status), n in server.stats.items() if status == 429)
+    report = {
+        "seed": args.seed, "duration": round(elapsed, 2), "matches": matches,
+        "matches_per_s": round(matches / elapsed, 2),
+        "requests": requests, "requests_per_match": round(requests / max(matches, 1), 2),
+        "throttled": throttled, "peak_rss_mb": rss and round(rss, 1),
+    }
+    for (method, status), n in sorted(server.stats.items()):
+        print(f"{method:40} {status}  {n}")
+    print(f"{matches} matches in {elapsed:.1f}s: {report['matches_per_s']} matches/s, "
+          f"{report['requests_per_match']} requests/match, {throttled} 429s, "
+          f"peak RSS {report['peak_rss_mb']} MB")
+    if args.json: print(json.dumps(report))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Riot API stand-in and datagen benchmark")
+    parser.add_argument("command", choices=["serve", "bench"])
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.05, help="Median seconds per response")
+    parser.add_argument("--fail-429", type=float, default=0.0, help="Share of service 429s")
+    parser.add_argument("--fail-5xx", type=float, default=0.0, help="Share of 503s")
+    parser.add_argument("--app-limit", default=APP_LIMITS)
+    parser.add_argument("--players", type=int, default=3000, help="Synthetic players per region")
+    parser.add_argument("--world-matches", type=int, default=30000, help="Synthetic matches per region")
+    parser.add_argument("--history-days", type=float, default=7)
+    parser.add_argument("--matches", help="Directory of recorded match-v5 payloads to serve instead")
+    parser.add_argument("--duration", type=float, default=60, help="bench: seconds to run datagen")
+    parser.add_argument("--match-region", default="americas", choices=list(REGIONS) + ["all"])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--keep-log", action="store_true", help="bench: print the tail of datagen's output")
+    parser.add_argument("--json", action="store_true", help="bench: also print the report as JSON")
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        bench(args)
+    else:
+        server = make_server(args, args.port)
+        print(f"Fake Riot API on http://127.0.0.1:{args.port}/{{routing}}")
+        try: server.serve_forever()
+        except KeyboardInterrupt: server.server_close()
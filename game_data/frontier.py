@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import heapq
+import random
+from pathlib import Path
+
+'''
+    Crawl frontier for one region: the players the crawler may visit next.
+
+    Players sit in one of three tiers, each an indexed list so adding,
+    removing and sampling are O(1):
+        fresh       discovered in a match, never crawled
+        productive  their last match-id page had matches we had not seen
+        exhausted   their last page was all known; revisited rarely, once
+                    they have had time to play again
+    A crawled player rests for their tier's REPLAY_AFTER seconds before
+    they can be sampled again, in a heap ordered by when they are due, so
+    a player just drained is not asked for the same ids over and over.
+    sample() picks a tier by weight among the ones with players ready,
+    then a player uniformly inside it; None when everyone is resting or
+    the frontier is empty.
+
+    Ranks are cached per summonerId for `rank_ttl` seconds, so a player
+    picked again (or met again in another match) costs no league-v4 call.
+
+    Each player also carries the time their match ids were last fetched
+    ("crawledAt"), the watermark for asking only for newer matches.
+
+    save()/load() checkpoint the frontier and the rank cache to
+    {region}_frontier.json, so a restart resumes from where it stopped
+    instead of re-seeding from a league page.
+
+    Check the replay scheduling with
+        python game_data/frontier.py
+'''
+
+TIERS = {"fresh": 5, "productive": 4, "exhausted": 1}  # sampling weights
+# Seconds after a crawl before a player is sampled again: about one game for
+# a productive player, a play session for an exhausted one
+REPLAY_AFTER = {"fresh": 0, "productive": 3600, "exhausted": 6 * 3600}
+
+
+class IndexedSet:
+    """ Set with O(1) add, discard and uniform random choice """
+    def __init__(self):
+        self.items = []
+        self.index = {}
+
+    def __len__(self): return len(self.items)
+
+    def __contains__(self, item): return item in self.index
+
+    def add(self, item):
+        if item in self.index: return
+        self.index[item] = len(self.items)
+        self.items.append(item)
+
+    def discard(self, item):
+        i = self.index.pop(item, None)
+        if i is None: return
+        last = self.items.pop()
+        if i < len(self.items):
+            self.items[i] = last
+            self.index[last] = i
+
+    def choice(self, rng=random):
+        return self.items[rng.randrange(len(self.items))]
+
+
+class Frontier:
+    def __init__(self, path, max_players=5000, rank_ttl=6 * 3600, clock=time.time, rng=random,
+                 replay_after=REPLAY_AFTER):
+        self.path = Path(path)
+        self.max_players = max_players
+        self.rank_ttl = rank_ttl
+        self.replay_after = replay_after
+        self.clock = clock
+        self.rng = rng
+        self.players = {}  # puuid -> {"summonerId", "puuid", "crawledAt"}
+        self.tier_of = {}  # puuid -> tier name
+        self.tiers = {tier: IndexedSet() for tier in TIERS}  # every player, by tier
+        self.ready = {tier: IndexedSet() for tier in TIERS}  # the ones sample() may pick
+        self.resting = []  # heap of [due, puuid]; stale once the player is crawled again or dropped
+        self.ranks = {}    # summonerId -> [tier, time ranked]
+
+    def __len__(self): return len(self.players)
+
+    def __contains__(self, puuid): return puuid in self.players
+
+    def due(self, puuid):
+        """ When a player may be sampled again """
+        crawled_at = self.players[puuid]["crawledAt"]
+        if crawled_at is None: return 0
+        return crawled_at + self.replay_after[self.tier_of[puuid]]
+
+    def move(self, puuid, tier):
+        """ Put a player in `tier`, ready or resting depending on their last crawl """
+        current = self.tier_of.get(puuid)
+        if current:
+            self.tiers[current].discard(puuid)
+            self.ready[current].discard(puuid)
+        self.tiers[tier].add(puuid)
+        self.tier_of[puuid] = tier
+        due = self.due(puuid)
+        if due <= self.clock(): self.ready[tier].add(puuid)
+        else: heapq.heappush(self.resting, [due, puuid])
+
+    def wake(self):
+        """ Make the players whose rest is over ready again """
+        now = self.clock()
+        while self.resting and self.resting[0][0] <= now:
+            due, puuid = heapq.heappop(self.resting)
+            if puuid in self.players and self.due(puuid) == due:
+                self.ready[self.tier_of[puuid]].add(puuid)
+
+    def next_due(self):
+        """ Seconds until a resting player is ready, None if none is resting """
+        while self.resting:
+            due, puuid = self.resting[0]
+            if puuid in self.players and self.due(puuid) == due: return max(due - self.clock(), 0)
+            heapq.heappop(self.resting)
+        return None
+
+    def add(self, player, tier="fresh", crawled_at=None):
+        """ A player met in a match or a league page; known players keep their tier """
+        puuid = player["puuid"]
+        if puuid in self.players: return
+        if len(self.players) >= self.max_players:
+            # Full: make room at the expense of the least promising tier
+            for victim_tier in reversed(TIERS):
+                if self.tiers[victim_tier]:
+                    self.drop(self.tiers[victim_tier].choice(self.rng))
+                    break
+        self.players[puuid] = {"summonerId": player["summonerId"], "puuid": puuid,
+                               "crawledAt": crawled_at}
+        self.move(puuid, tier)
+
+    def drop(self, puuid):
+        self.players.pop(puuid, None)
+        tier = self.tier_of.pop(puuid, None)
+        if tier:
+            self.tiers[tier].discard(puuid)
+            self.ready[tier].discard(puuid)
+
+    def sample(self):
+        """ Next player to crawl, or None when no player is ready """
+        self.wake()
+        tiers = [tier for tier in TIERS if self.ready[tier]]
+        if not tiers: return None
+        tier = self.rng.choices(tiers, weights=[TIERS[t] for t in tiers])[0]
+        return self.players[self.ready[tier].choice(self.rng)]
+
+    def crawled(self, puuid, new_matches, crawled_at):
+        """ Record what a player's match-id pages gave us, and when they were asked for """
+        if puuid in self.players:
+            self.players[puuid]["crawledAt"] = crawled_at
+            self.move(puuid, "productive" if new_matches else "exhausted")
+
+    def cached_rank(self, summoner_id):
+        entry = self.ranks.get(summoner_id)
+        if entry is None or self.clock() - entry[1] > self.rank_ttl: return None
+        return entry[0]
+
+    def set_rank(self, summoner_id, tier):
+        self.ranks[summoner_id] = [tier, self.clock()]
+
+    def save(self):
+        now = self.clock()
+        self.ranks = {s: e for s, e in self.ranks.items() if now - e[1] <= self.rank_ttl}
+        state = {
+            "players": [[player["summonerId"], p, self.tier_of[p], player["crawledAt"]]
+                        for p, player in self.players.items()],
+            "ranks": self.ranks,
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        if not self.path.exists(): return
+        with open(self.path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        for summoner_id, puuid, tier, *crawled_at in state["players"]:
+            self.add({"summonerId": summoner_id, "puuid": puuid}, tier, *crawled_at)
+        self.ranks.update(state["ranks"])
+
+
+def check():
+    """ A crawled player is not sampled again before their tier's REPLAY_AFTER """
+    now = [1_000_000.0]
+    frontier = Frontier("unused_frontier.json", clock=lambda: now[0], rng=random.Random(0))
+    problems = []
+    for tier in ("productive", "exhausted"):
+        frontier.add({"summonerId": "s", "puuid": "p"})
+        if frontier.sample() is None: problems.append("fresh player not sampled")
+        crawled_at = now[0]
+        frontier.crawled("p", tier == "productive", crawled_at)
+        for wait in (0, REPLAY_AFTER[tier] / 2, REPLAY_AFTER[tier] - 1):
+            now[0] = crawled_at + wait
+            if frontier.sample() is not None: problems.append(f"{tier} player sampled {wait:.0f}s after a crawl")
+        if frontier.next_due() != 1: problems.append(f"{tier} player due in {frontier.next_due()}s, not 1s")
+        now[0] += 1
+        if frontier.sample() is None: problems.append(f"{tier} player not sampled after REPLAY_AFTER")
+        frontier.drop("p")
+        if frontier.next_due() is not None or frontier.sample() is not None:
+            problems.append("dropped player still scheduled")
+
+    # A resumed frontier keeps resting whoever was crawled recently
+    frontier.add({"summonerId": "s", "puuid": "p"}, "exhausted", now[0])
+    frontier.add({"summonerId": "t", "puuid": "q"}, "exhausted", now[0] - REPLAY_AFTER["exhausted"])
+    picks = {frontier.sample()["puuid"] for _ in range(20)}
+    if picks != {"q"}: problems.append(f"sampled {sorted(picks)} from a resumed frontier, not ['q']")
+
+    for problem in problems: print(f"  {problem}")
+    print("✅ Crawled players rest before being sampled again." if not problems else f"❌ {len(problems)} problems.")
+    return len(problems)
+
+
+if __name__ == "__main__":
+    raise SystemExit(1 if check() else 0)
@@ -0,0 +1,209 @@
+import os
+import json
+import heapq
+import hashlib
+import itertools
+from pathlib import Path
+from datetime import datetime, timezone
+
+'''
+    Output formats of build_game_data.
+
+    legacy: game_data.json is the formated_lane dict, every champion
+    carrying name-keyed synergy/delta maps, and _meta.synergy_powers lists
+    every cross-lane pair.
+
+    compact (version 2): names are stored once and champions refer to them
+    by index, per-lane values are columns, and synergy points/deltas are one
+    matrix per lane pair (rows: first lane's champions, columns: second
+    lane's; null where both are the same champion). The reverse direction is
+    the transpose, since synergy is symmetric.
+        {"version": 2,
+         "lanes": ["TOP", ...],
+         "names": ["Aatrox", ...],
+         "champions": {"TOP": {"name": [0, 7, ...], "points": [...],
+                               "power": [...], "winrate": [...]}, ...},
+         "synergy": {"TOP+MIDDLE": [[2, null, ...], ...], ...},
+         "delta": {"TOP+MIDDLE": [[0.013, null, ...], ...], ...},
+         "_meta": {..., "synergy_powers_file": "game_data_synergy.json"}}
+    The strongest `top_k` pairs go to the synergy_powers_file sidecar.
+
+    inflate_game_data() (and inflateGameData in game.js) turn a compact file
+    back into the legacy structure.
+
+    publish() writes a build's files atomically, stamps _meta with a
+    build_version and a content_hash, and writes game_data_manifest.json
+    for the server to poll. A build whose files hash the same as the last
+    published one is not written at all.
+'''
+
+GAME_DATA_VERSION = 2
+CHAMPION_COLUMNS = ['points', 'power', 'winrate']
+
+
+def lane_pairs(lanes):
+    return [(a, b) for i, a in enumerate(lanes) for b in lanes[i + 1:]]
+
+
+def compact_game_data(formated_lane, meta):
+    lanes = [lane for lane in formated_lane if lane != '_meta']
+    names, name_ids = [], {}
+    for lane in lanes:
+        for champion in formated_lane[lane]:
+            if champion['name'] not in name_ids:
+                name_ids[champion['name']] = len(names)
+                names.append(champion['name'])
+
+    champions = {}
+    for lane in lanes:
+        columns = {'name': [name_ids[c['name']] for c in formated_lane[lane]]}
+        for column in CHAMPION_COLUMNS:
+            columns[column] = [c[column] for c in formated_lane[lane]]
+        champions[lane] = columns
+
+    synergy, delta = {}, {}
+    for lane_a, lane_b in lane_pairs(lanes):
+        key = f"{lane_a}+{lane_b}"
+        synergy[key] = [[c['synergy'][lane_b].get(other['name']) for other in formated_lane[lane_b]]
+                        for c in formated_lane[lane_a]]
+        delta[key] = [[c['delta'][lane_b].get(other['name']) for other in formated_lane[lane_b]]
+                      for c in formated_lane[lane_a]]
+
+    return {
+        'version': GAME_DATA_VERSION,
+        'lanes': lanes,
+        'names': names,
+        'champions': champions,
+        'synergy': synergy,
+        'delta': delta,
+        '_meta': meta,
+    }
+
+
+def inflate_game_data(data):
+    """ compact game data -> the legacy formated_lane structure """
+    if data.get('version') != GAME_DATA_VERSION: return data
+    lanes, names = data['lanes'], data['names']
+    formated_lane = {}
+    for lane in lanes:
+        columns = data['champions'][lane]
+        formated_lane[lane] = [{
+            'name': names[n],
+            'lane': lane,
+            **{column: columns[column][i] for column in CHAMPION_COLUMNS},
+            'synergy': {l: {} for l in lanes},
+            'delta': {l: {} for l in lanes},
+        } for i, n in enumerate(columns['name'])]
+
+    for lane_a, lane_b in lane_pairs(lanes):
+        key = f"{lane_a}+{lane_b}"
+        for i, champion in enumerate(formated_lane[lane_a]):
+            for j, other in enumerate(formated_lane[lane_b]):
+                points = data['synergy'][key][i][j]
+                if points is None: continue
+                value = data['delta'][key][i][j]
+                champion['synergy'][lane_b][other['name']] = points
+                other['synergy'][lane_a][champion['name']] = points
+                champion['delta'][lane_b][other['name']] = value
+                other['delta'][lane_a][champion['name']] = value
+    formated_lane['_meta'] = data['_meta']
+    return formated_lane
+
+
+def load_game_data(path='game_data.json'):
+    """ game_data.json in either format, as the legacy structure """
+    with open(path, 'r', encoding='utf-8') as f:
+        return inflate_game_data(json.load(f))
+
+
+def top_synergy_powers(labels, strengths, k):
+    """
+    The `k` strongest of the pairs, in ascending order like the full
+    synergy_powers list, from one pass with a bounded heap. On equal
+    strength the later pair wins, as with the last k of a stable sort.
+    """
+    top = heapq.nlargest(k, zip(strengths, itertools.count()))
+    return [{'champ1': labels[i][0], 'champ2': labels[i][1], 'strength': s}
+            for s, i in reversed(top)]
+
+
+def encode_json(obj, **kwargs):
+    return json.dumps(obj, **kwargs).encode('utf-8')
+
+
+def write_atomic(data, path):
+    """ Replace `path` with `data` in one rename, so readers never see half a file """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f: f.write(data)
+    os.replace(tmp_path, path)
+
+
+def write_json(obj, path, **kwargs):
+    write_atomic(encode_json(obj, **kwargs), path)
+
+
+def compact_files(formated_lane, meta, synergy_powers, path='game_data.json', pair_count=None):
+    """ [(path, payload, json.dumps kwargs)] of the compact format, game_data.json last """
+    sidecar = Path(path).with_name(Path(path).stem + '_synergy.json')
+    meta = {**meta, 'synergy_powers_file': sidecar.name}
+    return [
+        (sidecar, {
+            'version': GAME_DATA_VERSION,
+            'pair_count': pair_count,
+            'top_k': len(synergy_powers),
+            'synergy_powers': synergy_powers,
+        }, {'separators': (',', ':')}),
+        (Path(path), compact_game_data(formated_lane, meta), {'separators': (',', ':')}),
+    ]
+
+
+def manifest_path(path='game_data.json'):
+    return Path(path).with_name(Path(path).stem + '_manifest.json')
+
+
+def read_manifest(path='game_data.json'):
+    try:
+        with open(manifest_path(path), 'r', encoding='utf-8') as f: return json.load(f)
+    except (OSError, ValueError): return None
+
+
+def content_hash(encoded):
+    """ sha256 over every output file's name and bytes """
+    digest = hashlib.sha256()
+    for path, data in encoded:
+        digest.update(Path(path).name.encode('utf-8') + b'\0' + len(data).to_bytes(8, 'little'))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def publish(files):
+    """
+    Write the build's `files` ([(path, payload, json.dumps kwargs)], the
+    game data file last) unless their content is what the manifest says
+    was last published. Every file is replaced atomically, game_data.json
+    after the files it refers to, and the manifest after it:
+        {"build_version": 12, "content_hash": "…", "built_at": "…",
+         "files": {"game_data.json": {"bytes": …, "sha256": "…"}, …}}
+    game_data.json's _meta gets the same build_version, content_hash and
+    built_at. Returns the manifest, or None when nothing changed.
+    """
+    *others, (path, game_data, kwargs) = files
+    encoded = [(p, encode_json(payload, **kw)) for p, payload, kw in files]
+    digest = content_hash(encoded)
+    previous = read_manifest(path) or {}
+    if previous.get('content_hash') == digest and all(Path(p).exists() for p, _, _ in files):
+        print(f"game data unchanged (build {previous['build_version']}), not published")
+        return None
+
+    version = {
+        'build_version': previous.get('build_version', 0) + 1,
+        'content_hash': digest,
+        'built_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    }
+    game_data['_meta'].update(version)
+    encoded[-1] = (path, encode_json(game_data, **kwargs))
+    for p, data in encoded: write_atomic(data, p)
+    manifest = {**version, 'files': {Path(p).name: {'bytes': len(data), 'sha256': hashlib.sha256(data).hexdigest()}
+                                     for p, data in encoded}}
+    write_json(manifest, manifest_path(path), indent=2)
+    return manifest
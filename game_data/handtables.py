@@ -0,0 +1,239 @@
+import sys
+import json
+import random
+import argparse
+import itertools
+import numpy as np
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from gamedata import load_game_data, write_json
+
+'''
+    Pre-flop hand-strength tables for Game.evalutateHand in game.js.
+
+    With an empty board, evalutateHand looks one card ahead: for every legal
+    champion c of the third lane in the pick order, it counts the opponent
+    hands (left, right) whose score with board [c] is at most the player's.
+    The opponent score splits into the pair's own terms and c's board terms,
+        left.points + right.points + syn(left, right) + syn(left, c) + syn(right, c)
+    and none of it depends on the player, so for every lane triple
+    (left lane, right lane, board lane) and every c we store the sorted
+    distinct scores with the number of hands scoring at most each of them.
+    A percentile is then a binary search per c. Only the opponent hands that
+    share a name with the player's hand, which game.js skips, are scored on
+    the fly.
+
+    Hands without a synergy entry (a name repeated between left, right and c)
+    score NaN in game.js: they count as hands but never as beaten, so they
+    are in `total` and not in the scores.
+
+    Scores are integers close to each other, so an entry is stored as a
+    histogram: its lowest score and the number of hands at every score from
+    there to its highest. Entries are listed in the board lane's champion
+    order, and `total`, the same for every entry of a triple, once:
+        game_data_hands.json
+        {"version": 3,
+         "names": ["Aatrox", ...],
+         "lanes": {"TOP": [0, 7, ...], ...},
+         "tables": {"TOP+MIDDLE+JUNGLE": {"total": 2025,
+                                          "min": [3, 5, ...],
+                                          "counts": [[12, 0, 28, ...], ...]}, ...}}
+    inflate_hand_tables() (and inflateHandTables in game.js) turn it into
+    the lookup structure
+        {"tables": {"TOP+MIDDLE+JUNGLE": {"Amumu": {"scores": [3, 5, ...],
+                                                    "atMost": [12, 40, ...],
+                                                    "total": 2025}, ...}, ...}}
+
+    Check the tables against the brute force on random deals with
+        python game_data/handtables.py check [--deals 200]
+'''
+
+HAND_TABLES_VERSION = 3
+
+
+def lane_synergy(formated_lane, lane_a, lane_b):
+    """ (points, has entry) matrices of lane_a's champions against lane_b's """
+    index = {c['name']: j for j, c in enumerate(formated_lane[lane_b])}
+    points = np.zeros((len(formated_lane[lane_a]), len(formated_lane[lane_b])), dtype=np.int64)
+    present = np.zeros(points.shape, dtype=bool)
+    for i, champion in enumerate(formated_lane[lane_a]):
+        for name, p in champion['synergy'][lane_b].items():
+            points[i, index[name]] = p
+            present[i, index[name]] = True
+    return points, present
+
+
+def build_hand_tables(formated_lane):
+    lanes = [lane for lane in formated_lane if lane != '_meta']
+    points = {lane: np.array([c['points'] for c in formated_lane[lane]], dtype=np.int64)
+              for lane in lanes}
+    synergy = {(a, b): lane_synergy(formated_lane, a, b)
+               for a in lanes for b in lanes if a != b}
+
+    names = sorted({c['name'] for lane in lanes for c in formated_lane[lane]})
+    name_ids = {name: i for i, name in enumerate(names)}
+    tables = {}
+    for left, right, board in itertools.permutations(lanes, 3):
+        pair_points, pair_ok = synergy[left, right]
+        base = points[left][:, None] + points[right][None, :] + pair_points
+        left_board, left_ok = synergy[left, board]
+        right_board, right_ok = synergy[right, board]
+        table = {'total': int(base.size), 'min': [], 'counts': []}
+        for k in range(len(formated_lane[board])):
+            score = base + left_board[:, k][:, None] + right_board[:, k][None, :]
+            ok = pair_ok & left_ok[:, k][:, None] & right_ok[:, k][None, :]
+            scores = score[ok]
+            lowest = int(scores.min()) if len(scores) else None
+            table['min'].append(lowest)
+            table['counts'].append(np.bincount(scores - lowest).tolist() if len(scores) else [])
+        tables[f"{left}+{right}+{board}"] = table
+    return {
+        'version': HAND_TABLES_VERSION,
+        'names': names,
+        'lanes': {lane: [name_ids[c['name']] for c in formated_lane[lane]] for lane in lanes},
+        'tables': tables,
+    }
+
+
+def inflate_hand_tables(data):
+    """ Version 3 tables -> {"tables": {triple: {name: {"scores", "atMost", "total"}}}} """
+    if data.get('version') != HAND_TABLES_VERSION: return data
+    names = data['names']
+    tables = {}
+    for triple, table in data['tables'].items():
+        board = [names[i] for i in data['lanes'][triple.split('+')[2]]]
+        entries = {}
+        for name, lowest, counts in zip(board, table['min'], table['counts']):
+            counts = np.asarray(counts, dtype=np.int64)
+            hit = np.flatnonzero(counts)
+            entries[name] = {
+                'scores': (hit + (lowest or 0)).tolist(),
+                'atMost': np.cumsum(counts[hit]).tolist(),
+                'total': table['total'],
+            }
+        tables[triple] = entries
+    return {'version': data['version'], 'tables': tables}
+
+
+def load_hand_tables(path='game_data_hands.json'):
+    with open(path, 'r', encoding='utf-8') as f: return inflate_hand_tables(json.load(f))
+
+
+def write_hand_tables(formated_lane, path='game_data_hands.json'):
+    write_json(build_hand_tables(formated_lane), path, separators=(',', ':'))
+
+
+'''
+    Reference evaluator: game.js's evalutateHand and scoreHand in Python,
+    with a missing synergy entry standing in for JS's NaN.
+'''
+
+def score_hand(hand, board):
+    left, right = hand
+    score = left['points'] + right['points']
+    terms = [left['synergy'][right['lane']].get(right['name'])]
+    for champ in board:
+        terms.append(left['synergy'][champ['lane']].get(champ['name']))
+        terms.append(right['synergy'][champ['lane']].get(champ['name']))
+    if None in terms: return None
+    return score + sum(terms)
+
+
+def evaluate_hand_reference(game_data, pick_order, hand, board, hands):
+    """ Percentile of `hand` among opponent hands; `hands` are every player's, for isLegalDraw """
+    taken = {c['name'] for h in hands for c in h} | {c['name'] for c in board}
+    names = {hand[0]['name'], hand[1]['name']}
+    left_pool = [c for c in game_data[pick_order[0]] if c['name'] not in names]
+    right_pool = [c for c in game_data[pick_order[1]] if c['name'] not in names]
+
+    if len(board) == 3: boards = [board]
+    else:
+        lane = pick_order[len(board) + 2]
+        boards = [board + [c] for c in game_data[lane] if c['name'] not in taken]
+
+    better_than = count = 0
+    for full_board in boards:
+        current = score_hand(hand, full_board)
+        for left in left_pool:
+            for right in right_pool:
+                score = score_hand((left, right), full_board)
+                if current is not None and score is not None and current >= score:
+                    better_than += 1
+                count += 1
+    return int(better_than / count * 100)
+
+
+def at_most(entry, score):
+    """ Hands in a table entry scoring at most `score`, by binary search """
+    lo, hi = 0, len(entry['scores'])
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if entry['scores'][mid] <= score: lo = mid + 1
+        else: hi = mid
+    return entry['atMost'][lo - 1] if lo else 0
+
+
+def evaluate_preflop(tables, game_data, pick_order, hand, hands):
+    """ evaluate_hand_reference for an empty board, from the tables """
+    table = tables['tables']['+'.join(pick_order[:3])]
+    taken = {c['name'] for h in hands for c in h}
+    names = {hand[0]['name'], hand[1]['name']}
+    skipped_left = [c for c in game_data[pick_order[0]] if c['name'] in names]
+    skipped_right = [c for c in game_data[pick_order[1]] if c['name'] in names]
+    left_pool = game_data[pick_order[0]]
+    right_pool = game_data[pick_order[1]]
+
+    better_than = count = 0
+    for champ in game_data[pick_order[2]]:
+        if champ['name'] in taken: continue
+        board = [champ]
+        current = score_hand(hand, board)
+        entry = table[champ['name']]
+        better_than += at_most(entry, current)
+        count += entry['total']
+        # Opponent hands sharing a name with ours are not counted
+        skipped = [(l, r) for l in skipped_left for r in right_pool]
+        skipped += [(l, r) for l in left_pool if l['name'] not in names for r in skipped_right]
+        for pair in skipped:
+            score = score_hand(pair, board)
+            if score is not None and current >= score: better_than -= 1
+            count -= 1
+    return int(better_than / count * 100)
+
+
+def check(game_data_path='game_data.json', tables_path='game_data_hands.json', deals=200, seed=0):
+    game_data = load_game_data(game_data_path)
+    tables = load_hand_tables(tables_path)
+    lanes = [lane for lane in game_data if lane != '_meta']
+    rng = random.Random(seed)
+    mismatches = 0
+    for _ in range(deals):
+        pick_order = rng.sample(lanes, 5)
+        hands = []
+        for _ in range(rng.randint(2, 6)):
+            left = rng.choice(game_data[pick_order[0]])
+            right = rng.choice([c for c in game_data[pick_order[1]] if c['name'] != left['name']])
+            hands.append((left, right))
+        for hand in hands:
+            expected = evaluate_hand_reference(game_data, pick_order, hand, [], hands)
+            got = evaluate_preflop(tables, game_data, pick_order, hand, hands)
+            if got != expected:
+                mismatches += 1
+                print(f"  {hand[0]['name']} {hand[1]['name']} {pick_order}: {got} != {expected}")
+    print("✅ Tables match the brute force." if not mismatches else f"❌ {mismatches} mismatches.")
+    return mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["build", "check"])
+    parser.add_argument("--game-data", default="game_data.json")
+    parser.add_argument("--tables", default="game_data_hands.json")
+    parser.add_argument("--deals", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.command == "build":
+        write_hand_tables(load_game_data(args.game_data), args.tables)
+    else:
+        sys.exit(1 if check(args.game_data, args.tables, args.deals, args.seed) else 0)
@@ -0,0 +1,139 @@
+import os
+import bisect
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+'''
+    In-process counters, gauges and histograms for datagen, keyed by name
+    and labels:
+        registry.inc("match_ids_requests", region="na1", mode="incremental")
+        registry.set("frontier_players", 4200, region="na1", tier="fresh")
+        registry.observe("http_latency_seconds", 0.12, endpoint="match-v5.getMatch")
+
+    render() formats them in the Prometheus text format, with a "datagen_"
+    prefix. Counter samples carry the "_total" suffix, their TYPE line the
+    base name, as OpenMetrics has it:
+        # TYPE datagen_matches_fetched counter
+        datagen_matches_fetched_total{region="na1"} 1520
+    so dashboards query datagen_matches_fetched_total,
+    datagen_requests_total, datagen_rate_limit_wait_seconds_total, ... serve() exposes that on http://127.0.0.1:{port}/metrics and
+    write_file() replaces a file with it, for node_exporter's textfile
+    collector or for reading by hand.
+'''
+
+PREFIX = "datagen_"
+
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """ Upper bound of the bucket holding the q-quantile """
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + [float("inf")], self.counts):
+            seen += count
+            if seen >= rank: return bound
+        return float("inf")
+
+
+def format_labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs: return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Metrics:
+    def __init__(self):
+        self.counters = defaultdict(float)  # (name, ((label, value), ...)) -> value
+        self.gauges = {}                    # (name, ((label, value), ...)) -> value
+        self.histograms = {}                # (name, ((label, value), ...)) -> Histogram
+        self.lock = threading.Lock()        # the HTTP client observes from worker threads
+
+    def inc(self, name, value=1, **labels):
+        with self.lock: self.counters[name, tuple(sorted(labels.items()))] += value
+
+    def set(self, name, value, **labels):
+        with self.lock: self.gauges[name, tuple(sorted(labels.items()))] = value
+
+    def get(self, name, **labels):
+        return self.counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            if key not in self.histograms: self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+
+    def histogram(self, name, **labels):
+        return self.histograms.get((name, tuple(sorted(labels.items()))))
+
+    def snapshot(self):
+        """ [(name, {labels}, value), ...] sorted by name """
+        return [(name, dict(labels), value)
+                for (name, labels), value in sorted(self.counters.items())]
+
+    def render(self):
+        """ Everything in the Prometheus text exposition format """
+        lines = []
+        with self.lock:
+            for kind, series, suffix in (("counter", self.counters, "_total"), ("gauge", self.gauges, "")):
+                last = None
+                for (name, labels), value in sorted(series.items()):
+                    if name != last: lines.append(f"# TYPE {PREFIX}{name} {kind}")
+                    last = name
+                    lines.append(f"{PREFIX}{name}{suffix}{format_labels(labels)} {value:g}")
+            last = None
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                if name != last: lines.append(f"# TYPE {PREFIX}{name} histogram")
+                last = name
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + ["+Inf"], histogram.counts):
+                    cumulative += count
+                    lines.append(f"{PREFIX}{name}_bucket{format_labels(labels, le=bound)} {cumulative}")
+                lines.append(f"{PREFIX}{name}_sum{format_labels(labels)} {histogram.sum:g}")
+                lines.append(f"{PREFIX}{name}_count{format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_file(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f: f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def serve(self, port, host="127.0.0.1"):
+        """ Serve render() on /metrics from a daemon thread; returns the server """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args): pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+registry = Metrics()
@@ -0,0 +1,263 @@
+import sys
+import json
+import time
+import heapq
+import random
+import asyncio
+import itertools
+from collections import deque
+
+'''
+    Adaptive limiter for the Riot API.
+
+    Riot advertises its limits on every response:
+        X-App-Rate-Limit:          20:1,100:120   (count:seconds, per routing host)
+        X-App-Rate-Limit-Count:    3:1,41:120     (what the server has counted)
+        X-Method-Rate-Limit:       2000:10        (per method, per routing host)
+        X-Method-Rate-Limit-Count: 7:10
+
+    We keep one bucket per routing host and one per (routing host, method).
+    Every bucket is a set of sliding windows. A request holds a slot in each
+    window from the moment it is sent until `seconds` after its response
+    arrived, which is never earlier than the server saw it, so a window can
+    not be overrun even with many requests in flight.
+'''
+
+DEFAULT_APP_LIMITS = "20:1,100:120"  # development key
+DEFAULT_METHOD_LIMITS = "1:1"        # until the first response tells us
+
+
+def parse_limits(header):
+    """ "20:1,100:120" -> [(20, 1), (100, 120)] """
+    limits = []
+    for part in (header or "").split(","):
+        if not part.strip(): continue
+        count, seconds = part.split(":")
+        limits.append((int(count), int(seconds)))
+    return sorted(limits, key=lambda x: x[1])
+
+
+def parse_counts(header):
+    """ "3:1,41:120" -> {1: 3, 120: 41} """
+    return {seconds: count for count, seconds in parse_limits(header)}
+
+
+class Window:
+    def __init__(self, limit, seconds):
+        self.limit = limit
+        self.seconds = seconds
+        self.slots = deque()  # [release_time], oldest first
+
+    def expire(self, now):
+        while self.slots and self.slots[0][0] + self.seconds <= now:
+            self.slots.popleft()
+
+    def ready_at(self, now):
+        self.expire(now)
+        over = len(self.slots) - self.limit + 1
+        if over <= 0: return now
+        # Slots are in send order but release when their response arrives
+        return max(s[0] for s in itertools.islice(self.slots, over)) + self.seconds
+
+    def sync(self, count, now):
+        # The server counted more than we did (another client on this key)
+        self.expire(now)
+        for _ in range(count - len(self.slots)): self.slots.append([now])
+
+
+class Bucket:
+    def __init__(self, limits):
+        self.windows = [Window(c, s) for c, s in parse_limits(limits)]
+        self.learned = False
+
+    def limits(self):
+        return [(w.limit, w.seconds) for w in self.windows]
+
+    def ready_at(self, now):
+        return max((w.ready_at(now) for w in self.windows), default=now)
+
+    def take(self, slot):
+        for w in self.windows: w.slots.append(slot)
+
+    def update(self, limits, counts, now):
+        if limits:
+            parsed = parse_limits(limits)
+            if parsed != self.limits():
+                # Carry the slots we already hold into the new windows
+                slots = max((w.slots for w in self.windows), key=len, default=deque())
+                self.windows = [Window(c, s) for c, s in parsed]
+                for w in self.windows: w.slots = deque(slots)
+            self.learned = True
+        for w in self.windows:
+            count = parse_counts(counts).get(w.seconds)
+            if count is not None: w.sync(count, now)
+
+
+class RateLimiter:
+    def __init__(self, app_limits=DEFAULT_APP_LIMITS,
+                 method_limits=DEFAULT_METHOD_LIMITS, clock=time.monotonic):
+        self.app_limits = app_limits
+        self.method_limits = method_limits
+        self.clock = clock
+        self.app = {}      # routing -> Bucket
+        self.methods = {}  # (routing, method) -> Bucket
+        self.next = {}     # routing -> end of a Retry-After backoff
+
+    def buckets(self, routing, method):
+        if routing not in self.app:
+            self.app[routing] = Bucket(self.app_limits)
+        if (routing, method) not in self.methods:
+            self.methods[routing, method] = Bucket(self.method_limits)
+        return self.app[routing], self.methods[routing, method]
+
+    def rate(self, routing):
+        """ Requests per second the routing host's app limit sustains """
+        limits = self.app[routing].limits() if routing in self.app else parse_limits(self.app_limits)
+        return min((count / seconds for count, seconds in limits), default=float("inf"))
+
+    def reserve(self, routing, method, now=None):
+        """
+        Try to send now. Returns (0, slot) when the request may go out, or
+        (delay, None) with the seconds to wait before trying again.
+        """
+        if now is None: now = self.clock()
+        app, meth = self.buckets(routing, method)
+        ready = max(app.ready_at(now), meth.ready_at(now), self.next.get(routing, 0))
+        if ready > now: return ready - now, None
+        slot = [now]
+        app.take(slot)
+        meth.take(slot)
+        return 0, slot
+
+    async def acquire(self, routing, method):
+        while True:
+            delay, slot = self.reserve(routing, method)
+            if slot: return slot
+            await asyncio.sleep(delay)
+
+    def update(self, routing, method, headers, slot=None, now=None):
+        """ Feed a response's rate-limit headers back into the buckets """
+        if now is None: now = self.clock()
+        if slot: slot[0] = now
+        app, meth = self.buckets(routing, method)
+        app.update(headers.get("X-App-Rate-Limit"),
+                   headers.get("X-App-Rate-Limit-Count"), now)
+        meth.update(headers.get("X-Method-Rate-Limit"),
+                    headers.get("X-Method-Rate-Limit-Count"), now)
+
+    def backoff(self, routing, duration, now=None):
+        if now is None: now = self.clock()
+        self.next[routing] = max(self.next.get(routing, 0), now + duration)
+
+
+'''
+    Replay harness
+
+    A recording is a JSON list (or JSON lines, as written by
+    `datagen.py --record-headers`) of responses as they arrived:
+        [{"t": 0.12, "routing": "na1", "method": "league-v4.getLeagueEntriesForSummoner",
+          "status": 200, "headers": {"X-App-Rate-Limit": "20:1,100:120", ...}}, ...]
+
+    replay() feeds them into a limiter on a virtual clock and checks that
+    after every response the limiter holds at least as many slots as the
+    server reports and has adopted the advertised limits. simulate() plays
+    a fixed-window Riot server against many concurrent virtual clients and
+    reports 429s and the achieved rate versus the ceiling.
+'''
+
+def replay(records, limiter=None):
+    limiter = limiter or RateLimiter(clock=lambda: 0)
+    failures = []
+    for i, r in enumerate(records):
+        routing, method, t = r["routing"], r["method"], r["t"]
+        app, meth = limiter.buckets(routing, method)
+        # The recorded request went out whether or not we would have allowed it
+        slot = [t]
+        app.take(slot)
+        meth.take(slot)
+        limiter.update(routing, method, r["headers"], slot, now=t)
+        if r.get("status") == 429:
+            limiter.backoff(routing, int(r["headers"].get("Retry-After", 1)), now=t)
+        for bucket, prefix in ((app, "X-App"), (meth, "X-Method")):
+            advertised = parse_limits(r["headers"].get(f"{prefix}-Rate-Limit"))
+            if advertised and advertised != bucket.limits():
+                failures.append((i, f"{prefix} limits {bucket.limits()} != {advertised}"))
+            counts = parse_counts(r["headers"].get(f"{prefix}-Rate-Limit-Count"))
+            for w in bucket.windows:
+                w.expire(t)
+                if len(w.slots) < counts.get(w.seconds, 0):
+                    failures.append((i, f"{prefix} {w.seconds}s holds {len(w.slots)} "
+                                        f"< server {counts[w.seconds]}"))
+    return failures
+
+
+class FixedWindowServer:
+    """ Riot-style counter: a window starts at its first request and resets after `seconds` """
+    def __init__(self, limits):
+        self.limits = parse_limits(limits)
+        self.windows = {s: [None, 0] for _, s in self.limits}
+
+    def hit(self, t):
+        ok = True
+        for count, seconds in self.limits:
+            w = self.windows[seconds]
+            if w[0] is None or t >= w[0] + seconds: w[:] = [t, 0]
+            w[1] += 1
+            if w[1] > count: ok = False
+        return ok
+
+    def header(self):
+        return ",".join(f"{self.windows[s][1]}:{s}" for _, s in self.limits)
+
+
+def simulate(app_limits="20:1,100:120", method_limits="2000:10", requests=600,
+             workers=16, latency=(0.03, 0.4), seed=0):
+    rng = random.Random(seed)
+    limiter = RateLimiter(clock=lambda: 0)
+    app_server = FixedWindowServer(app_limits)
+    method_server = FixedWindowServer(method_limits)
+    events = [(0.0, w) for w in range(workers)]
+    sent = rejected = 0
+    end = 0.0
+    while sent < requests:
+        t, w = heapq.heappop(events)
+        delay, slot = limiter.reserve("na1", "match-v5.getMatch", now=t)
+        if not slot:
+            heapq.heappush(events, (t + delay, w))
+            continue
+        sent += 1
+        arrival = t + rng.uniform(*latency) / 2
+        ok = app_server.hit(arrival) & method_server.hit(arrival)
+        done = arrival + rng.uniform(*latency) / 2
+        headers = {
+            "X-App-Rate-Limit": app_limits,
+            "X-App-Rate-Limit-Count": app_server.header(),
+            "X-Method-Rate-Limit": method_limits,
+            "X-Method-Rate-Limit-Count": method_server.header(),
+        }
+        limiter.update("na1", "match-v5.getMatch", headers, slot, now=done)
+        if not ok:
+            rejected += 1
+            limiter.backoff("na1", 1, now=done)
+        end = max(end, done)
+        heapq.heappush(events, (done, w))
+    ceiling = min(c / s for c, s in parse_limits(app_limits) + parse_limits(method_limits))
+    return {"requests": sent, "rejected": rejected, "seconds": round(end, 2),
+            "rate": round(sent / end, 3), "ceiling": round(ceiling, 3)}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "replay":
+        with open(sys.argv[2], "r", encoding="utf-8") as f:
+            text = f.read()
+        try: records = json.loads(text)
+        except json.JSONDecodeError:
+            records = [json.loads(line) for line in text.splitlines() if line.strip()]
+        failures = replay(records)
+        for i, msg in failures: print(f"  record {i}: {msg}")
+        print("✅ Replay consistent." if not failures else f"❌ {len(failures)} inconsistencies.")
+        sys.exit(1 if failures else 0)
+    for app, method in [("20:1,100:120", "2000:10"),
+                        ("500:10,30000:600", "2000:10"),
+                        ("500:10,30000:600", "250:10")]:
+        print(app, method, simulate(app, method))
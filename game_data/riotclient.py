@@ -0,0 +1,111 @@
+import time
+import random
+import asyncio
+import requests
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from metrics import registry as metrics
+
+'''
+    HTTP layer for the Riot API.
+
+    One keep-alive requests.Session per routing host (na1, americas, ...),
+    each with its own connection pool, asking for gzip bodies. The blocking
+    calls run on the client's own pool of `pool_size` threads, so as many
+    requests can be in flight as there are connections; asyncio's default
+    executor stops at min(32, CPUs + 4) threads. get() takes a
+    rate limiter slot for every attempt, so retries are budgeted like any
+    other request, and handles two kinds of failure separately:
+        429                 wait out Retry-After on the limiter and resend,
+                            as often as it takes
+        5xx, connection     resend at most `retries` times, after an
+        errors, timeouts    exponential backoff with full jitter
+    Every attempt's latency is observed in the "http_latency_seconds"
+    histogram, labelled by routing value and endpoint (the rate-limit method
+    name), and counted in "requests" by status. Time spent waiting for the
+    limiter, 429 backoff and retry backoff are counted in seconds.
+'''
+
+TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout)
+
+
+class RiotClient:
+    def __init__(self, api_key, pool_size=8, retries=3, backoff=0.5, max_backoff=8,
+                 timeout=(5, 30), recorder=None, rng=random):
+        self.api_key = api_key
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.recorder = recorder  # recorder(routing, method, response, clock)
+        self.rng = rng
+        self.sessions = {}  # host -> Session
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="riotclient")
+
+    def session(self, host):
+        if host not in self.sessions:
+            session = requests.Session()
+            session.headers["X-Riot-Token"] = self.api_key
+            session.headers["Accept-Encoding"] = "gzip"
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self.sessions[host] = session
+        return self.sessions[host]
+
+    def send(self, routing, method, url):
+        """ One blocking attempt, timed """
+        start = time.perf_counter()
+        try: return self.session(urlsplit(url).netloc).get(url, timeout=self.timeout)
+        finally:
+            metrics.observe("http_latency_seconds", time.perf_counter() - start,
+                            routing=routing, endpoint=method)
+
+    def retry_delay(self, attempt):
+        return self.rng.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    async def get(self, rate_limiter, routing, method, url):
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            slot = await rate_limiter.acquire(routing, method)
+            metrics.inc("rate_limit_wait_seconds", time.perf_counter() - start, routing=routing)
+            try:
+                response = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, self.send, routing, method, url)
+            except TRANSIENT_ERRORS:
+                rate_limiter.update(routing, method, {}, slot)
+                metrics.inc("requests", routing=routing, endpoint=method, status="error")
+                if attempt >= self.retries: raise
+                await self.retry_backoff(routing, attempt)
+                attempt += 1
+                continue
+
+            rate_limiter.update(routing, method, response.headers, slot)
+            metrics.inc("requests", routing=routing, endpoint=method, status=response.status_code)
+            if self.recorder: self.recorder(routing, method, response, rate_limiter.clock)
+            if response.status_code == 429:
+                retry_after = int(response.headers.get("Retry-After", 1))
+                print(f"Rate limited! Backing off for {retry_after} seconds.")
+                metrics.inc("rate_limited", routing=routing, endpoint=method,
+                            type=response.headers.get("X-Rate-Limit-Type", "unknown"))
+                metrics.inc("backoff_seconds", retry_after, routing=routing)
+                rate_limiter.backoff(routing, retry_after)
+                continue
+            if response.status_code >= 500 and attempt < self.retries:
+                await self.retry_backoff(routing, attempt)
+                attempt += 1
+                continue
+            response.raise_for_status()
+            return response.json()
+
+    async def retry_backoff(self, routing, attempt):
+        delay = self.retry_delay(attempt)
+        metrics.inc("retry_backoff_seconds", delay, routing=routing)
+        await asyncio.sleep(delay)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        for session in self.sessions.values(): session.close()
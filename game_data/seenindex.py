@@ -0,0 +1,150 @@
+import time
+import sqlite3
+from pathlib import Path
+from collections import defaultdict
+
+'''
+    Persistent index of the match ids already counted, shared by every
+    region and every datagen process.
+
+    One SQLite table keyed on the match id (a B-tree lookup per check, no
+    rowid). Ids counted since the last save sit in `pending`, per region,
+    until commit(), which datagen calls right after appending the region's
+    delta log. The same transaction records the log's size, so the ids and
+    the counts they produced are committed together: on startup, recover()
+    cuts any log line appended after the last commit (a crash in between),
+    and those matches are fetched and counted again, once.
+
+    Check the crash recovery with
+        python game_data/seenindex.py
+'''
+
+DEFAULT_PATH = "game_data/seen_matches.sqlite3"
+
+
+def today_number():
+    return int(time.time() // 86400)
+
+
+class SeenMatches:
+    def __init__(self, path=DEFAULT_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS seen ("
+            " match_id TEXT PRIMARY KEY,"
+            " day INTEGER NOT NULL"  # days since epoch it was counted, for prune()
+            ") WITHOUT ROWID")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS logs ("
+            " name TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL"  # bytes of the delta log whose matches are in `seen`
+            ") WITHOUT ROWID")
+        self.db.commit()
+        self.pending = defaultdict(set)  # region -> ids counted since its last commit
+
+    def __contains__(self, match_id):
+        if any(match_id in ids for ids in self.pending.values()): return True
+        row = self.db.execute("SELECT 1 FROM seen WHERE match_id = ?", (match_id,)).fetchone()
+        return row is not None
+
+    def __len__(self):
+        pending = sum(len(ids) for ids in self.pending.values())
+        return self.db.execute("SELECT COUNT(*) FROM seen").fetchone()[0] + pending
+
+    def add(self, match_id, region=None):
+        self.pending[region].add(match_id)
+
+    def commit(self, region=None, log=None):
+        """
+        Mark `region`'s pending ids seen (every region's if None) and record
+        how far `log`, which must hold their counts, reaches, atomically.
+        """
+        regions = list(self.pending) if region is None else [region]
+        ids = set().union(*(self.pending[r] for r in regions))
+        if not ids and log is None: return
+        day = today_number()
+        with self.db:
+            self.db.executemany("INSERT OR IGNORE INTO seen VALUES (?, ?)",
+                                ((match_id, day) for match_id in ids))
+            if log is not None:
+                self.db.execute("INSERT OR REPLACE INTO logs VALUES (?, ?)", (log.log_path.name, log.size()))
+        for r in regions: self.pending.pop(r, None)
+
+    def recover(self, log):
+        """
+        Before loading `log`: cut what was appended after its last commit,
+        counts of matches that were never marked seen. Returns the bytes cut.
+        """
+        name = log.log_path.name
+        row = self.db.execute("SELECT size FROM logs WHERE name = ?", (name,)).fetchone()
+        size = log.size()
+        if not size:
+            with self.db: self.db.execute("DELETE FROM logs WHERE name = ?", (name,))
+            return 0
+        if row is None or size <= row[0]: return 0  # a log from before the logs table
+        log.truncate(row[0])
+        return size - row[0]
+
+    def forget(self, log):
+        """ `log` was compacted into its day-file and removed """
+        with self.db: self.db.execute("DELETE FROM logs WHERE name = ?", (log.log_path.name,))
+
+    def prune(self, retention_days):
+        """ Forget ids counted more than `retention_days` ago """
+        with self.db:
+            cursor = self.db.execute("DELETE FROM seen WHERE day < ?",
+                                     (today_number() - retention_days,))
+        return cursor.rowcount
+
+    def close(self):
+        self.commit()
+        self.db.close()
+
+
+def check():
+    """ A crash between the delta-log append and the seen commit counts no match twice """
+    import tempfile
+    from deltalog import DeltaLog
+    problems = []
+    with tempfile.TemporaryDirectory() as folder:
+        def start():
+            seen, log = SeenMatches(f"{folder}/seen.sqlite3"), DeltaLog("na1", "2025-01-01", folder)
+            seen.recover(log)
+            counts = log.load()[0]
+            seen.commit("na1", log)
+            return seen, log, counts
+
+        seen, log, _ = start()
+        for match_id, crash in (("NA1_1", False), ("NA1_2", True)):
+            log.count("w", "Ahri+MIDDLE", True)
+            seen.add(match_id, "na1")
+            log.append()
+            if crash:
+                seen.db.close()  # killed before the commit
+                break
+            seen.commit("na1", log)
+
+        seen, log, counts = start()
+        if counts.get("Ahri+MIDDLE", {}).get("wins") != 1: problems.append(f"counts after the crash: {dict(counts)}")
+        if "NA1_1" not in seen: problems.append("committed match forgotten")
+        if "NA1_2" in seen: problems.append("uncommitted match marked seen")
+
+        # Fetched again after the restart, it is counted once
+        log.count("w", "Ahri+MIDDLE", True)
+        seen.add("NA1_2", "na1")
+        log.append()
+        seen.commit("na1", log)
+        seen.close()
+        seen, log, counts = start()
+        if counts["Ahri+MIDDLE"]["wins"] != 2: problems.append(f"counts after the refetch: {dict(counts)}")
+        seen.close()
+    for problem in problems: print(f"  {problem}")
+    print("✅ Counts and seen ids agree after a crash." if not problems else f"❌ {len(problems)} problems.")
+    return len(problems)
+
+
+if __name__ == "__main__":
+    raise SystemExit(1 if check() else 0)
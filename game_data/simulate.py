@@ -0,0 +1,290 @@
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+import numpy as np
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, str(Path(__file__).parent))
+from gamedata import load_game_data
+from handtables import lane_synergy, score_hand
+
+'''
+    Monte Carlo showdowns of a built game_data.json, dealt the way
+    Game.startGame in game.js deals them:
+        pickOrder   a shuffled lane order; lanes 0 and 1 make the hands,
+                    2, 3 and 4 the three board cards
+        decks       every lane's champions shuffled, drawn from the top;
+                    a right card with the left card's name goes to the
+                    bottom and the next one is drawn, a board card with the
+                    name of any card in hands or on the board is skipped
+        score       scoreHand: both cards' points, their synergy and both
+                    cards' synergy with every board card; a missing synergy
+                    entry is NaN, and a NaN at the table leaves no winner
+    Everyone goes to showdown; the best score wins, ties all win.
+
+    Deals are made NumPy batches at a time: a batch is split by pick order,
+    every deck is a row of a random permutation matrix and each player's
+    score is a few fancy-indexed lookups into the lanes' points and synergy
+    matrices. Chunks of deals run on a process pool, each with its own seed
+    from one SeedSequence, and their tallies are summed.
+
+        python game_data/simulate.py run [--deals 1000000] [--players 6] [--json out.json]
+        python game_data/simulate.py check [--deals 500]
+
+    run reports the hand score distribution, the tie and no-winner rates
+    and, per champion, how often a hand holding it wins. check deals the
+    same shuffles through the batch code and through a line-by-line port of
+    startGame/isLegalDraw/scoreHand and compares every score.
+'''
+
+LANES = ["TOP", "MIDDLE", "JUNGLE", "BOTTOM", "UTILITY"]
+PICK_ORDERS = list(itertools.permutations(LANES))
+
+
+class Tables:
+    """ A game_data.json as arrays: points per lane, synergy per ordered lane pair (NaN: no entry) """
+    def __init__(self, game_data):
+        self.game_data = game_data
+        self.names = sorted({c['name'] for lane in LANES for c in game_data[lane]})
+        name_ids = {name: i for i, name in enumerate(self.names)}
+        self.name_ids = {lane: np.array([name_ids[c['name']] for c in game_data[lane]]) for lane in LANES}
+        self.points = {lane: np.array([c['points'] for c in game_data[lane]], dtype=float) for lane in LANES}
+        self.synergy = {}
+        for a, b in itertools.permutations(LANES, 2):
+            points, present = lane_synergy(game_data, a, b)
+            self.synergy[a, b] = np.where(present, points, np.nan)
+        # Champions numbered lane after lane, for the per-champion tallies
+        sizes = [len(game_data[lane]) for lane in LANES]
+        self.offsets = dict(zip(LANES, np.cumsum([0] + sizes[:-1]).tolist()))
+        self.cards = [(lane, c['name']) for lane in LANES for c in game_data[lane]]
+
+
+def shuffled_decks(rng, deals, order, tables):
+    """ Per lane of `order`, a (deals, lane size) matrix of deck orders, top card first """
+    return [rng.random((deals, len(tables.points[lane]))).argsort(axis=1) for lane in order]
+
+
+def deal(tables, order, decks, players):
+    """ (left, right, board) champion indices: (deals, players), (deals, players), (deals, 3) """
+    rows = np.arange(len(decks[0]))
+    left = decks[0][:, :players]
+    left_names = tables.name_ids[order[0]][left]
+    right = np.empty_like(left)
+    top = np.zeros(len(rows), dtype=np.int64)  # next card of the right-hand deck
+    right_names = tables.name_ids[order[1]]
+    for player in range(players):
+        # A card named like the left one goes to the bottom: out of reach for this deal
+        top += right_names[decks[1][rows, top]] == left_names[:, player]
+        right[:, player] = decks[1][rows, top]
+        top += 1
+
+    taken = np.concatenate([left_names, right_names[right]], axis=1)
+    board = np.empty((len(rows), 3), dtype=np.int64)
+    for k, lane in enumerate(order[2:]):
+        # A lane holds a name once, so a legal card is among the first len(taken) + 1
+        width = min(taken.shape[1] + 1, decks[k + 2].shape[1])
+        candidates = decks[k + 2][:, :width]
+        legal = ~(tables.name_ids[lane][candidates][:, :, None] == taken[:, None, :]).any(axis=2)
+        if not legal.any(axis=1).all(): raise ValueError(f"{lane} deck ran out of legal champions")
+        board[:, k] = candidates[rows, legal.argmax(axis=1)]
+        taken = np.concatenate([taken, tables.name_ids[lane][board[:, k]][:, None]], axis=1)
+    return left, right, board
+
+
+def score(tables, order, left, right, board):
+    """ scoreHand of every player's hand, (deals, players) """
+    a, b = order[0], order[1]
+    scores = tables.points[a][left] + tables.points[b][right] + tables.synergy[a, b][left, right]
+    for k, lane in enumerate(order[2:]):
+        card = board[:, k][:, None]
+        scores += tables.synergy[a, lane][left, card] + tables.synergy[b, lane][right, card]
+    return scores
+
+
+class Tally:
+    def __init__(self, cards):
+        self.deals = 0
+        self.ties = 0
+        self.no_winner = 0
+        self.scores = {}  # score -> hands; NaN scores under None
+        self.held = np.zeros(cards, dtype=np.int64)
+        self.won = np.zeros(cards, dtype=np.int64)
+
+    def add(self, tables, order, left, right, scores):
+        best = scores.max(axis=1)  # NaN if any score is, like Math.max
+        winners = scores == best[:, None]
+        winner_count = winners.sum(axis=1)
+        self.deals += len(scores)
+        self.ties += int((winner_count > 1).sum())
+        self.no_winner += int((winner_count == 0).sum())
+        values, counts = np.unique(scores[~np.isnan(scores)], return_counts=True)
+        for value, count in zip(values.tolist(), counts.tolist()):
+            self.scores[value] = self.scores.get(value, 0) + count
+        nan = int(np.isnan(scores).sum())
+        if nan: self.scores[None] = self.scores.get(None, 0) + nan
+
+        cards = np.concatenate([tables.offsets[order[0]] + left, tables.offsets[order[1]] + right], axis=1)
+        self.held += np.bincount(cards.ravel(), minlength=len(self.held))
+        self.won += np.bincount(cards[np.concatenate([winners, winners], axis=1)], minlength=len(self.won))
+
+    def merge(self, other):
+        self.deals += other.deals
+        self.ties += other.ties
+        self.no_winner += other.no_winner
+        for value, count in other.scores.items(): self.scores[value] = self.scores.get(value, 0) + count
+        self.held += other.held
+        self.won += other.won
+        return self
+
+
+_tables = {}  # game data path -> Tables, loaded once per worker
+
+
+def tables_for(path):
+    if path not in _tables: _tables[path] = Tables(load_game_data(path))
+    return _tables[path]
+
+
+def simulate_chunk(path, deals, players, seed, batch=20000):
+    """ Pool worker: the Tally of `deals` deals """
+    tables = tables_for(path)
+    rng = np.random.default_rng(seed)
+    tally = Tally(len(tables.cards))
+    for start in range(0, deals, batch):
+        size = min(batch, deals - start)
+        per_order = np.bincount(rng.integers(len(PICK_ORDERS), size=size), minlength=len(PICK_ORDERS))
+        for order, count in zip(PICK_ORDERS, per_order.tolist()):
+            if not count: continue
+            decks = shuffled_decks(rng, count, order, tables)
+            left, right, board = deal(tables, order, decks, players)
+            tally.add(tables, order, left, right, score(tables, order, left, right, board))
+    return tally
+
+
+def simulate(path='game_data.json', deals=1_000_000, players=6, seed=0, processes=None, batch=20000):
+    tables = tables_for(path)
+    smallest = min(len(tables.points[lane]) for lane in LANES)
+    if smallest < 2 * players + 1: raise ValueError(f"Lanes of {smallest} champions can't deal {players} hands")
+    workers = processes or 1
+    sizes = [deals // workers + (i < deals % workers) for i in range(workers)]
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    if workers == 1: return simulate_chunk(path, deals, players, seeds[0], batch), tables
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(simulate_chunk, path, size, players, s, batch) for size, s in zip(sizes, seeds)]
+        tally = Tally(len(tables.cards))
+        for future in futures: tally.merge(future.result())
+    return tally, tables
+
+
+def summary(tally, tables, players, min_held=1000):
+    scores = {value: count for value, count in tally.scores.items() if value is not None}
+    values = np.array(sorted(scores))
+    counts = np.array([scores[v] for v in values])
+    cumulative = np.cumsum(counts) / counts.sum()
+    champions = [{'lane': lane, 'name': name, 'held': int(held), 'won': int(won),
+                  'win_rate': won / held if held else None}
+                 for (lane, name), held, won in zip(tables.cards, tally.held, tally.won)]
+    return {
+        'deals': tally.deals,
+        'players': players,
+        'hands': int(counts.sum()) + tally.scores.get(None, 0),
+        'nan_hands': tally.scores.get(None, 0),
+        'tie_rate': tally.ties / tally.deals,
+        'no_winner_rate': tally.no_winner / tally.deals,
+        'score': {
+            'mean': float((values * counts).sum() / counts.sum()),
+            'std': float(np.sqrt((counts * (values - (values * counts).sum() / counts.sum()) ** 2).sum()
+                                 / counts.sum())),
+            **{f"p{q}": float(values[np.searchsorted(cumulative, q / 100)]) for q in (5, 25, 50, 75, 95)},
+            'histogram': dict(zip(map(float, values.tolist()), counts.tolist())),
+        },
+        'fair_win_rate': 1 / players,
+        'champions': champions,
+        'min_held': min_held,
+    }
+
+
+def report(result, seconds, top=10):
+    print(f"{result['deals']} deals of {result['players']} hands in {seconds:.1f}s "
+          f"({result['hands'] / seconds / 1e6:.2f}M hands/s)")
+    score = result['score']
+    print(f"hand score  mean {score['mean']:.2f}  std {score['std']:.2f}  "
+          + "  ".join(f"p{q} {score[f'p{q}']:g}" for q in (5, 25, 50, 75, 95)))
+    print(f"ties {result['tie_rate']:.2%} of showdowns, no winner (NaN score) {result['no_winner_rate']:.2%}")
+    ranked = sorted((c for c in result['champions'] if c['held'] >= result['min_held']),
+                    key=lambda c: c['win_rate'])
+    print(f"win rate of a hand holding the champion (fair: {result['fair_win_rate']:.1%}), "
+          f"{len(ranked)} champions held at least {result['min_held']} times")
+    for title, rows in (("strongest", ranked[::-1][:top]), ("weakest", ranked[:top])):
+        print(f"  {title}")
+        for c in rows:
+            print(f"    {c['win_rate']:7.2%}  {c['name']} {c['lane']}  ({c['held']} hands)")
+
+
+def deal_reference(game_data, pick_order, decks, players):
+    """ startGame's dealing and the three board draws, on decks given top card first """
+    deck = [[game_data[lane][i] for i in reversed(order)] for lane, order in zip(pick_order, decks)]
+    hands = []
+    for _ in range(players):
+        hand = [deck[0].pop(), deck[1].pop()]
+        while hand[0]['name'] == hand[1]['name']:
+            deck[1].insert(0, hand[1])
+            hand[1] = deck[1].pop()
+        hands.append(hand)
+    board = []
+    for k in range(2, 5):
+        taken = {c['name'] for h in hands for c in h} | {c['name'] for c in board}
+        card = deck[k].pop()
+        while card['name'] in taken: card = deck[k].pop()
+        board.append(card)
+    return hands, board
+
+
+def check(path='game_data.json', deals=500, players=6, seed=0):
+    """ The batch dealer and scorer against deal_reference/score_hand on the same shuffles """
+    tables = tables_for(path)
+    rng = np.random.default_rng(seed)
+    mismatches = 0
+    for _ in range(deals):
+        order = PICK_ORDERS[rng.integers(len(PICK_ORDERS))]
+        decks = shuffled_decks(rng, 1, order, tables)
+        left, right, board = deal(tables, order, decks, players)
+        got = score(tables, order, left, right, board)[0].tolist()
+        hands, cards = deal_reference(tables.game_data, order, [d[0] for d in decks], players)
+        expected = [score_hand(hand, cards) for hand in hands]
+        expected = [float('nan') if s is None else float(s) for s in expected]
+        same = all(g == e or (g != g and e != e) for g, e in zip(got, expected))
+        if not same:
+            mismatches += 1
+            print(f"  {'+'.join(order)}: {got} != {expected}")
+    print("✅ Batch deals match game.js's dealing." if not mismatches else f"❌ {mismatches} mismatches.")
+    return mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", nargs="?", choices=["run", "check"], default="run")
+    parser.add_argument("--game-data", default="game_data.json")
+    parser.add_argument("--deals", type=int, help="Showdowns to play (default: 1000000, check: 500)")
+    parser.add_argument("--players", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int, help="Simulate on a pool of this many (default: one per CPU)")
+    parser.add_argument("--batch", type=int, default=20000, help="Deals scored per NumPy batch (default: 20000)")
+    parser.add_argument("--min-held", type=int, default=1000,
+                        help="Champions held fewer times are left out of the ranking (default: 1000)")
+    parser.add_argument("--json", help="Also write the full results, every champion included, to this file")
+    args = parser.parse_args()
+    if args.command == "check":
+        sys.exit(1 if check(args.game_data, args.deals or 500, args.players, args.seed) else 0)
+
+    start = time.perf_counter()
+    tally, tables = simulate(args.game_data, args.deals or 1_000_000, args.players, args.seed,
+                             args.processes or os.cpu_count(), args.batch)
+    result = summary(tally, tables, args.players, args.min_held)
+    report(result, time.perf_counter() - start)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f: json.dump(result, f, indent=2)
@@ -0,0 +1,133 @@
+import os
+import json
+import time
+import asyncio
+from pathlib import Path
+
+'''
+    Local puuid/summonerId -> tier index for one region, built from the
+    league-v4 pages instead of one by-summoner call per crawled player.
+
+    refresh() walks the paged EMERALD and DIAMOND divisions and the MASTER,
+    GRANDMASTER and CHALLENGER leagues. Once a walk has finished, the index
+    is complete: a player missing from it is below Emerald, or unranked, as
+    of that walk. tier() then answers for every player without a request;
+    before the first complete walk it returns None for unknown players and
+    the crawler falls back to get_rank.
+
+    The index is stored in {region}_tiers.json and trusted for `max_age`
+    seconds after the walk that built it; an older index answers None for
+    everyone, so the crawler asks the rank cache or get_rank until the next
+    walk. A walk cut short by `max_pages` only answers for the players it
+    listed.
+
+    The walk shares the API key with the crawl, so it waits `pace` seconds
+    between its requests; datagen sets it so the walk takes a small share
+    of the app rate limit.
+'''
+
+# Walked from the top, so the players handed to the frontier come best first
+APEX_LEAGUES = {
+    "CHALLENGER": ("challengerleagues", "league-v4.getChallengerLeague"),
+    "GRANDMASTER": ("grandmasterleagues", "league-v4.getGrandmasterLeague"),
+    "MASTER": ("masterleagues", "league-v4.getMasterLeague"),
+}
+PAGED_TIERS = ["DIAMOND", "EMERALD"]
+DIVISIONS = ["I", "II", "III", "IV"]
+QUEUE_TYPE = "RANKED_SOLO_5x5"
+
+
+class TierIndex:
+    def __init__(self, path, max_age=48 * 3600, clock=time.time):
+        self.path = Path(path)
+        self.max_age = max_age
+        self.clock = clock
+        self.puuids = {}     # puuid -> tier
+        self.summoners = {}  # summonerId -> tier
+        self.walked_at = None
+        self.truncated = False
+
+    def __len__(self): return len(self.puuids) + len(self.summoners)
+
+    def age(self):
+        return None if self.walked_at is None else self.clock() - self.walked_at
+
+    @property
+    def fresh(self):
+        return self.age() is not None and self.age() <= self.max_age
+
+    @property
+    def complete(self):
+        return not self.truncated and self.fresh
+
+    def tier(self, puuid=None, summoner_id=None):
+        """ The player's tier, "" if a complete index does not list them, None if unknown or stale """
+        if not self.fresh: return None  # ranks may have moved since: ask until the next walk
+        tier = self.puuids.get(puuid) or self.summoners.get(summoner_id)
+        if tier: return tier
+        return "" if self.complete else None
+
+    async def refresh(self, get, base_url, region, max_pages=None, pace=0):
+        """
+        Walk every Emerald+ league page with `get(routing, method, url)`,
+        one request per `pace` seconds. Returns the listed players that
+        carry both a summonerId and a puuid.
+        """
+        puuids, summoners, listed = {}, {}, []
+        truncated = False
+        last = None
+
+        async def paced_get(method, url):
+            nonlocal last
+            if last is not None: await asyncio.sleep(max(last + pace - self.clock(), 0))
+            last = self.clock()
+            return await get(region, method, url)
+
+        def index(entries, tier):
+            for entry in entries:
+                puuid, summoner_id = entry.get("puuid"), entry.get("summonerId")
+                if puuid: puuids[puuid] = tier
+                if summoner_id: summoners[summoner_id] = tier
+                if puuid and summoner_id: listed.append({"summonerId": summoner_id, "puuid": puuid})
+
+        for tier, (path, method) in APEX_LEAGUES.items():
+            league = await paced_get(method, f"{base_url}/league/v4/{path}/by-queue/{QUEUE_TYPE}")
+            index(league.get("entries", []), tier)
+
+        for tier in PAGED_TIERS:
+            for division in DIVISIONS:
+                page = 1
+                while True:
+                    if max_pages is not None and page > max_pages:
+                        truncated = True
+                        break
+                    entries = await paced_get(
+                        "league-v4.getLeagueEntries",
+                        f"{base_url}/league/v4/entries/{QUEUE_TYPE}/{tier}/{division}?page={page}")
+                    if not entries: break
+                    index(entries, tier)
+                    page += 1
+
+        self.puuids, self.summoners = puuids, summoners
+        self.walked_at = self.clock()
+        self.truncated = truncated
+        self.save()
+        return listed
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"walked_at": self.walked_at, "truncated": self.truncated,
+                       "puuids": self.puuids, "summoners": self.summoners},
+                      f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        if not self.path.exists(): return
+        with open(self.path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        self.walked_at = state["walked_at"]
+        self.truncated = state["truncated"]
+        self.puuids = state["puuids"]
+        self.summoners = state["summoners"]
@@ -7,7 +7,7 @@ const http = require("http");
 const WebSocket = require("ws");
 const fs = require("fs");
 const pathLib = require("path");
-const { Game } = require("./game.js");
+const { Game, inflateGameData, inflateHandTables } = require("./game.js");
 
 /* --------------------------------------------------------------------- */
 /* 0. helpers / polyfills                                                */
@@ -26,17 +26,44 @@ const wss = new WebSocket.Server({ server });
 app.use(express.static("public"));
 
 const dataPath = "./game_data.json";
-let gameData = JSON.parse(fs.readFileSync(dataPath));
-let setData;
-fs.watch(dataPath, () => {
-  if (setData) clearTimeout(setData);
-  setData = setTimeout(() => {
-    gameData = JSON.parse(fs.readFileSync(dataPath));
-    console.log("Game data updated");
-  }, 10000);
+const handsPath = "./game_data_hands.json"; // pre-flop tables, written before game_data.json
+// Rewritten last, after every file of a build has been renamed into place;
+// a build that changes nothing leaves all of them alone
+const manifestPath = "./game_data_manifest.json";
+const loadGameData = () => inflateGameData(JSON.parse(fs.readFileSync(dataPath)));
+const loadHandTables = () =>
+  fs.existsSync(handsPath) ? inflateHandTables(JSON.parse(fs.readFileSync(handsPath))) : null;
+const readManifest = () => {
+  try {
+    return JSON.parse(fs.readFileSync(manifestPath));
+  } catch {
+    return null;
+  }
+};
+// The manifest lists every file's sha256: a build that leaves the hand
+// tables alone doesn't make us parse them again
+const handsHash = (manifest) => manifest?.files?.[pathLib.basename(handsPath)]?.sha256 ?? null;
+let gameData = loadGameData();
+let handTables = loadHandTables();
+let manifest = readManifest();
+// Poll with stat: fs.watch follows the old inode once a file is replaced by rename
+fs.watchFile(manifestPath, { interval: 5000 }, () => {
+  const latest = readManifest();
+  if (!latest?.content_hash || latest.content_hash === manifest?.content_hash) return;
+  try {
+    gameData = loadGameData();
+    if (handsHash(latest) !== handsHash(manifest)) handTables = loadHandTables();
+    manifest = latest;
+    // The hand in play keeps the pools it was dealt from; startGame swaps
+    game.pendingGameData = gameData;
+    game.pendingHandTables = handTables;
+    console.log(`Game data updated to build ${gameData._meta.build_version}`);
+  } catch (err) {
+    console.error("Game data reload failed, keeping the current one", err);
+  }
 });
 
-const game = new Game("id", gameData);
+const game = new Game("id", gameData, handTables);
 wss.on("connection", (socket) => game.addUser(socket));
 
 /* --------------------------------------------------------------------- */